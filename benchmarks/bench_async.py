@@ -0,0 +1,76 @@
+import asyncio
+import os
+import sys
+
+import pyperf
+
+sys.path[0:0] = [os.path.join(os.path.dirname(__file__), "..")]
+import html5lib  # noqa: E402
+
+PAGES = 16
+CHUNK = 4096
+
+
+async def serve(reader, data):
+    # Stand-in for a network connection: hand the page over a chunk at a time
+    for i in range(0, len(data), CHUNK):
+        reader.feed_data(data[i:i + CHUNK])
+        await asyncio.sleep(0)
+    reader.feed_eof()
+
+
+async def fetch(data, yieldEvery):
+    reader = asyncio.StreamReader()
+    server = asyncio.ensure_future(serve(reader, data))
+    tree = await html5lib.parse_async(reader, yieldEvery=yieldEvery, useChardet=False)
+    await server
+    return tree
+
+
+async def fetch_all(data, yieldEvery):
+    await asyncio.gather(*[fetch(data, yieldEvery) for _ in range(PAGES)])
+
+
+def bench_concurrent(loops, data, yieldEvery):
+    loop = asyncio.new_event_loop()
+    try:
+        t0 = pyperf.perf_counter()
+        for _ in range(loops):
+            loop.run_until_complete(fetch_all(data, yieldEvery))
+        return pyperf.perf_counter() - t0
+    finally:
+        loop.close()
+
+
+def bench_sequential(data):
+    for _ in range(PAGES):
+        html5lib.parse(data, useChardet=False)
+
+
+BENCHMARKS = ["concurrent", "sequential"]
+
+
+def add_cmdline_args(cmd, args):
+    if args.benchmark:
+        cmd.append(args.benchmark)
+
+
+if __name__ == "__main__":
+    runner = pyperf.Runner(add_cmdline_args=add_cmdline_args)
+    runner.metadata["description"] = "Parse %d pages concurrently from asyncio streams" % PAGES
+    runner.argparser.add_argument("benchmark", nargs="?", choices=BENCHMARKS)
+
+    args = runner.parse_args()
+    if args.benchmark:
+        benchmarks = (args.benchmark,)
+    else:
+        benchmarks = BENCHMARKS
+
+    with open(os.path.join(os.path.dirname(__file__), "data", "html.html"), "rb") as fh:
+        data = fh.read()
+
+    if "concurrent" in benchmarks:
+        for yieldEvery in (100, 1000):
+            runner.bench_time_func("async_concurrent_%d" % yieldEvery, bench_concurrent, data, yieldEvery)
+    if "sequential" in benchmarks:
+        runner.bench_func("async_sequential", bench_sequential, data)
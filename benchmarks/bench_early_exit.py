@@ -0,0 +1,43 @@
+import os
+import sys
+
+import pyperf
+
+sys.path[0:0] = [os.path.join(os.path.dirname(__file__), "..")]
+import html5lib  # noqa: E402
+
+# Pulling the title and metadata out of a large page, which only needs the
+# head, and a preview, which only needs the start of the body
+OPTIONS = {
+    "full": {},
+    "head": {"stopAfter": "head"},
+    "preview": {"maxCharacters": 8192},
+}
+
+
+def bench_parse(parser, data, options):
+    parser.parse(data, useChardet=False, **options)
+
+
+def add_cmdline_args(cmd, args):
+    if args.benchmark:
+        cmd.append(args.benchmark)
+
+
+if __name__ == "__main__":
+    runner = pyperf.Runner(add_cmdline_args=add_cmdline_args)
+    runner.metadata["description"] = "Parse part of a large page"
+    runner.argparser.add_argument("benchmark", nargs="?", choices=sorted(OPTIONS))
+
+    args = runner.parse_args()
+    if args.benchmark:
+        benchmarks = (args.benchmark,)
+    else:
+        benchmarks = sorted(OPTIONS)
+
+    with open(os.path.join(os.path.dirname(__file__), "data", "html.html"), "rb") as fh:
+        data = fh.read()
+
+    parser = html5lib.HTMLParser()
+    for name in benchmarks:
+        runner.bench_func("early_exit_%s" % name, bench_parse, parser, data, OPTIONS[name])
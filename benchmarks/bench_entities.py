@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pyperf
+
+sys.path[0:0] = [os.path.join(os.path.dirname(__file__), "..")]
+from html5lib._tokenizer import HTMLTokenizer  # noqa: E402
+
+REPEAT = 2000
+
+# Text and attribute values dense with character references: common ones,
+# ones that only match a shorter entity (&notit), legacy ones without a
+# semicolon, and bare ampersands in URLs
+TEXT = ("<p>Fish&nbsp;&amp;&nbsp;chips &copy; 2020 &mdash; &notit; &lt;b&gt; "
+        "&frac12;&nbsp;price &amp &ampersand &NotNestedGreaterGreater;</p>")
+ATTRIBUTES = ('<a href="/search?q=html&amp;page=2&lang=en&copy=1&sect=3" '
+              'title="&quot;Tom&quot; &amp; &quot;Jerry&quot;">x</a>')
+
+DOCUMENTS = {
+    "text": TEXT * REPEAT,
+    "attributes": ATTRIBUTES * REPEAT,
+}
+
+
+def bench_tokenize(source):
+    for _ in HTMLTokenizer(source):
+        pass
+
+
+def add_cmdline_args(cmd, args):
+    if args.benchmark:
+        cmd.append(args.benchmark)
+
+
+if __name__ == "__main__":
+    runner = pyperf.Runner(add_cmdline_args=add_cmdline_args)
+    runner.metadata["description"] = "Tokenize documents dense with character references"
+    runner.argparser.add_argument("benchmark", nargs="?", choices=sorted(DOCUMENTS))
+
+    args = runner.parse_args()
+    if args.benchmark:
+        benchmarks = (args.benchmark,)
+    else:
+        benchmarks = sorted(DOCUMENTS)
+
+    for name in benchmarks:
+        runner.bench_func("entities_%s" % name, bench_tokenize, DOCUMENTS[name])
@@ -0,0 +1,46 @@
+import os
+import sys
+
+import pyperf
+
+sys.path[0:0] = [os.path.join(os.path.dirname(__file__), "..")]
+import html5lib  # noqa: E402
+
+REPEAT = 500
+
+# Misnested formatting as produced by WYSIWYG editors and hand-edited pages:
+# end tags in the wrong order run the adoption agency algorithm, and the
+# elements left open are reopened for the text that follows. Unclosed
+# elements that all differ pile up in the list of active formatting elements,
+# which every new formatting element used to be compared with
+DOCUMENTS = {
+    "misnested": "<p><b>bold <i>both</b> italic</i> <a href=x><u>link</a> rest</u></p>" * REPEAT,
+    "unclosed": "<font color=red><b><i>text <span>more</span></p><div>block" * REPEAT,
+    "attributes": "".join("<font size=%d><b class=c%d>t</font> " % (i % 7, i % 3)
+                          for i in range(REPEAT * 4)),
+    "distinct": "".join("<font face=f%d>x <b>y</b> " % i for i in range(REPEAT * 4)),
+}
+
+
+def bench_parse(source):
+    html5lib.parse(source)
+
+
+def add_cmdline_args(cmd, args):
+    if args.benchmark:
+        cmd.append(args.benchmark)
+
+
+if __name__ == "__main__":
+    runner = pyperf.Runner(add_cmdline_args=add_cmdline_args)
+    runner.metadata["description"] = "Parse documents with misnested formatting elements"
+    runner.argparser.add_argument("benchmark", nargs="?", choices=sorted(DOCUMENTS))
+
+    args = runner.parse_args()
+    if args.benchmark:
+        benchmarks = (args.benchmark,)
+    else:
+        benchmarks = sorted(DOCUMENTS)
+
+    for name in benchmarks:
+        runner.bench_func("formatting_%s" % name, bench_parse, DOCUMENTS[name])
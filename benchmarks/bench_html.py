@@ -26,7 +26,23 @@ def bench_serialize(loops, fh, treebuilder):
     return pyperf.perf_counter() - t0
 
 
-BENCHMARKS = ["parse", "serialize"]
+def bench_walk(loops, fh, treebuilder):
+    fh.seek(0)
+    doc = html5lib.parse(fh, treebuilder=treebuilder, useChardet=False)
+    walker = html5lib.getTreeWalker(treebuilder)
+
+    range_it = range(loops)
+    t0 = pyperf.perf_counter()
+
+    for loops in range_it:
+        for token in walker(doc):
+            pass
+
+    return pyperf.perf_counter() - t0
+
+
+BENCHMARKS = ["parse", "serialize", "walk"]
+TREEBUILDERS = ("etree", "dom", "lxml", "compact")
 
 
 def add_cmdline_args(cmd, args):
@@ -49,9 +65,13 @@ if __name__ == "__main__":
         source = io.BytesIO(fh.read())
 
     if "parse" in benchmarks:
-        for tb in ("etree", "dom", "lxml"):
+        for tb in TREEBUILDERS:
             runner.bench_func("html_parse_%s" % tb, bench_parse, source, tb)
 
     if "serialize" in benchmarks:
-        for tb in ("etree", "dom", "lxml"):
+        for tb in TREEBUILDERS:
             runner.bench_time_func("html_serialize_%s" % tb, bench_serialize, source, tb)
+
+    if "walk" in benchmarks:
+        for tb in TREEBUILDERS:
+            runner.bench_time_func("html_walk_%s" % tb, bench_walk, source, tb)
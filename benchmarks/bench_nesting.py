@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pyperf
+
+sys.path[0:0] = [os.path.join(os.path.dirname(__file__), "..")]
+import html5lib  # noqa: E402
+
+DEPTH = 3000
+
+# Tag soup that never closes its elements, as found on old forums: every
+# <p> start tag and </p> end tag asks whether a p is in button scope, which
+# used to walk the whole stack of open elements
+DOCUMENTS = {
+    "div": "<div><p>post</p>" * DEPTH,
+    "font": "<font size=2><p>post</p><span>" * DEPTH,
+}
+
+
+def bench_parse(source):
+    html5lib.parse(source)
+
+
+def add_cmdline_args(cmd, args):
+    if args.benchmark:
+        cmd.append(args.benchmark)
+
+
+if __name__ == "__main__":
+    runner = pyperf.Runner(add_cmdline_args=add_cmdline_args)
+    runner.metadata["description"] = "Parse %d levels of unclosed elements" % DEPTH
+    runner.argparser.add_argument("benchmark", nargs="?", choices=sorted(DOCUMENTS))
+
+    args = runner.parse_args()
+    if args.benchmark:
+        benchmarks = (args.benchmark,)
+    else:
+        benchmarks = sorted(DOCUMENTS)
+
+    for name in benchmarks:
+        runner.bench_func("nesting_%s" % name, bench_parse, DOCUMENTS[name])
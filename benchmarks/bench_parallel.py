@@ -0,0 +1,62 @@
+import os
+import sys
+
+import pyperf
+
+sys.path[0:0] = [os.path.join(os.path.dirname(__file__), "..")]
+import html5lib  # noqa: E402
+
+# Every WPT document is parsed this many times in each pass, so that there is
+# enough work to spread over the workers
+REPEAT = 8
+
+DOCUMENTS = []
+for root, dirs, files in os.walk(os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "wpt")):
+    for f in files:
+        if f.endswith(".html"):
+            with open(os.path.join(root, f), "rb") as fh:
+                DOCUMENTS.append(fh.read())
+DOCUMENTS *= REPEAT
+
+
+def discard(tree):
+    # Only the parsing is measured, not sending the trees back
+    return None
+
+
+def bench_sequential(loops, parser):
+    t0 = pyperf.perf_counter()
+    for _ in range(loops):
+        for doc in DOCUMENTS:
+            parser.parse(doc, useChardet=False)
+    return pyperf.perf_counter() - t0
+
+
+def bench_parse_many(loops, workers, threads):
+    t0 = pyperf.perf_counter()
+    for _ in range(loops):
+        for _ in html5lib.parse_many(DOCUMENTS, workers=workers, chunksize=4, threads=threads,
+                                     callback=discard, useChardet=False):
+            pass
+    return pyperf.perf_counter() - t0
+
+
+def add_cmdline_args(cmd, args):
+    cmd.extend(("--max-workers", str(args.max_workers)))
+
+
+if __name__ == "__main__":
+    runner = pyperf.Runner(add_cmdline_args=add_cmdline_args)
+    runner.metadata["description"] = ("Parse %d WPT documents per pass, one after another "
+                                      "and over 1 to N worker processes or threads; threads "
+                                      "only scale on a free-threaded build" % len(DOCUMENTS))
+    runner.argparser.add_argument("--max-workers", type=int, default=os.cpu_count())
+
+    args = runner.parse_args()
+
+    runner.bench_time_func("parallel_sequential", bench_sequential, html5lib.HTMLParser())
+    workers = 1
+    while workers <= args.max_workers:
+        runner.bench_time_func("parallel_processes_%d" % workers, bench_parse_many, workers, False)
+        runner.bench_time_func("parallel_threads_%d" % workers, bench_parse_many, workers, True)
+        workers *= 2
@@ -0,0 +1,52 @@
+import os
+import sys
+
+import pyperf
+
+sys.path[0:0] = [os.path.join(os.path.dirname(__file__), "..")]
+import html5lib  # noqa: E402
+
+# A user comment of about 200 bytes, the kind of input where setting up the
+# parser is a large part of the work
+SNIPPET = ('<p class="c">Nice post! See <a href="https://example.com/x?a=1&amp;b=2">'
+           'this link</a> &mdash; <b>really</b> worth a look.<br>Thanks, <i>Sam</i>'
+           '<br>(edited to add: looking forward to part two!)</p>')
+
+
+def bench_parse_fragment():
+    html5lib.parseFragment(SNIPPET)
+
+
+def bench_reused_parser(parser):
+    parser.parseFragment(SNIPPET)
+
+
+def bench_pool(pool):
+    pool.parseFragment(SNIPPET)
+
+
+BENCHMARKS = ["new", "reused", "pool"]
+
+
+def add_cmdline_args(cmd, args):
+    if args.benchmark:
+        cmd.append(args.benchmark)
+
+
+if __name__ == "__main__":
+    runner = pyperf.Runner(add_cmdline_args=add_cmdline_args)
+    runner.metadata["description"] = "Per-parse overhead for %d-byte fragments" % len(SNIPPET)
+    runner.argparser.add_argument("benchmark", nargs="?", choices=BENCHMARKS)
+
+    args = runner.parse_args()
+    if args.benchmark:
+        benchmarks = (args.benchmark,)
+    else:
+        benchmarks = BENCHMARKS
+
+    if "new" in benchmarks:
+        runner.bench_func("reuse_new_parser", bench_parse_fragment)
+    if "reused" in benchmarks:
+        runner.bench_func("reuse_reused_parser", bench_reused_parser, html5lib.HTMLParser())
+    if "pool" in benchmarks:
+        runner.bench_func("reuse_pool", bench_pool, html5lib.ParserPool())
@@ -0,0 +1,51 @@
+import os
+import sys
+
+import pyperf
+
+sys.path[0:0] = [os.path.join(os.path.dirname(__file__), "..")]
+import html5lib  # noqa: E402
+
+ROWS = 5000
+
+# A financial report, a data dump and broken tables: big tables with pretty-printed
+# whitespace between every row and cell, which goes through the "in table
+# text" insertion mode, and in the dump and the broken tables stray text that
+# gets foster parented
+DOCUMENTS = {
+    "report": "<table>\n  <tbody>\n" + "".join(
+        "    <tr>\n      <td>Q%d</td>\n      <td>%d.%02d</td>\n      <td>&minus;%d</td>\n    </tr>\n"
+        % (i % 4 + 1, i * 7, i % 100, i % 13) for i in range(ROWS)) + "  </tbody>\n</table>",
+    "dump": "<table>" + "".join(
+        "<tr> <td>%d</td> <td>row &amp; %d</td> </tr> %s\n" % (i, i, "x" if i % 10 == 0 else "")
+        for i in range(ROWS)) + "</table>",
+    "broken": "".join(
+        "<table><tr><td>%d</td> total: %d &amp; more <td>x</tr></table>\n" % (i, i)
+        for i in range(ROWS // 2)) + "<table>" + "".join(
+        "<tr><td>%d</td> stray &lt;%d&gt; text </tr>" % (i, i)
+        for i in range(ROWS // 2)) + "</table>",
+}
+
+
+def bench_parse(source):
+    html5lib.parse(source)
+
+
+def add_cmdline_args(cmd, args):
+    if args.benchmark:
+        cmd.append(args.benchmark)
+
+
+if __name__ == "__main__":
+    runner = pyperf.Runner(add_cmdline_args=add_cmdline_args)
+    runner.metadata["description"] = "Parse tables of %d rows" % ROWS
+    runner.argparser.add_argument("benchmark", nargs="?", choices=sorted(DOCUMENTS))
+
+    args = runner.parse_args()
+    if args.benchmark:
+        benchmarks = (args.benchmark,)
+    else:
+        benchmarks = sorted(DOCUMENTS)
+
+    for name in benchmarks:
+        runner.bench_func("tables_%s" % name, bench_parse, DOCUMENTS[name])
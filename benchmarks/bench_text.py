@@ -0,0 +1,43 @@
+import os
+import sys
+
+import pyperf
+
+sys.path[0:0] = [os.path.join(os.path.dirname(__file__), "..")]
+import html5lib  # noqa: E402
+
+LINES = 20000
+
+# A book chapter and a log rendered as HTML: long text nodes that the
+# tokenizer hands over in many pieces, split at every character reference
+DOCUMENTS = {
+    "book": "<p>" + "".join("&ldquo;Line %d,&rdquo; she said &mdash; &amp; went on. " % i
+                            for i in range(LINES)) + "</p>",
+    "log": "<pre>" + "".join("%05d &lt;INFO&gt; request &quot;/x?a=1&amp;b=2&quot; ok\n" % i
+                             for i in range(LINES)) + "</pre>",
+}
+
+
+def bench_parse(source, coalesceCharacters):
+    html5lib.parse(source, coalesceCharacters=coalesceCharacters)
+
+
+def add_cmdline_args(cmd, args):
+    if args.benchmark:
+        cmd.append(args.benchmark)
+
+
+if __name__ == "__main__":
+    runner = pyperf.Runner(add_cmdline_args=add_cmdline_args)
+    runner.metadata["description"] = "Parse documents made of long text nodes"
+    runner.argparser.add_argument("benchmark", nargs="?", choices=sorted(DOCUMENTS))
+
+    args = runner.parse_args()
+    if args.benchmark:
+        benchmarks = (args.benchmark,)
+    else:
+        benchmarks = sorted(DOCUMENTS)
+
+    for name in benchmarks:
+        runner.bench_func("text_%s" % name, bench_parse, DOCUMENTS[name], False)
+        runner.bench_func("text_%s_coalesced" % name, bench_parse, DOCUMENTS[name], True)
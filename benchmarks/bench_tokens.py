@@ -0,0 +1,49 @@
+import io
+import os
+import sys
+
+import pyperf
+
+sys.path[0:0] = [os.path.join(os.path.dirname(__file__), "..")]
+import html5lib  # noqa: E402
+from html5lib._tokenizer import HTMLTokenizer  # noqa: E402
+
+
+def bench_tokenize(fh, compactTokens):
+    # Keep every token alive so that --tracemalloc shows the full token footprint
+    fh.seek(0)
+    return list(HTMLTokenizer(fh, compactTokens=compactTokens, useChardet=False))
+
+
+def bench_parse(fh, compactTokens):
+    fh.seek(0)
+    html5lib.parse(fh, treebuilder="etree", compactTokens=compactTokens, useChardet=False)
+
+
+BENCHMARKS = ["tokenize", "parse"]
+
+
+def add_cmdline_args(cmd, args):
+    if args.benchmark:
+        cmd.append(args.benchmark)
+
+
+if __name__ == "__main__":
+    runner = pyperf.Runner(add_cmdline_args=add_cmdline_args)
+    runner.metadata["description"] = "Compare dict tokens with compact tokens"
+    runner.argparser.add_argument("benchmark", nargs="?", choices=BENCHMARKS)
+
+    args = runner.parse_args()
+    if args.benchmark:
+        benchmarks = (args.benchmark,)
+    else:
+        benchmarks = BENCHMARKS
+
+    with open(os.path.join(os.path.dirname(__file__), "data", "html.html"), "rb") as fh:
+        source = io.BytesIO(fh.read())
+
+    for kind, compact in (("dict", False), ("compact", True)):
+        if "tokenize" in benchmarks:
+            runner.bench_func("tokens_tokenize_%s" % kind, bench_tokenize, source, compact)
+        if "parse" in benchmarks:
+            runner.bench_func("tokens_parse_%s" % kind, bench_parse, source, compact)
@@ -0,0 +1,54 @@
+import os
+import sys
+
+import pyperf
+
+sys.path[0:0] = [os.path.join(os.path.dirname(__file__), "..")]
+import html5lib  # noqa: E402
+
+SIZES = (5000, 20000)
+
+# Synthetic trees that stress the walker rather than the parser: a list
+# whose items each have a child, so the walker climbs back to the list after
+# every item, and many nested elements; the time per node should stay the
+# same as the trees grow
+DOCUMENTS = {
+    "wide": lambda n: "<ul>" + "<li><a>item</a></li>" * n + "</ul>",
+    "deep": lambda n: "<div>x" * n + "</div>" * n,
+}
+
+
+def bench_walk(loops, source, treebuilder):
+    doc = html5lib.parse(source, treebuilder=treebuilder)
+    walker = html5lib.getTreeWalker(treebuilder)
+
+    range_it = range(loops)
+    t0 = pyperf.perf_counter()
+
+    for loops in range_it:
+        for token in walker(doc):
+            pass
+
+    return pyperf.perf_counter() - t0
+
+
+def add_cmdline_args(cmd, args):
+    if args.benchmark:
+        cmd.append(args.benchmark)
+
+
+if __name__ == "__main__":
+    runner = pyperf.Runner(add_cmdline_args=add_cmdline_args)
+    runner.metadata["description"] = "Walk wide and deep synthetic trees"
+    runner.argparser.add_argument("benchmark", nargs="?", choices=sorted(DOCUMENTS))
+
+    args = runner.parse_args()
+    if args.benchmark:
+        benchmarks = (args.benchmark,)
+    else:
+        benchmarks = sorted(DOCUMENTS)
+
+    for name in benchmarks:
+        for size in SIZES:
+            runner.bench_time_func("walk_%s_%d" % (name, size), bench_walk,
+                                   DOCUMENTS[name](size), "etree")
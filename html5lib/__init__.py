@@ -14,7 +14,11 @@ For convenience, this module re-exports the following names:
 
 * :func:`~.html5parser.parse`
 * :func:`~.html5parser.parseFragment`
+* :func:`~._iterparse.iterparse`
+* :func:`~._async.parse_async` (Python 3 only)
+* :func:`~._parallel.parse_many` (Python 3 only)
 * :class:`~.html5parser.HTMLParser`
+* :class:`~.html5parser.ParserPool`
 * :func:`~.treebuilders.getTreeBuilder`
 * :func:`~.treewalkers.getTreeWalker`
 * :func:`~.serializer.serialize`
@@ -22,13 +26,21 @@ For convenience, this module re-exports the following names:
 
 from __future__ import absolute_import, division, unicode_literals
 
-from .html5parser import HTMLParser, parse, parseFragment
+import sys
+
+from .html5parser import HTMLParser, ParserPool, parse, parseFragment
+from ._iterparse import iterparse
 from .treebuilders import getTreeBuilder
 from .treewalkers import getTreeWalker
 from .serializer import serialize
 
-__all__ = ["HTMLParser", "parse", "parseFragment", "getTreeBuilder",
-           "getTreeWalker", "serialize"]
+__all__ = ["HTMLParser", "ParserPool", "parse", "parseFragment", "iterparse",
+           "getTreeBuilder", "getTreeWalker", "serialize"]
+
+if sys.version_info >= (3, 5):
+    from ._async import parse_async  # noqa: F401
+    from ._parallel import parse_many  # noqa: F401
+    __all__.extend(["parse_async", "parse_many"])
 
 # this has to be at the top level, see how setup.py parses this
 #: Distribution version number.
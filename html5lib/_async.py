@@ -0,0 +1,82 @@
+"""Parsing documents read from asyncio streams
+
+This module uses ``async def`` and so is only imported on Python 3; see
+:py:func:`html5lib.parse_async`.
+
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+import asyncio
+from itertools import chain, islice
+
+from . import treebuilders
+from .html5parser import HTMLParser
+
+#: Number of bytes requested from each ``read()`` of a stream reader
+readSize = 65536
+
+
+async def parse_async(source, treebuilder="etree", namespaceHTMLElements=True,
+                      yieldEvery=1000, **kwargs):
+    """Parse an HTML document read from an asyncio stream into a tree
+
+    The document is tokenized and built as each piece of it arrives, through
+    :py:meth:`~html5lib.html5parser.HTMLParser.feed`, and control is given
+    back to the event loop after every ``yieldEvery`` tokens so that a large
+    document doesn't hold up other tasks.
+
+    :arg source: an :py:class:`asyncio.StreamReader` (or any object with a
+        ``read(n)`` coroutine method) or an asynchronous iterable, producing
+        the document as bytes or as text
+
+    :arg treebuilder: the treebuilder to use when parsing
+
+    :arg namespaceHTMLElements: whether or not to namespace HTML elements
+
+    :arg yieldEvery: the number of tokens to process between yields to the
+        event loop
+
+    :returns: parsed tree
+
+    Keyword arguments such as ``transport_encoding`` are passed on as for
+    :py:func:`~html5lib.html5parser.parse`.
+
+    Example:
+
+    >>> import asyncio
+    >>> from html5lib import parse_async
+    >>> async def chunks():
+    ...     yield b'<p>This is a d'
+    ...     yield b'oc</p>'
+    >>> asyncio.run(parse_async(chunks()))
+    <Element u'{http://www.w3.org/1999/xhtml}html' at 0x7feac4909db0>
+
+    """
+    tb = treebuilders.getTreeBuilder(treebuilder)
+    p = HTMLParser(tb, namespaceHTMLElements=namespaceHTMLElements)
+    p._startFeeding(**kwargs)
+    tokenizer = p.tokenizer
+
+    if hasattr(source, "read"):
+        while True:
+            data = await source.read(readSize)
+            if not data:
+                break
+            await _processTokens(p, tokenizer.feed(data), yieldEvery)
+    else:
+        async for data in source:
+            await _processTokens(p, tokenizer.feed(data), yieldEvery)
+
+    p._feeding = False
+    await _processTokens(p, tokenizer.close(), yieldEvery)
+    p.processEOF()
+    return p.tree.getDocument()
+
+
+async def _processTokens(parser, tokens, yieldEvery):
+    # The tokens have to be pulled one at a time as the parser goes, since
+    # processing a token can switch the tokenizer into another state
+    tokens = iter(tokens)
+    for token in tokens:
+        parser.processTokens(chain((token,), islice(tokens, yieldEvery - 1)))
+        await asyncio.sleep(0)
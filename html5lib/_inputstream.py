@@ -4,13 +4,16 @@ from six import text_type
 from six.moves import http_client, urllib
 
 import codecs
+import mmap
 import re
+from bisect import bisect_left
+from collections import deque
 from io import BytesIO, StringIO
 
 import webencodings
 
 from .constants import EOF, spaceCharacters, asciiLetters, asciiUppercase
-from .constants import _ReparseException
+from .constants import _ReparseException, _NeedMoreData
 from . import _utils
 
 # Non-unicode versions of constants for use in the pre-parser
@@ -42,9 +45,12 @@ non_bmp_invalid_codepoints = {0x1FFFE, 0x1FFFF, 0x2FFFE, 0x2FFFF, 0x3FFFE,
                               0xDFFFF, 0xEFFFE, 0xEFFFF, 0xFFFFE, 0xFFFFF,
                               0x10FFFE, 0x10FFFF}
 
+newline_re = re.compile("\n")
+
 ascii_punctuation_re = re.compile("[\u0009-\u000D\u0020-\u002F\u003A-\u0040\u005C\u005B-\u0060\u007B-\u007E]")
 
-# Cache for charsUntil()
+# Cache for charsUntil(). Entries are only ever added, and always with the
+# same regexp for a key, so threads can share it without a lock
 charsUntilRegEx = {}
 
 
@@ -193,6 +199,8 @@ class HTMLUnicodeInputStream(object):
         self.chunkOffset = 0
         self.errors = []
 
+        # number of characters in previous chunks
+        self.prevNumCharacters = 0
         # number of (complete) lines in previous chunks
         self.prevNumLines = 0
         # number of columns in the last line of the previous chunk
@@ -201,6 +209,10 @@ class HTMLUnicodeInputStream(object):
         # Deal with CR LF and surrogates split over chunk boundaries
         self._bufferedCharacter = None
 
+        # Offsets of the newlines in the current chunk, found the first time
+        # a position in the chunk is asked for
+        self._newLineOffsets = None
+
     def openStream(self, source):
         """Produces a file object from source.
 
@@ -215,22 +227,52 @@ class HTMLUnicodeInputStream(object):
 
         return stream
 
+    def closeSource(self):
+        """Closes the file the stream opened itself, if any, once it isn't
+        needed any more"""
+        pass
+
     def _position(self, offset):
-        chunk = self.chunk
-        nLines = chunk.count('\n', 0, offset)
+        newLineOffsets = self._newLineOffsets
+        if newLineOffsets is None:
+            newLineOffsets = self._newLineOffsets = [
+                m.start() for m in newline_re.finditer(self.chunk)]
+        nLines = bisect_left(newLineOffsets, offset)
         positionLine = self.prevNumLines + nLines
-        lastLinePos = chunk.rfind('\n', 0, offset)
-        if lastLinePos == -1:
+        if nLines == 0:
             positionColumn = self.prevNumCols + offset
         else:
-            positionColumn = offset - (lastLinePos + 1)
+            positionColumn = offset - (newLineOffsets[nLines - 1] + 1)
         return (positionLine, positionColumn)
 
+    def _startNewChunk(self, offset):
+        """Moves the line and column tracking on to the start of a new chunk
+        that follows the first offset characters of the current one"""
+        self.prevNumCharacters += offset
+        if self._newLineOffsets is not None:
+            self.prevNumLines, self.prevNumCols = self._position(offset)
+        else:
+            # Nothing has asked for a position in this chunk, so don't
+            # bother indexing it
+            chunk = self.chunk
+            nLines = chunk.count("\n", 0, offset)
+            if nLines == 0:
+                self.prevNumCols += offset
+            else:
+                self.prevNumLines += nLines
+                self.prevNumCols = offset - (chunk.rfind("\n", 0, offset) + 1)
+        self._newLineOffsets = None
+
     def position(self):
         """Returns (line, col) of the current position in the stream."""
         line, col = self._position(self.chunkOffset)
         return (line + 1, col)
 
+    def charactersRead(self):
+        """Returns the number of characters read from the stream so far,
+        after newlines have been normalised"""
+        return self.prevNumCharacters + self.chunkOffset
+
     def char(self):
         """ Read one character from the stream or queue if available. Return
             EOF when EOF is reached.
@@ -250,7 +292,7 @@ class HTMLUnicodeInputStream(object):
         if chunkSize is None:
             chunkSize = self._defaultChunkSize
 
-        self.prevNumLines, self.prevNumCols = self._position(self.chunkSize)
+        self._startNewChunk(self.chunkSize)
 
         self.chunk = ""
         self.chunkSize = 0
@@ -358,6 +400,18 @@ class HTMLUnicodeInputStream(object):
         r = "".join(rv)
         return r
 
+    def charsMatching(self, regexp):
+        """ Returns the run of characters matched by the compiled regular
+        expression 'regexp' at the current position, or "" if it doesn't
+        match. Unlike charsUntil the run never extends past the end of the
+        current chunk, so callers must be prepared to see it split in two.
+        """
+        m = regexp.match(self.chunk, self.chunkOffset)
+        if m is None:
+            return ""
+        self.chunkOffset = m.end()
+        return m.group()
+
     def unget(self, char):
         # Only one character is allowed to be ungotten at once - it must
         # be consumed again before any further call to unget
@@ -370,11 +424,27 @@ class HTMLUnicodeInputStream(object):
                 # chunk:
                 self.chunk = char + self.chunk
                 self.chunkSize += 1
+                self.prevNumCharacters -= 1
+                self._newLineOffsets = None
             else:
                 self.chunkOffset -= 1
                 assert self.chunk[self.chunkOffset] == char
 
 
+def mapFile(path):
+    """Opens the file at path as a read-only memory map
+
+    Falls back to reading the file into memory when it can't be mapped, which
+    is always the case for empty files.
+
+    """
+    with open(path, "rb") as fp:
+        try:
+            return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, EnvironmentError):
+            return BytesIO(fp.read())
+
+
 class HTMLBinaryInputStream(HTMLUnicodeInputStream):
     """Provides a unicode stream of characters to the HTMLTokenizer.
 
@@ -382,6 +452,8 @@ class HTMLBinaryInputStream(HTMLUnicodeInputStream):
     incorrect byte-sequences and also provides column and line tracking.
 
     """
+    # The memory map (or file contents) opened for a path-like source
+    _ownStream = None
 
     def __init__(self, source, override_encoding=None, transport_encoding=None,
                  same_origin_parent_encoding=None, likely_encoding=None,
@@ -426,18 +498,104 @@ class HTMLBinaryInputStream(HTMLUnicodeInputStream):
         self.reset()
 
     def reset(self):
-        self.dataStream = self.charEncoding[0].codec_info.streamreader(self.rawStream, 'replace')
+        if (self.charEncoding[0].name == "utf-8" and self.charEncoding[1] == "certain" and
+                self.reportCharacterErrors != self.characterErrorsUCS2):
+            # The encoding can't change any more, so readChunk decodes the
+            # whole document at once rather than going through a StreamReader
+            self.dataStream = None
+            self._decodedChunks = None
+        else:
+            self.dataStream = self.charEncoding[0].codec_info.streamreader(self.rawStream, 'replace')
         HTMLUnicodeInputStream.reset(self)
 
+    def readChunk(self, chunkSize=None):
+        if self.dataStream is not None:
+            return HTMLUnicodeInputStream.readChunk(self, chunkSize)
+
+        if self._decodedChunks is None:
+            self._decodedChunks = self._decodeAll()
+
+        self._startNewChunk(self.chunkSize)
+
+        self.chunk = ""
+        self.chunkSize = 0
+        self.chunkOffset = 0
+
+        if not self._decodedChunks:
+            return False
+
+        data = self._decodedChunks.popleft()
+        # Each invalid codepoint starts a chunk of its own so that the error is
+        # reported when the tokenizer gets to it
+        if self.reportCharacterErrors and invalid_unicode_re.match(data):
+            self.errors.append("invalid-codepoint")
+
+        self.chunk = data
+        self.chunkSize = len(data)
+
+        return True
+
+    def _decodeAll(self):
+        """Decodes the rest of the raw stream in one go
+
+        Returns a deque of chunks, split just before every invalid codepoint.
+
+        """
+        decode = self.charEncoding[0].codec_info.decode
+        try:
+            # Decode straight out of memory-mapped files and other objects
+            # exposing a buffer, without copying the bytes first
+            view = memoryview(self.rawStream)
+        except TypeError:
+            if isinstance(self.rawStream, BufferedStream):
+                buffers = []
+                while True:
+                    buffer = self.rawStream.read(65536)
+                    if not buffer:
+                        break
+                    buffers.append(buffer)
+                raw = b"".join(buffers)
+            else:
+                raw = self.rawStream.read()
+            data = decode(raw, 'replace')[0]
+        else:
+            try:
+                data = decode(view[self.rawStream.tell():], 'replace')[0]
+                self.rawStream.seek(len(view))
+            finally:
+                # Don't keep a mapping from being closed
+                view.release()
+        # The encoding is certain, so the raw stream won't be read again
+        self.closeSource()
+
+        if "\r" in data:
+            data = data.replace("\r\n", "\n").replace("\r", "\n")
+
+        chunks = deque()
+        start = 0
+        if self.reportCharacterErrors:
+            for match in invalid_unicode_re.finditer(data):
+                offset = match.start()
+                if offset != start:
+                    chunks.append(data[start:offset])
+                    start = offset
+        if start < len(data):
+            chunks.append(data[start:])
+        return chunks
+
     def openStream(self, source):
         """Produces a file object from source.
 
-        source can be either a file object, local filename or a string.
+        source can be either a file object (including an mmap.mmap), a
+        path-like object naming a local file, which is memory-mapped, or a
+        string.
 
         """
         # Already a file object
         if hasattr(source, 'read'):
             stream = source
+        elif hasattr(source, '__fspath__'):
+            stream = self._ownStream = mapFile(source)
         else:
             stream = BytesIO(source)
 
@@ -448,6 +606,11 @@ class HTMLBinaryInputStream(HTMLUnicodeInputStream):
 
         return stream
 
+    def closeSource(self):
+        if self._ownStream is not None:
+            self._ownStream.close()
+            self._ownStream = None
+
     def determineEncoding(self, chardet=True):
         # BOMs take precedence over everything
         # This will also read past the BOM if present
@@ -575,6 +738,133 @@ class HTMLBinaryInputStream(HTMLUnicodeInputStream):
         return encoding
 
 
+class HTMLFeedInputStream(HTMLUnicodeInputStream):
+    """Provides a unicode stream of characters to the HTMLTokenizer from data
+    that is pushed into it piece by piece with feed().
+
+    When the characters fed so far are used up, char() raises _NeedMoreData
+    rather than returning EOF, and charsUntil() returns what it has found so
+    far. EOF is only reached after close().
+
+    Data can be fed either as text or as bytes. For bytes, the encoding is
+    determined as in HTMLBinaryInputStream once numBytesMeta bytes have
+    arrived (or on close()), and is then fixed: the bytes already decoded are
+    gone, so a later <meta> can't switch to a different encoding.
+
+    """
+
+    # The arguments of HTMLBinaryInputStream besides the source; they only
+    # apply to bytes
+    encodingOptionNames = frozenset(["override_encoding", "transport_encoding",
+                                     "same_origin_parent_encoding", "likely_encoding",
+                                     "default_encoding", "useChardet"])
+
+    def __init__(self, **kwargs):
+        for name in kwargs:
+            if name not in self.encodingOptionNames:
+                raise TypeError("__init__() got an unexpected keyword argument '%s'" % name)
+        self.encodingOptions = kwargs
+        HTMLUnicodeInputStream.__init__(self, "")
+        self.numBytesMeta = 1024
+        self.closed = False
+        self._isUnicode = None
+        self._rawBuffer = []
+        self._decoder = None
+        self._partial = False
+
+    def feed(self, data):
+        assert not self.closed
+        if isinstance(data, text_type):
+            if self._isUnicode is None:
+                encodings = [x for x in self.encodingOptions if x.endswith("_encoding")]
+                if encodings:
+                    raise TypeError("Cannot set an encoding with a unicode input, set %r" % encodings)
+                if self.encodingOptions:
+                    raise TypeError("Cannot use %r with a unicode input" % sorted(self.encodingOptions))
+                self._isUnicode = True
+            elif not self._isUnicode:
+                raise TypeError("Cannot feed text after feeding bytes")
+            self._appendText(data)
+        else:
+            if self._isUnicode is None:
+                self._isUnicode = False
+            elif self._isUnicode:
+                raise TypeError("Cannot feed bytes after feeding text")
+            if self._decoder is not None:
+                self._appendText(self._decoder.decode(data))
+            else:
+                self._rawBuffer.append(data)
+                if sum(len(buffer) for buffer in self._rawBuffer) >= self.numBytesMeta:
+                    self._startDecoding()
+
+    def close(self):
+        if not self._isUnicode:
+            if self._decoder is None:
+                self._startDecoding()
+            text = self._decoder.decode(b"", True)
+        else:
+            text = ""
+        self.closed = True
+        self._appendText(text)
+
+    def _startDecoding(self):
+        raw = b"".join(self._rawBuffer)
+        self._rawBuffer = None
+        # Sniff the encoding of what we have so far exactly as if it was the
+        # whole document
+        sniffer = HTMLBinaryInputStream(raw, **self.encodingOptions)
+        self.charEncoding = sniffer.charEncoding
+        bomLength = sniffer.rawStream.tell()
+        self._decoder = self.charEncoding[0].codec_info.incrementaldecoder('replace')
+        self._appendText(self._decoder.decode(raw[bomLength:]))
+
+    def _appendText(self, data):
+        if self._bufferedCharacter:
+            data = self._bufferedCharacter + data
+            self._bufferedCharacter = None
+
+        if data and not self.closed:
+            lastv = ord(data[-1])
+            if lastv == 0x0D or 0xD800 <= lastv <= 0xDBFF:
+                self._bufferedCharacter = data[-1]
+                data = data[:-1]
+
+        if not data:
+            return
+
+        if self.reportCharacterErrors:
+            self.reportCharacterErrors(data)
+
+        data = data.replace("\r\n", "\n")
+        data = data.replace("\r", "\n")
+
+        # Drop what has been consumed and start a new chunk with the rest
+        self._startNewChunk(self.chunkOffset)
+        self.chunk = self.chunk[self.chunkOffset:] + data
+        self.chunkSize = len(self.chunk)
+        self.chunkOffset = 0
+
+    def readChunk(self, chunkSize=None):
+        if not self.closed:
+            if not self._partial:
+                raise _NeedMoreData()
+            # Let charsUntil return what it has matched so far
+            self.chunkOffset = self.chunkSize
+            return False
+        # Everything has been fed and merged into the current chunk
+        return HTMLUnicodeInputStream.readChunk(self, chunkSize)
+
+    def charsUntil(self, characters, opposite=False):
+        self._partial = True
+        try:
+            return HTMLUnicodeInputStream.charsUntil(self, characters, opposite)
+        finally:
+            self._partial = False
+
+    def changeEncoding(self, newEncoding):
+        self.charEncoding = (self.charEncoding[0], "certain")
+
+
 class EncodingBytes(bytes):
     """String-like object with an associated position and various extra methods
     If the position is ever greater than the string length then an exception is
@@ -0,0 +1,180 @@
+"""Parsing a document into a stream of events
+
+See :py:func:`html5lib.iterparse`.
+
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+from six import text_type, binary_type
+
+from .html5parser import HTMLParser
+from .treebuilders import etree
+from ._utils import default_etree
+
+#: Number of bytes (or characters) read at a time from a file-like source
+readSize = 65536
+
+eventNames = frozenset(("start", "end", "text"))
+
+_etree = etree.getETreeModule(default_etree)
+
+
+class OpenElements(etree.OpenElements):
+    """A stack of open elements that tells the treebuilder about the
+    elements pushed onto and taken off it"""
+
+    def __init__(self, tree):
+        etree.OpenElements.__init__(self)
+        self.tree = tree
+
+    def append(self, node):
+        self.tree.elementStarted(node)
+        etree.OpenElements.append(self, node)
+
+    def insert(self, index, node):
+        self.tree.elementStarted(node)
+        etree.OpenElements.insert(self, index, node)
+
+    def __setitem__(self, index, node):
+        etree.OpenElements.__setitem__(self, index, node)
+        self.tree.elementStarted(node)
+
+    def elementClosed(self, node):
+        self.tree.elementEnded(node)
+        etree.OpenElements.elementClosed(self, node)
+
+
+class TreeBuilder(_etree.TreeBuilder):
+    """An etree treebuilder that records start, end and text events
+
+    The caller sets ``reportEvents`` to the events it wants and takes them
+    from ``pendingEvents`` after every token.
+
+    """
+    def __init__(self, namespaceHTMLElements):
+        self.reportEvents = eventNames
+        self.pendingEvents = []
+        _etree.TreeBuilder.__init__(self, namespaceHTMLElements)
+
+    def reset(self):
+        _etree.TreeBuilder.reset(self)
+        self.openElements = OpenElements(self)
+        del self.pendingEvents[:]
+
+    def elementStarted(self, node):
+        # The head element is pushed back onto the stack for a moment when
+        # a head element appears after </head>; it has already been reported
+        if not node._closed and "start" in self.reportEvents:
+            self.pendingEvents.append(("start", node._element))
+
+    def elementEnded(self, node):
+        # Called before the stack marks the node as closed
+        if not node._closed and "end" in self.reportEvents:
+            self.pendingEvents.append(("end", node._element))
+
+    def insertText(self, data, parent=None):
+        if "text" in self.reportEvents:
+            self.pendingEvents.append(("text", data))
+        _etree.TreeBuilder.insertText(self, data, parent)
+
+
+def iterparse(source, events=("start", "end", "text"), namespaceHTMLElements=True,
+              **kwargs):
+    """Parse an HTML document into a stream of events
+
+    The document goes through the full tree construction algorithm, and
+    each element is reported when it is put on and taken off the stack of
+    open elements. Elements are ElementTree elements and are part of a tree
+    as usual, but html5lib keeps no references of its own to closed elements,
+    so calling ``clear()`` on an element once its ``"end"`` event has been
+    handled keeps memory use down for large documents, much like with
+    :py:func:`xml.etree.ElementTree.iterparse`.
+
+    :arg source: the document to parse as a string, a file-like object or a
+        path-like object naming a file, which is read a piece at a time
+
+    :arg events: the events to report, out of:
+
+        * ``"start"`` - an element has been opened; its attributes are
+          known, its content is not
+        * ``"end"`` - an element has been closed; everything inside it has
+          been parsed, although text that follows it may still be added to
+          its ``tail``
+        * ``"text"`` - text has been added to the tree; this is reported
+          with the text rather than an element
+
+    :arg namespaceHTMLElements: whether or not to namespace HTML elements
+
+    :returns: an iterator of ``(event, element)`` pairs, or ``("text",
+        data)`` pairs for text
+
+    Keyword arguments such as ``transport_encoding`` are passed on as for
+    :py:func:`~html5lib.html5parser.parse`. As the document is read in
+    pieces, its encoding is decided from the first 1024 bytes and a
+    ``<meta>`` element after that can't change it.
+
+    Example:
+
+    >>> from html5lib import iterparse
+    >>> for event, element in iterparse('<p><a href="a.html">a</a></p>', ["end"]):
+    ...     if element.tag == "{http://www.w3.org/1999/xhtml}a":
+    ...         print(element.get("href"))
+    ...     element.clear()
+    a.html
+
+    """
+    events = frozenset(events)
+    unknown = events - eventNames
+    if unknown:
+        raise ValueError("Unknown iterparse events: %s" % ", ".join(sorted(unknown)))
+    return _iterparse(source, events, namespaceHTMLElements, kwargs)
+
+
+def _iterparse(source, events, namespaceHTMLElements, kwargs):
+    p = HTMLParser(TreeBuilder, namespaceHTMLElements=namespaceHTMLElements)
+    tree = p.tree
+    tree.reportEvents = events
+    p._startFeeding(**kwargs)
+    tokenizer = p.tokenizer
+    pending = tree.pendingEvents
+
+    # Tokens are passed to the parser one at a time so that the events of
+    # each are handed out before the next one is processed
+    for data in _readSource(source):
+        for token in tokenizer.feed(data):
+            p.processTokens((token,))
+            if pending:
+                for event in pending:
+                    yield event
+                del pending[:]
+
+    p._feeding = False
+    for token in tokenizer.close():
+        p.processTokens((token,))
+        if pending:
+            for event in pending:
+                yield event
+            del pending[:]
+    p.processEOF()
+
+    # Whatever is still open at the end of the document ends with it
+    while tree.openElements:
+        tree.openElements.pop()
+    for event in pending:
+        yield event
+    del pending[:]
+
+
+def _readSource(source):
+    if isinstance(source, (text_type, binary_type)):
+        yield source
+    elif hasattr(source, "read"):
+        while True:
+            data = source.read(readSize)
+            if not data:
+                break
+            yield data
+    else:
+        with open(source, "rb") as fp:
+            for data in _readSource(fp):
+                yield data
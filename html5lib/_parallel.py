@@ -0,0 +1,168 @@
+"""Parsing many documents in worker processes or threads
+
+This module uses :py:mod:`concurrent.futures` and so is only imported on
+Python 3; see :py:func:`html5lib.parse_many`.
+
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from itertools import islice
+
+from . import treebuilders
+from .html5parser import HTMLParser, ParserPool
+from .serializer import serialize as serializeTree
+
+# The parsers kept by a worker process, by treebuilder and namespacing, so
+# that each document doesn't pay for setting one up
+_workerParsers = {}
+
+
+def parse_many(sources, treebuilder="etree", namespaceHTMLElements=True,
+               workers=None, chunksize=1, ordered=True, maxPending=None,
+               serialize=False, callback=None, threads=False, **kwargs):
+    """Parse many HTML documents in a pool of worker processes or threads
+
+    Documents are handed out to a :py:class:`~concurrent.futures.ProcessPoolExecutor`
+    ``chunksize`` at a time. Every worker keeps an
+    :py:class:`~html5lib.html5parser.HTMLParser` around and reuses it for
+    all the documents it is given.
+
+    With ``threads``, a :py:class:`~concurrent.futures.ThreadPoolExecutor`
+    and a :py:class:`~html5lib.html5parser.ParserPool` are used instead.
+    This only runs documents in parallel on a free-threaded build of
+    CPython, but saves sending documents and results between processes, and
+    neither the trees nor ``callback`` need to be picklable.
+
+    :arg sources: an iterable of documents, each as text, as bytes or as a
+        path-like object naming a file, which is then read by the worker. It
+        is read lazily, so it can be a generator over a large corpus.
+
+    :arg treebuilder: the treebuilder to use when parsing, by name
+
+    :arg namespaceHTMLElements: whether or not to namespace HTML elements
+
+    :arg workers: the number of worker processes or threads, by default the
+        number of processors on the machine
+
+    :arg chunksize: the number of documents sent to a worker at a time;
+        larger chunks cut down on the overhead of talking to the workers
+        when documents are small
+
+    :arg ordered: if true, the results come back in the order of
+        ``sources``; otherwise each result comes back as soon as its chunk
+        is done
+
+    :arg maxPending: the most chunks that are sent to the workers and not
+        yet handed back, by default twice the number of workers. Reading
+        ``sources`` stops while that many are pending, so a slow consumer
+        doesn't end up with the whole corpus in memory.
+
+    :arg serialize: if true, each tree is serialized with
+        :py:func:`~html5lib.serializer.serialize` in the worker and the
+        resulting string comes back instead of the tree
+
+    :arg callback: a function called in the worker with each tree (or
+        string, when ``serialize`` is true), whose return value comes back
+        instead. It has to be picklable, so a function defined at the top
+        level of a module, unless ``threads`` is true.
+
+    :arg threads: whether to parse in threads rather than processes
+
+    :returns: an iterator over the results. Without ``serialize`` or
+        ``callback`` these are the trees themselves, which have to be
+        picklable to come back from the workers; this is the case for
+        ``"etree"`` trees but not for ``"lxml"`` ones.
+
+    Keyword arguments such as ``useChardet`` are passed on to
+    :py:meth:`~html5lib.html5parser.HTMLParser.parse`. An exception raised
+    in a worker, such as for a file that can't be read, is raised again from
+    the iterator.
+
+    Example:
+
+    >>> import glob
+    >>> from html5lib import parse_many
+    >>> for html in parse_many(glob.glob("corpus/*.html"), serialize=True):
+    ...     print(len(html))
+
+    """
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+    if threads:
+        executorClass = ThreadPoolExecutor
+        pool = ParserPool(treebuilder, namespaceHTMLElements=namespaceHTMLElements)
+    else:
+        executorClass = ProcessPoolExecutor
+        pool = None
+    options = (treebuilder, namespaceHTMLElements,
+               tuple(sorted(kwargs.items())), serialize, callback, pool)
+    return _parseMany(iter(sources), executorClass, options, workers, chunksize,
+                      ordered, maxPending)
+
+
+def _parseMany(sources, executorClass, options, workers, chunksize, ordered, maxPending):
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if maxPending is None:
+        maxPending = 2 * workers
+    with executorClass(workers) as executor:
+        pending = deque()
+        try:
+            for chunk in iter(lambda: list(islice(sources, chunksize)), []):
+                pending.append(executor.submit(_parseChunk, options, chunk))
+                if len(pending) >= maxPending:
+                    for result in _nextResults(pending, ordered):
+                        yield result
+            while pending:
+                for result in _nextResults(pending, ordered):
+                    yield result
+        finally:
+            # Whatever hasn't started yet isn't wanted any more if the caller
+            # stops early or a document fails
+            for future in pending:
+                future.cancel()
+
+
+def _nextResults(pending, ordered):
+    if ordered:
+        future = pending.popleft()
+    else:
+        future = next(iter(wait(pending, return_when=FIRST_COMPLETED).done))
+        pending.remove(future)
+    return future.result()
+
+
+def _parseChunk(options, chunk):
+    treebuilder, namespaceHTMLElements, kwargs, serialize, callback, pool = options
+    if pool is None:
+        key = (treebuilder, namespaceHTMLElements)
+        parser = _workerParsers.get(key)
+        if parser is None:
+            tb = treebuilders.getTreeBuilder(treebuilder)
+            parser = _workerParsers[key] = HTMLParser(
+                tb, namespaceHTMLElements=namespaceHTMLElements)
+        parse = parser.parse
+    else:
+        # Threads share the pool, which gives each a parser of its own
+        parser = None
+        parse = pool.parse
+    kwargs = dict(kwargs)
+
+    results = []
+    for source in chunk:
+        try:
+            result = parse(source, **kwargs)
+        finally:
+            # The worker's parser is kept until the next chunk, which must not
+            # keep this document alive meanwhile
+            if parser is not None:
+                parser._releaseDocument()
+        if serialize:
+            result = serializeTree(result, tree=treebuilder)
+        if callback is not None:
+            result = callback(result)
+        results.append(result)
+    return results
@@ -4,6 +4,7 @@ from six import unichr as chr
 
 from collections import deque, OrderedDict
 from sys import version_info
+import re
 
 from .constants import spaceCharacters
 from .constants import entities
@@ -11,18 +12,73 @@ from .constants import asciiLetters, asciiUpper2Lower
 from .constants import digits, hexDigits, EOF
 from .constants import tokenTypes, tagTokenTypes
 from .constants import replacementCharacters
+from .constants import _NeedMoreData
 
-from ._inputstream import HTMLInputStream
+from ._inputstream import HTMLInputStream, HTMLFeedInputStream
+from ._tokens import CompactTokenFactory, DictTokenFactory
 
-from ._trie import Trie
+from ._trie import DFA
 
-entitiesTrie = Trie(entities)
+entitiesDFA = DFA(entities)
+
+# Runs of characters that the tag name, attribute name and attribute value
+# states consume without any further processing; everything else (and the end
+# of the current chunk) goes through the per-character state logic.
+tagNameRun = re.compile(r"[^\t\n\f\r />\x00]+")
+attributeNameRun = re.compile(r"""[^\t\n\f\r />=\x00"'<]+""")
+attributeValueDoubleQuotedRun = re.compile(r'[^"&\x00]+')
+attributeValueSingleQuotedRun = re.compile(r"[^'&\x00]+")
+attributeValueUnQuotedRun = re.compile(r"""[^\t\n\f\r &>"'=<`\x00]+""")
 
 if version_info >= (3, 7):
     attributeMap = dict
 else:
     attributeMap = OrderedDict
 
+_Characters = tokenTypes["Characters"]
+_SpaceCharacters = tokenTypes["SpaceCharacters"]
+
+
+def coalesceCharacterTokens(tokens):
+    """Merge runs of adjacent Characters tokens, and runs of adjacent
+    SpaceCharacters tokens, in a token stream
+
+    A U+0000 NULL token is left on its own, as the tree construction stage
+    drops or replaces exactly those tokens. A None in the stream marks a point
+    where the tokenizer is about to look at the parser's state, so the pending
+    run is emitted there and the None dropped.
+
+    """
+    run = None
+    for token in tokens:
+        if token is None:
+            if run:
+                yield _mergeRun(run)
+                run = None
+            continue
+        type = token["type"]
+        if (type == _Characters or type == _SpaceCharacters) and token["data"] != "\u0000":
+            if run and run[0]["type"] == type:
+                run.append(token)
+                continue
+            if run:
+                yield _mergeRun(run)
+            run = [token]
+        else:
+            if run:
+                yield _mergeRun(run)
+                run = None
+            yield token
+    if run:
+        yield _mergeRun(run)
+
+
+def _mergeRun(run):
+    token = run[0]
+    if len(run) > 1:
+        token["data"] = "".join([other["data"] for other in run])
+    return token
+
 
 class HTMLTokenizer(object):
     """ This class takes care of tokenizing HTML.
@@ -35,12 +91,35 @@ class HTMLTokenizer(object):
 
     * self.stream
       Points to HTMLInputStream object.
+
+    * self.tokenFactory
+      Creates the emitted tokens; plain dicts by default, or the compact
+      ``__slots__`` objects from :py:mod:`html5lib._tokens` when the
+      tokenizer is created with ``compactTokens=True``.
+
+    * self.coalesceCharacters
+      Whether runs of adjacent Characters tokens, and runs of adjacent
+      SpaceCharacters tokens, are merged into one token each before they are
+      emitted. The pending run is handed over before the tokenizer looks at
+      the parser's current node to decide whether ``<![CDATA[`` starts a
+      CDATA section, so the tree construction stage gives the same result
+      either way, but parse errors it reports about merged text are given the
+      position at the end of the run.
+
+    Passing None as the stream creates a tokenizer that is given its input
+    incrementally through feed() and close() instead of being iterated over.
     """
 
-    def __init__(self, stream, parser=None, **kwargs):
+    def __init__(self, stream, parser=None, compactTokens=False, coalesceCharacters=False,
+                 **kwargs):
 
-        self.stream = HTMLInputStream(stream, **kwargs)
+        if stream is None:
+            self.stream = HTMLFeedInputStream(**kwargs)
+        else:
+            self.stream = HTMLInputStream(stream, **kwargs)
         self.parser = parser
+        self.tokenFactory = CompactTokenFactory if compactTokens else DictTokenFactory
+        self.coalesceCharacters = coalesceCharacters
 
         # Setup the initial tokenizer state
         self.escapeFlag = False
@@ -53,6 +132,12 @@ class HTMLTokenizer(object):
         super(HTMLTokenizer, self).__init__()
 
     def __iter__(self):
+        tokens = self._iter()
+        if self.coalesceCharacters:
+            tokens = coalesceCharacterTokens(tokens)
+        return tokens
+
+    def _iter(self):
         """ This is where the magic happens.
 
         We do our usually processing through the states and when we have a token
@@ -62,16 +147,87 @@ class HTMLTokenizer(object):
         self.tokenQueue = deque([])
         # Start processing. When EOF is reached self.state will return False
         # instead of True and the loop will terminate.
-        while self.state():
-            while self.stream.errors:
-                yield {"type": tokenTypes["ParseError"], "data": self.stream.errors.pop(0)}
+        stream = self.stream
+        coalesce = self.coalesceCharacters
+        while True:
+            if coalesce and self.state == self.markupDeclarationOpenState:
+                # Let the pending text through before the state looks at
+                # the parser's current node
+                yield None
+            if not self.state():
+                break
+            if stream.errors:
+                # Take the whole list at once; popping from its front would
+                # be quadratic in the number of errors
+                errors = stream.errors
+                stream.errors = []
+                for error in errors:
+                    yield self.tokenFactory.ParseError(error)
             while self.tokenQueue:
                 yield self.tokenQueue.popleft()
 
+    def feed(self, data):
+        """Adds data to the input of a tokenizer created without a stream
+
+        Returns an iterator over the tokens that can be completed with the
+        input fed so far, which must be exhausted before feeding more data.
+        Parsing stops just before a state that runs out of input (in the
+        middle of a tag name or character reference, say) and that state is
+        retried from the same place on the next call.
+
+        """
+        self.stream.feed(data)
+        return self._fed()
+
+    def close(self):
+        """Marks the end of the input of a tokenizer created without a stream
+
+        Returns an iterator over the remaining tokens.
+
+        """
+        self.stream.close()
+        return self._fed()
+
+    def _fed(self):
+        tokens = self._iterFed()
+        if self.coalesceCharacters:
+            tokens = coalesceCharacterTokens(tokens)
+        return tokens
+
+    def _iterFed(self):
+        if not hasattr(self, "tokenQueue"):
+            self.tokenQueue = deque([])
+        stream = self.stream
+        tokenQueue = self.tokenQueue
+        coalesce = self.coalesceCharacters
+        while True:
+            # Everything a state reads happens before it changes anything, so
+            # running out of data can be undone by rewinding the stream
+            state = self.state
+            if coalesce and state == self.markupDeclarationOpenState:
+                yield None
+            chunkOffset = stream.chunkOffset
+            try:
+                more = state()
+            except _NeedMoreData:
+                self.state = state
+                stream.chunkOffset = chunkOffset
+                tokenQueue.clear()
+                return
+            if stream.errors:
+                errors = stream.errors
+                stream.errors = []
+                for error in errors:
+                    yield self.tokenFactory.ParseError(error)
+            while tokenQueue:
+                yield tokenQueue.popleft()
+            if not more:
+                return
+
     def consumeNumberEntity(self, isHex):
         """This function returns either U+FFFD or the character based on the
         decimal or hexadecimal representation. It also discards ";" if present.
-        If not present self.tokenQueue.append({"type": tokenTypes["ParseError"]}) is invoked.
+        If not present a ParseError token is queued.
         """
 
         allowed = digits
@@ -95,15 +251,13 @@ class HTMLTokenizer(object):
         # Certain characters get replaced with others
         if charAsInt in replacementCharacters:
             char = replacementCharacters[charAsInt]
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "illegal-codepoint-for-numeric-entity",
-                                    "datavars": {"charAsInt": charAsInt}})
+            self.tokenQueue.append(self.tokenFactory.ParseError(
+                "illegal-codepoint-for-numeric-entity", {"charAsInt": charAsInt}))
         elif ((0xD800 <= charAsInt <= 0xDFFF) or
               (charAsInt > 0x10FFFF)):
             char = "\uFFFD"
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "illegal-codepoint-for-numeric-entity",
-                                    "datavars": {"charAsInt": charAsInt}})
+            self.tokenQueue.append(self.tokenFactory.ParseError(
+                "illegal-codepoint-for-numeric-entity", {"charAsInt": charAsInt}))
         else:
             # Should speed up this check somehow (e.g. move the set to a constant)
             if ((0x0001 <= charAsInt <= 0x0008) or
@@ -119,10 +273,8 @@ class HTMLTokenizer(object):
                                         0xBFFFF, 0xCFFFE, 0xCFFFF, 0xDFFFE,
                                         0xDFFFF, 0xEFFFE, 0xEFFFF, 0xFFFFE,
                                         0xFFFFF, 0x10FFFE, 0x10FFFF])):
-                self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                        "data":
-                                        "illegal-codepoint-for-numeric-entity",
-                                        "datavars": {"charAsInt": charAsInt}})
+                self.tokenQueue.append(self.tokenFactory.ParseError(
+                    "illegal-codepoint-for-numeric-entity", {"charAsInt": charAsInt}))
             try:
                 # Try/except needed as UCS-2 Python builds' unichar only works
                 # within the BMP.
@@ -134,8 +286,8 @@ class HTMLTokenizer(object):
         # Discard the ; if present. Otherwise, put it back on the queue and
         # invoke parseError on parser.
         if c != ";":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "numeric-entity-without-semicolon"})
+            self.tokenQueue.append(self.tokenFactory.ParseError(
+                "numeric-entity-without-semicolon"))
             self.stream.unget(c)
 
         return char
@@ -165,8 +317,7 @@ class HTMLTokenizer(object):
                 output = self.consumeNumberEntity(hex)
             else:
                 # No digits found
-                self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                        "data": "expected-numeric-entity"})
+                self.tokenQueue.append(self.tokenFactory.ParseError("expected-numeric-entity"))
                 self.stream.unget(charStack.pop())
                 output = "&" + "".join(charStack)
 
@@ -174,27 +325,27 @@ class HTMLTokenizer(object):
             # At this point in the process might have named entity. Entities
             # are stored in the global variable "entities".
             #
-            # Consume characters and compare to these to a substring of the
-            # entity names in the list until the substring no longer matches.
+            # Consume characters, running them through the automaton built
+            # from the entity names, until they no longer lead to any entity.
+            # Along the way remember the longest entity matched, to take care
+            # of &noti for instance.
+            transitions = entitiesDFA.transitions
+            matches = entitiesDFA.matches
+            state = 0
+            entityName = None
             while (charStack[-1] is not EOF):
-                if not entitiesTrie.has_keys_with_prefix("".join(charStack)):
+                state = transitions.get(state + ord(charStack[-1]))
+                if state is None:
                     break
+                if state in matches:
+                    entityName = matches[state]
+                    entityLength = len(entityName)
                 charStack.append(self.stream.char())
 
-            # At this point we have a string that starts with some characters
-            # that may match an entity
-            # Try to find the longest entity the string will match to take care
-            # of &noti for instance.
-            try:
-                entityName = entitiesTrie.longest_prefix("".join(charStack[:-1]))
-                entityLength = len(entityName)
-            except KeyError:
-                entityName = None
-
             if entityName is not None:
                 if entityName[-1] != ";":
-                    self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                            "named-entity-without-semicolon"})
+                    self.tokenQueue.append(self.tokenFactory.ParseError(
+                        "named-entity-without-semicolon"))
                 if (entityName[-1] != ";" and fromAttribute and
                     (charStack[entityLength] in asciiLetters or
                      charStack[entityLength] in digits or
@@ -206,8 +357,7 @@ class HTMLTokenizer(object):
                     self.stream.unget(charStack.pop())
                     output += "".join(charStack[entityLength:])
             else:
-                self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                        "expected-named-entity"})
+                self.tokenQueue.append(self.tokenFactory.ParseError("expected-named-entity"))
                 self.stream.unget(charStack.pop())
                 output = "&" + "".join(charStack)
 
@@ -218,7 +368,7 @@ class HTMLTokenizer(object):
                 tokenType = "SpaceCharacters"
             else:
                 tokenType = "Characters"
-            self.tokenQueue.append({"type": tokenTypes[tokenType], "data": output})
+            self.tokenQueue.append(getattr(self.tokenFactory, tokenType)(output))
 
     def processEntityInAttribute(self, allowedChar):
         """This method replaces the need for "entityInAttributeValueState".
@@ -231,10 +381,11 @@ class HTMLTokenizer(object):
         emitted.
         """
         token = self.currentToken
+        type = token["type"]
         # Add token to the queue to be yielded
-        if (token["type"] in tagTokenTypes):
+        if (type in tagTokenTypes):
             token["name"] = token["name"].translate(asciiUpper2Lower)
-            if token["type"] == tokenTypes["StartTag"]:
+            if type == tokenTypes["StartTag"]:
                 raw = token["data"]
                 data = attributeMap(raw)
                 if len(raw) > len(data):
@@ -242,13 +393,12 @@ class HTMLTokenizer(object):
                     data.update(raw[::-1])
                 token["data"] = data
 
-            if token["type"] == tokenTypes["EndTag"]:
+            elif type == tokenTypes["EndTag"]:
                 if token["data"]:
-                    self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                            "data": "attributes-in-end-tag"})
+                    self.tokenQueue.append(self.tokenFactory.ParseError("attributes-in-end-tag"))
                 if token["selfClosing"]:
-                    self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                            "data": "self-closing-flag-on-end-tag"})
+                    self.tokenQueue.append(self.tokenFactory.ParseError(
+                        "self-closing-flag-on-end-tag"))
         self.tokenQueue.append(token)
         self.state = self.dataState
 
@@ -260,10 +410,8 @@ class HTMLTokenizer(object):
         elif data == "<":
             self.state = self.tagOpenState
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
-            self.tokenQueue.append({"type": tokenTypes["Characters"],
-                                    "data": "\u0000"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
+            self.tokenQueue.append(self.tokenFactory.Characters("\u0000"))
         elif data is EOF:
             # Tokenization ends.
             return False
@@ -271,15 +419,14 @@ class HTMLTokenizer(object):
             # Directly after emitting a token you switch back to the "data
             # state". At that point spaceCharacters are important so they are
             # emitted separately.
-            self.tokenQueue.append({"type": tokenTypes["SpaceCharacters"], "data":
-                                    data + self.stream.charsUntil(spaceCharacters, True)})
+            self.tokenQueue.append(self.tokenFactory.SpaceCharacters(
+                data + self.stream.charsUntil(spaceCharacters, True)))
             # No need to update lastFourChars here, since the first space will
             # have already been appended to lastFourChars and will have broken
             # any <!-- or --> sequences
         else:
             chars = self.stream.charsUntil(("&", "<", "\u0000"))
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data":
-                                    data + chars})
+            self.tokenQueue.append(self.tokenFactory.Characters(data + chars))
         return True
 
     def entityDataState(self):
@@ -297,23 +444,20 @@ class HTMLTokenizer(object):
             # Tokenization ends.
             return False
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
-            self.tokenQueue.append({"type": tokenTypes["Characters"],
-                                    "data": "\uFFFD"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
+            self.tokenQueue.append(self.tokenFactory.Characters("\uFFFD"))
         elif data in spaceCharacters:
             # Directly after emitting a token you switch back to the "data
             # state". At that point spaceCharacters are important so they are
             # emitted separately.
-            self.tokenQueue.append({"type": tokenTypes["SpaceCharacters"], "data":
-                                    data + self.stream.charsUntil(spaceCharacters, True)})
+            self.tokenQueue.append(self.tokenFactory.SpaceCharacters(
+                data + self.stream.charsUntil(spaceCharacters, True)))
             # No need to update lastFourChars here, since the first space will
             # have already been appended to lastFourChars and will have broken
             # any <!-- or --> sequences
         else:
             chars = self.stream.charsUntil(("&", "<", "\u0000"))
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data":
-                                    data + chars})
+            self.tokenQueue.append(self.tokenFactory.Characters(data + chars))
         return True
 
     def characterReferenceInRcdata(self):
@@ -326,17 +470,14 @@ class HTMLTokenizer(object):
         if data == "<":
             self.state = self.rawtextLessThanSignState
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
-            self.tokenQueue.append({"type": tokenTypes["Characters"],
-                                    "data": "\uFFFD"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
+            self.tokenQueue.append(self.tokenFactory.Characters("\uFFFD"))
         elif data == EOF:
             # Tokenization ends.
             return False
         else:
             chars = self.stream.charsUntil(("<", "\u0000"))
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data":
-                                    data + chars})
+            self.tokenQueue.append(self.tokenFactory.Characters(data + chars))
         return True
 
     def scriptDataState(self):
@@ -344,17 +485,14 @@ class HTMLTokenizer(object):
         if data == "<":
             self.state = self.scriptDataLessThanSignState
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
-            self.tokenQueue.append({"type": tokenTypes["Characters"],
-                                    "data": "\uFFFD"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
+            self.tokenQueue.append(self.tokenFactory.Characters("\uFFFD"))
         elif data == EOF:
             # Tokenization ends.
             return False
         else:
             chars = self.stream.charsUntil(("<", "\u0000"))
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data":
-                                    data + chars})
+            self.tokenQueue.append(self.tokenFactory.Characters(data + chars))
         return True
 
     def plaintextState(self):
@@ -363,13 +501,11 @@ class HTMLTokenizer(object):
             # Tokenization ends.
             return False
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
-            self.tokenQueue.append({"type": tokenTypes["Characters"],
-                                    "data": "\uFFFD"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
+            self.tokenQueue.append(self.tokenFactory.Characters("\uFFFD"))
         else:
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data":
-                                    data + self.stream.charsUntil("\u0000")})
+            self.tokenQueue.append(self.tokenFactory.Characters(
+                data + self.stream.charsUntil("\u0000")))
         return True
 
     def tagOpenState(self):
@@ -379,30 +515,26 @@ class HTMLTokenizer(object):
         elif data == "/":
             self.state = self.closeTagOpenState
         elif data in asciiLetters:
-            self.currentToken = {"type": tokenTypes["StartTag"],
-                                 "name": data, "data": [],
-                                 "selfClosing": False,
-                                 "selfClosingAcknowledged": False}
+            self.currentToken = self.tokenFactory.StartTag(data)
             self.state = self.tagNameState
         elif data == ">":
             # XXX In theory it could be something besides a tag name. But
             # do we really care?
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "expected-tag-name-but-got-right-bracket"})
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": "<>"})
+            self.tokenQueue.append(self.tokenFactory.ParseError(
+                "expected-tag-name-but-got-right-bracket"))
+            self.tokenQueue.append(self.tokenFactory.Characters("<>"))
             self.state = self.dataState
         elif data == "?":
             # XXX In theory it could be something besides a tag name. But
             # do we really care?
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "expected-tag-name-but-got-question-mark"})
+            self.tokenQueue.append(self.tokenFactory.ParseError(
+                "expected-tag-name-but-got-question-mark"))
             self.stream.unget(data)
             self.state = self.bogusCommentState
         else:
             # XXX
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "expected-tag-name"})
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": "<"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("expected-tag-name"))
+            self.tokenQueue.append(self.tokenFactory.Characters("<"))
             self.stream.unget(data)
             self.state = self.dataState
         return True
@@ -410,23 +542,21 @@ class HTMLTokenizer(object):
     def closeTagOpenState(self):
         data = self.stream.char()
         if data in asciiLetters:
-            self.currentToken = {"type": tokenTypes["EndTag"], "name": data,
-                                 "data": [], "selfClosing": False}
+            self.currentToken = self.tokenFactory.EndTag(data)
             self.state = self.tagNameState
         elif data == ">":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "expected-closing-tag-but-got-right-bracket"})
+            self.tokenQueue.append(self.tokenFactory.ParseError(
+                "expected-closing-tag-but-got-right-bracket"))
             self.state = self.dataState
         elif data is EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "expected-closing-tag-but-got-eof"})
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": "</"})
+            self.tokenQueue.append(self.tokenFactory.ParseError(
+                "expected-closing-tag-but-got-eof"))
+            self.tokenQueue.append(self.tokenFactory.Characters("</"))
             self.state = self.dataState
         else:
             # XXX data can be _'_...
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "expected-closing-tag-but-got-char",
-                                    "datavars": {"data": data}})
+            self.tokenQueue.append(self.tokenFactory.ParseError(
+                "expected-closing-tag-but-got-char", {"data": data}))
             self.stream.unget(data)
             self.state = self.bogusCommentState
         return True
@@ -438,19 +568,15 @@ class HTMLTokenizer(object):
         elif data == ">":
             self.emitCurrentToken()
         elif data is EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "eof-in-tag-name"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("eof-in-tag-name"))
             self.state = self.dataState
         elif data == "/":
             self.state = self.selfClosingStartTagState
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
             self.currentToken["name"] += "\uFFFD"
         else:
-            self.currentToken["name"] += data
-            # (Don't use charsUntil here, because tag names are
-            # very short and it's faster to not do anything fancy)
+            self.currentToken["name"] += data + self.stream.charsMatching(tagNameRun)
         return True
 
     def rcdataLessThanSignState(self):
@@ -459,7 +585,7 @@ class HTMLTokenizer(object):
             self.temporaryBuffer = ""
             self.state = self.rcdataEndTagOpenState
         else:
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": "<"})
+            self.tokenQueue.append(self.tokenFactory.Characters("<"))
             self.stream.unget(data)
             self.state = self.rcdataState
         return True
@@ -470,7 +596,7 @@ class HTMLTokenizer(object):
             self.temporaryBuffer += data
             self.state = self.rcdataEndTagNameState
         else:
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": "</"})
+            self.tokenQueue.append(self.tokenFactory.Characters("</"))
             self.stream.unget(data)
             self.state = self.rcdataState
         return True
@@ -479,26 +605,19 @@ class HTMLTokenizer(object):
         appropriate = self.currentToken and self.currentToken["name"].lower() == self.temporaryBuffer.lower()
         data = self.stream.char()
         if data in spaceCharacters and appropriate:
-            self.currentToken = {"type": tokenTypes["EndTag"],
-                                 "name": self.temporaryBuffer,
-                                 "data": [], "selfClosing": False}
+            self.currentToken = self.tokenFactory.EndTag(self.temporaryBuffer)
             self.state = self.beforeAttributeNameState
         elif data == "/" and appropriate:
-            self.currentToken = {"type": tokenTypes["EndTag"],
-                                 "name": self.temporaryBuffer,
-                                 "data": [], "selfClosing": False}
+            self.currentToken = self.tokenFactory.EndTag(self.temporaryBuffer)
             self.state = self.selfClosingStartTagState
         elif data == ">" and appropriate:
-            self.currentToken = {"type": tokenTypes["EndTag"],
-                                 "name": self.temporaryBuffer,
-                                 "data": [], "selfClosing": False}
+            self.currentToken = self.tokenFactory.EndTag(self.temporaryBuffer)
             self.emitCurrentToken()
             self.state = self.dataState
         elif data in asciiLetters:
             self.temporaryBuffer += data
         else:
-            self.tokenQueue.append({"type": tokenTypes["Characters"],
-                                    "data": "</" + self.temporaryBuffer})
+            self.tokenQueue.append(self.tokenFactory.Characters("</" + self.temporaryBuffer))
             self.stream.unget(data)
             self.state = self.rcdataState
         return True
@@ -509,7 +628,7 @@ class HTMLTokenizer(object):
             self.temporaryBuffer = ""
             self.state = self.rawtextEndTagOpenState
         else:
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": "<"})
+            self.tokenQueue.append(self.tokenFactory.Characters("<"))
             self.stream.unget(data)
             self.state = self.rawtextState
         return True
@@ -520,7 +639,7 @@ class HTMLTokenizer(object):
             self.temporaryBuffer += data
             self.state = self.rawtextEndTagNameState
         else:
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": "</"})
+            self.tokenQueue.append(self.tokenFactory.Characters("</"))
             self.stream.unget(data)
             self.state = self.rawtextState
         return True
@@ -529,26 +648,19 @@ class HTMLTokenizer(object):
         appropriate = self.currentToken and self.currentToken["name"].lower() == self.temporaryBuffer.lower()
         data = self.stream.char()
         if data in spaceCharacters and appropriate:
-            self.currentToken = {"type": tokenTypes["EndTag"],
-                                 "name": self.temporaryBuffer,
-                                 "data": [], "selfClosing": False}
+            self.currentToken = self.tokenFactory.EndTag(self.temporaryBuffer)
             self.state = self.beforeAttributeNameState
         elif data == "/" and appropriate:
-            self.currentToken = {"type": tokenTypes["EndTag"],
-                                 "name": self.temporaryBuffer,
-                                 "data": [], "selfClosing": False}
+            self.currentToken = self.tokenFactory.EndTag(self.temporaryBuffer)
             self.state = self.selfClosingStartTagState
         elif data == ">" and appropriate:
-            self.currentToken = {"type": tokenTypes["EndTag"],
-                                 "name": self.temporaryBuffer,
-                                 "data": [], "selfClosing": False}
+            self.currentToken = self.tokenFactory.EndTag(self.temporaryBuffer)
             self.emitCurrentToken()
             self.state = self.dataState
         elif data in asciiLetters:
             self.temporaryBuffer += data
         else:
-            self.tokenQueue.append({"type": tokenTypes["Characters"],
-                                    "data": "</" + self.temporaryBuffer})
+            self.tokenQueue.append(self.tokenFactory.Characters("</" + self.temporaryBuffer))
             self.stream.unget(data)
             self.state = self.rawtextState
         return True
@@ -559,10 +671,10 @@ class HTMLTokenizer(object):
             self.temporaryBuffer = ""
             self.state = self.scriptDataEndTagOpenState
         elif data == "!":
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": "<!"})
+            self.tokenQueue.append(self.tokenFactory.Characters("<!"))
             self.state = self.scriptDataEscapeStartState
         else:
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": "<"})
+            self.tokenQueue.append(self.tokenFactory.Characters("<"))
             self.stream.unget(data)
             self.state = self.scriptDataState
         return True
@@ -573,7 +685,7 @@ class HTMLTokenizer(object):
             self.temporaryBuffer += data
             self.state = self.scriptDataEndTagNameState
         else:
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": "</"})
+            self.tokenQueue.append(self.tokenFactory.Characters("</"))
             self.stream.unget(data)
             self.state = self.scriptDataState
         return True
@@ -582,26 +694,19 @@ class HTMLTokenizer(object):
         appropriate = self.currentToken and self.currentToken["name"].lower() == self.temporaryBuffer.lower()
         data = self.stream.char()
         if data in spaceCharacters and appropriate:
-            self.currentToken = {"type": tokenTypes["EndTag"],
-                                 "name": self.temporaryBuffer,
-                                 "data": [], "selfClosing": False}
+            self.currentToken = self.tokenFactory.EndTag(self.temporaryBuffer)
             self.state = self.beforeAttributeNameState
         elif data == "/" and appropriate:
-            self.currentToken = {"type": tokenTypes["EndTag"],
-                                 "name": self.temporaryBuffer,
-                                 "data": [], "selfClosing": False}
+            self.currentToken = self.tokenFactory.EndTag(self.temporaryBuffer)
             self.state = self.selfClosingStartTagState
         elif data == ">" and appropriate:
-            self.currentToken = {"type": tokenTypes["EndTag"],
-                                 "name": self.temporaryBuffer,
-                                 "data": [], "selfClosing": False}
+            self.currentToken = self.tokenFactory.EndTag(self.temporaryBuffer)
             self.emitCurrentToken()
             self.state = self.dataState
         elif data in asciiLetters:
             self.temporaryBuffer += data
         else:
-            self.tokenQueue.append({"type": tokenTypes["Characters"],
-                                    "data": "</" + self.temporaryBuffer})
+            self.tokenQueue.append(self.tokenFactory.Characters("</" + self.temporaryBuffer))
             self.stream.unget(data)
             self.state = self.scriptDataState
         return True
@@ -609,7 +714,7 @@ class HTMLTokenizer(object):
     def scriptDataEscapeStartState(self):
         data = self.stream.char()
         if data == "-":
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": "-"})
+            self.tokenQueue.append(self.tokenFactory.Characters("-"))
             self.state = self.scriptDataEscapeStartDashState
         else:
             self.stream.unget(data)
@@ -619,7 +724,7 @@ class HTMLTokenizer(object):
     def scriptDataEscapeStartDashState(self):
         data = self.stream.char()
         if data == "-":
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": "-"})
+            self.tokenQueue.append(self.tokenFactory.Characters("-"))
             self.state = self.scriptDataEscapedDashDashState
         else:
             self.stream.unget(data)
@@ -629,62 +734,55 @@ class HTMLTokenizer(object):
     def scriptDataEscapedState(self):
         data = self.stream.char()
         if data == "-":
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": "-"})
+            self.tokenQueue.append(self.tokenFactory.Characters("-"))
             self.state = self.scriptDataEscapedDashState
         elif data == "<":
             self.state = self.scriptDataEscapedLessThanSignState
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
-            self.tokenQueue.append({"type": tokenTypes["Characters"],
-                                    "data": "\uFFFD"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
+            self.tokenQueue.append(self.tokenFactory.Characters("\uFFFD"))
         elif data == EOF:
             self.state = self.dataState
         else:
             chars = self.stream.charsUntil(("<", "-", "\u0000"))
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data":
-                                    data + chars})
+            self.tokenQueue.append(self.tokenFactory.Characters(data + chars))
         return True
 
     def scriptDataEscapedDashState(self):
         data = self.stream.char()
         if data == "-":
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": "-"})
+            self.tokenQueue.append(self.tokenFactory.Characters("-"))
             self.state = self.scriptDataEscapedDashDashState
         elif data == "<":
             self.state = self.scriptDataEscapedLessThanSignState
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
-            self.tokenQueue.append({"type": tokenTypes["Characters"],
-                                    "data": "\uFFFD"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
+            self.tokenQueue.append(self.tokenFactory.Characters("\uFFFD"))
             self.state = self.scriptDataEscapedState
         elif data == EOF:
             self.state = self.dataState
         else:
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": data})
+            self.tokenQueue.append(self.tokenFactory.Characters(data))
             self.state = self.scriptDataEscapedState
         return True
 
     def scriptDataEscapedDashDashState(self):
         data = self.stream.char()
         if data == "-":
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": "-"})
+            self.tokenQueue.append(self.tokenFactory.Characters("-"))
         elif data == "<":
             self.state = self.scriptDataEscapedLessThanSignState
         elif data == ">":
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": ">"})
+            self.tokenQueue.append(self.tokenFactory.Characters(">"))
             self.state = self.scriptDataState
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
-            self.tokenQueue.append({"type": tokenTypes["Characters"],
-                                    "data": "\uFFFD"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
+            self.tokenQueue.append(self.tokenFactory.Characters("\uFFFD"))
             self.state = self.scriptDataEscapedState
         elif data == EOF:
             self.state = self.dataState
         else:
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": data})
+            self.tokenQueue.append(self.tokenFactory.Characters(data))
             self.state = self.scriptDataEscapedState
         return True
 
@@ -694,11 +792,11 @@ class HTMLTokenizer(object):
             self.temporaryBuffer = ""
             self.state = self.scriptDataEscapedEndTagOpenState
         elif data in asciiLetters:
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": "<" + data})
+            self.tokenQueue.append(self.tokenFactory.Characters("<" + data))
             self.temporaryBuffer = data
             self.state = self.scriptDataDoubleEscapeStartState
         else:
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": "<"})
+            self.tokenQueue.append(self.tokenFactory.Characters("<"))
             self.stream.unget(data)
             self.state = self.scriptDataEscapedState
         return True
@@ -709,7 +807,7 @@ class HTMLTokenizer(object):
             self.temporaryBuffer = data
             self.state = self.scriptDataEscapedEndTagNameState
         else:
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": "</"})
+            self.tokenQueue.append(self.tokenFactory.Characters("</"))
             self.stream.unget(data)
             self.state = self.scriptDataEscapedState
         return True
@@ -718,26 +816,19 @@ class HTMLTokenizer(object):
         appropriate = self.currentToken and self.currentToken["name"].lower() == self.temporaryBuffer.lower()
         data = self.stream.char()
         if data in spaceCharacters and appropriate:
-            self.currentToken = {"type": tokenTypes["EndTag"],
-                                 "name": self.temporaryBuffer,
-                                 "data": [], "selfClosing": False}
+            self.currentToken = self.tokenFactory.EndTag(self.temporaryBuffer)
             self.state = self.beforeAttributeNameState
         elif data == "/" and appropriate:
-            self.currentToken = {"type": tokenTypes["EndTag"],
-                                 "name": self.temporaryBuffer,
-                                 "data": [], "selfClosing": False}
+            self.currentToken = self.tokenFactory.EndTag(self.temporaryBuffer)
             self.state = self.selfClosingStartTagState
         elif data == ">" and appropriate:
-            self.currentToken = {"type": tokenTypes["EndTag"],
-                                 "name": self.temporaryBuffer,
-                                 "data": [], "selfClosing": False}
+            self.currentToken = self.tokenFactory.EndTag(self.temporaryBuffer)
             self.emitCurrentToken()
             self.state = self.dataState
         elif data in asciiLetters:
             self.temporaryBuffer += data
         else:
-            self.tokenQueue.append({"type": tokenTypes["Characters"],
-                                    "data": "</" + self.temporaryBuffer})
+            self.tokenQueue.append(self.tokenFactory.Characters("</" + self.temporaryBuffer))
             self.stream.unget(data)
             self.state = self.scriptDataEscapedState
         return True
@@ -745,13 +836,13 @@ class HTMLTokenizer(object):
     def scriptDataDoubleEscapeStartState(self):
         data = self.stream.char()
         if data in (spaceCharacters | frozenset(("/", ">"))):
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": data})
+            self.tokenQueue.append(self.tokenFactory.Characters(data))
             if self.temporaryBuffer.lower() == "script":
                 self.state = self.scriptDataDoubleEscapedState
             else:
                 self.state = self.scriptDataEscapedState
         elif data in asciiLetters:
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": data})
+            self.tokenQueue.append(self.tokenFactory.Characters(data))
             self.temporaryBuffer += data
         else:
             self.stream.unget(data)
@@ -761,76 +852,67 @@ class HTMLTokenizer(object):
     def scriptDataDoubleEscapedState(self):
         data = self.stream.char()
         if data == "-":
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": "-"})
+            self.tokenQueue.append(self.tokenFactory.Characters("-"))
             self.state = self.scriptDataDoubleEscapedDashState
         elif data == "<":
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": "<"})
+            self.tokenQueue.append(self.tokenFactory.Characters("<"))
             self.state = self.scriptDataDoubleEscapedLessThanSignState
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
-            self.tokenQueue.append({"type": tokenTypes["Characters"],
-                                    "data": "\uFFFD"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
+            self.tokenQueue.append(self.tokenFactory.Characters("\uFFFD"))
         elif data == EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "eof-in-script-in-script"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("eof-in-script-in-script"))
             self.state = self.dataState
         else:
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": data})
+            self.tokenQueue.append(self.tokenFactory.Characters(data))
         return True
 
     def scriptDataDoubleEscapedDashState(self):
         data = self.stream.char()
         if data == "-":
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": "-"})
+            self.tokenQueue.append(self.tokenFactory.Characters("-"))
             self.state = self.scriptDataDoubleEscapedDashDashState
         elif data == "<":
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": "<"})
+            self.tokenQueue.append(self.tokenFactory.Characters("<"))
             self.state = self.scriptDataDoubleEscapedLessThanSignState
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
-            self.tokenQueue.append({"type": tokenTypes["Characters"],
-                                    "data": "\uFFFD"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
+            self.tokenQueue.append(self.tokenFactory.Characters("\uFFFD"))
             self.state = self.scriptDataDoubleEscapedState
         elif data == EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "eof-in-script-in-script"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("eof-in-script-in-script"))
             self.state = self.dataState
         else:
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": data})
+            self.tokenQueue.append(self.tokenFactory.Characters(data))
             self.state = self.scriptDataDoubleEscapedState
         return True
 
     def scriptDataDoubleEscapedDashDashState(self):
         data = self.stream.char()
         if data == "-":
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": "-"})
+            self.tokenQueue.append(self.tokenFactory.Characters("-"))
         elif data == "<":
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": "<"})
+            self.tokenQueue.append(self.tokenFactory.Characters("<"))
             self.state = self.scriptDataDoubleEscapedLessThanSignState
         elif data == ">":
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": ">"})
+            self.tokenQueue.append(self.tokenFactory.Characters(">"))
             self.state = self.scriptDataState
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
-            self.tokenQueue.append({"type": tokenTypes["Characters"],
-                                    "data": "\uFFFD"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
+            self.tokenQueue.append(self.tokenFactory.Characters("\uFFFD"))
             self.state = self.scriptDataDoubleEscapedState
         elif data == EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "eof-in-script-in-script"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("eof-in-script-in-script"))
             self.state = self.dataState
         else:
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": data})
+            self.tokenQueue.append(self.tokenFactory.Characters(data))
             self.state = self.scriptDataDoubleEscapedState
         return True
 
     def scriptDataDoubleEscapedLessThanSignState(self):
         data = self.stream.char()
         if data == "/":
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": "/"})
+            self.tokenQueue.append(self.tokenFactory.Characters("/"))
             self.temporaryBuffer = ""
             self.state = self.scriptDataDoubleEscapeEndState
         else:
@@ -841,13 +923,13 @@ class HTMLTokenizer(object):
     def scriptDataDoubleEscapeEndState(self):
         data = self.stream.char()
         if data in (spaceCharacters | frozenset(("/", ">"))):
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": data})
+            self.tokenQueue.append(self.tokenFactory.Characters(data))
             if self.temporaryBuffer.lower() == "script":
                 self.state = self.scriptDataEscapedState
             else:
                 self.state = self.scriptDataDoubleEscapedState
         elif data in asciiLetters:
-            self.tokenQueue.append({"type": tokenTypes["Characters"], "data": data})
+            self.tokenQueue.append(self.tokenFactory.Characters(data))
             self.temporaryBuffer += data
         else:
             self.stream.unget(data)
@@ -866,18 +948,17 @@ class HTMLTokenizer(object):
         elif data == "/":
             self.state = self.selfClosingStartTagState
         elif data in ("'", '"', "=", "<"):
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "invalid-character-in-attribute-name"})
+            self.tokenQueue.append(self.tokenFactory.ParseError(
+                "invalid-character-in-attribute-name"))
             self.currentToken["data"].append([data, ""])
             self.state = self.attributeNameState
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
             self.currentToken["data"].append(["\uFFFD", ""])
             self.state = self.attributeNameState
         elif data is EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "expected-attribute-name-but-got-eof"})
+            self.tokenQueue.append(self.tokenFactory.ParseError(
+                "expected-attribute-name-but-got-eof"))
             self.state = self.dataState
         else:
             self.currentToken["data"].append([data, ""])
@@ -891,8 +972,7 @@ class HTMLTokenizer(object):
         if data == "=":
             self.state = self.beforeAttributeValueState
         elif data in asciiLetters:
-            self.currentToken["data"][-1][0] += data +\
-                self.stream.charsUntil(asciiLetters, True)
+            self.currentToken["data"][-1][0] += data + self.stream.charsMatching(attributeNameRun)
             leavingThisState = False
         elif data == ">":
             # XXX If we emit here the attributes are converted to a dict
@@ -904,22 +984,19 @@ class HTMLTokenizer(object):
         elif data == "/":
             self.state = self.selfClosingStartTagState
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
             self.currentToken["data"][-1][0] += "\uFFFD"
             leavingThisState = False
         elif data in ("'", '"', "<"):
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data":
-                                    "invalid-character-in-attribute-name"})
+            self.tokenQueue.append(self.tokenFactory.ParseError(
+                "invalid-character-in-attribute-name"))
             self.currentToken["data"][-1][0] += data
             leavingThisState = False
         elif data is EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "eof-in-attribute-name"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("eof-in-attribute-name"))
             self.state = self.dataState
         else:
-            self.currentToken["data"][-1][0] += data
+            self.currentToken["data"][-1][0] += data + self.stream.charsMatching(attributeNameRun)
             leavingThisState = False
 
         if leavingThisState:
@@ -930,8 +1007,7 @@ class HTMLTokenizer(object):
                 self.currentToken["data"][-1][0].translate(asciiUpper2Lower))
             for name, _ in self.currentToken["data"][:-1]:
                 if self.currentToken["data"][-1][0] == name:
-                    self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                            "duplicate-attribute"})
+                    self.tokenQueue.append(self.tokenFactory.ParseError("duplicate-attribute"))
                     break
             # XXX Fix for above XXX
             if emitToken:
@@ -952,18 +1028,16 @@ class HTMLTokenizer(object):
         elif data == "/":
             self.state = self.selfClosingStartTagState
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
             self.currentToken["data"].append(["\uFFFD", ""])
             self.state = self.attributeNameState
         elif data in ("'", '"', "<"):
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "invalid-character-after-attribute-name"})
+            self.tokenQueue.append(self.tokenFactory.ParseError(
+                "invalid-character-after-attribute-name"))
             self.currentToken["data"].append([data, ""])
             self.state = self.attributeNameState
         elif data is EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "expected-end-of-tag-but-got-eof"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("expected-end-of-tag-but-got-eof"))
             self.state = self.dataState
         else:
             self.currentToken["data"].append([data, ""])
@@ -982,22 +1056,21 @@ class HTMLTokenizer(object):
         elif data == "'":
             self.state = self.attributeValueSingleQuotedState
         elif data == ">":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "expected-attribute-value-but-got-right-bracket"})
+            self.tokenQueue.append(self.tokenFactory.ParseError(
+                "expected-attribute-value-but-got-right-bracket"))
             self.emitCurrentToken()
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
             self.currentToken["data"][-1][1] += "\uFFFD"
             self.state = self.attributeValueUnQuotedState
         elif data in ("=", "<", "`"):
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "equals-in-unquoted-attribute-value"})
+            self.tokenQueue.append(self.tokenFactory.ParseError(
+                "equals-in-unquoted-attribute-value"))
             self.currentToken["data"][-1][1] += data
             self.state = self.attributeValueUnQuotedState
         elif data is EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "expected-attribute-value-but-got-eof"})
+            self.tokenQueue.append(self.tokenFactory.ParseError(
+                "expected-attribute-value-but-got-eof"))
             self.state = self.dataState
         else:
             self.currentToken["data"][-1][1] += data
@@ -1011,16 +1084,15 @@ class HTMLTokenizer(object):
         elif data == "&":
             self.processEntityInAttribute('"')
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
             self.currentToken["data"][-1][1] += "\uFFFD"
         elif data is EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "eof-in-attribute-value-double-quote"})
+            self.tokenQueue.append(self.tokenFactory.ParseError(
+                "eof-in-attribute-value-double-quote"))
             self.state = self.dataState
         else:
-            self.currentToken["data"][-1][1] += data +\
-                self.stream.charsUntil(("\"", "&", "\u0000"))
+            self.currentToken["data"][-1][1] += data + self.stream.charsMatching(
+                attributeValueDoubleQuotedRun)
         return True
 
     def attributeValueSingleQuotedState(self):
@@ -1030,16 +1102,15 @@ class HTMLTokenizer(object):
         elif data == "&":
             self.processEntityInAttribute("'")
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
             self.currentToken["data"][-1][1] += "\uFFFD"
         elif data is EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "eof-in-attribute-value-single-quote"})
+            self.tokenQueue.append(self.tokenFactory.ParseError(
+                "eof-in-attribute-value-single-quote"))
             self.state = self.dataState
         else:
-            self.currentToken["data"][-1][1] += data +\
-                self.stream.charsUntil(("'", "&", "\u0000"))
+            self.currentToken["data"][-1][1] += data + self.stream.charsMatching(
+                attributeValueSingleQuotedRun)
         return True
 
     def attributeValueUnQuotedState(self):
@@ -1051,20 +1122,19 @@ class HTMLTokenizer(object):
         elif data == ">":
             self.emitCurrentToken()
         elif data in ('"', "'", "=", "<", "`"):
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "unexpected-character-in-unquoted-attribute-value"})
+            self.tokenQueue.append(self.tokenFactory.ParseError(
+                "unexpected-character-in-unquoted-attribute-value"))
             self.currentToken["data"][-1][1] += data
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
             self.currentToken["data"][-1][1] += "\uFFFD"
         elif data is EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "eof-in-attribute-value-no-quotes"})
+            self.tokenQueue.append(self.tokenFactory.ParseError(
+                "eof-in-attribute-value-no-quotes"))
             self.state = self.dataState
         else:
-            self.currentToken["data"][-1][1] += data + self.stream.charsUntil(
-                frozenset(("&", ">", '"', "'", "=", "<", "`", "\u0000")) | spaceCharacters)
+            self.currentToken["data"][-1][1] += data + self.stream.charsMatching(
+                attributeValueUnQuotedRun)
         return True
 
     def afterAttributeValueState(self):
@@ -1076,13 +1146,13 @@ class HTMLTokenizer(object):
         elif data == "/":
             self.state = self.selfClosingStartTagState
         elif data is EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "unexpected-EOF-after-attribute-value"})
+            self.tokenQueue.append(self.tokenFactory.ParseError(
+                "unexpected-EOF-after-attribute-value"))
             self.stream.unget(data)
             self.state = self.dataState
         else:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "unexpected-character-after-attribute-value"})
+            self.tokenQueue.append(self.tokenFactory.ParseError(
+                "unexpected-character-after-attribute-value"))
             self.stream.unget(data)
             self.state = self.beforeAttributeNameState
         return True
@@ -1093,14 +1163,13 @@ class HTMLTokenizer(object):
             self.currentToken["selfClosing"] = True
             self.emitCurrentToken()
         elif data is EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data":
-                                    "unexpected-EOF-after-solidus-in-tag"})
+            self.tokenQueue.append(self.tokenFactory.ParseError(
+                "unexpected-EOF-after-solidus-in-tag"))
             self.stream.unget(data)
             self.state = self.dataState
         else:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "unexpected-character-after-solidus-in-tag"})
+            self.tokenQueue.append(self.tokenFactory.ParseError(
+                "unexpected-character-after-solidus-in-tag"))
             self.stream.unget(data)
             self.state = self.beforeAttributeNameState
         return True
@@ -1111,8 +1180,7 @@ class HTMLTokenizer(object):
         # and emit it.
         data = self.stream.charsUntil(">")
         data = data.replace("\u0000", "\uFFFD")
-        self.tokenQueue.append(
-            {"type": tokenTypes["Comment"], "data": data})
+        self.tokenQueue.append(self.tokenFactory.Comment(data))
 
         # Eat the character directly after the bogus comment which is either a
         # ">" or an EOF.
@@ -1125,7 +1193,7 @@ class HTMLTokenizer(object):
         if charStack[-1] == "-":
             charStack.append(self.stream.char())
             if charStack[-1] == "-":
-                self.currentToken = {"type": tokenTypes["Comment"], "data": ""}
+                self.currentToken = self.tokenFactory.Comment("")
                 self.state = self.commentStartState
                 return True
         elif charStack[-1] in ('d', 'D'):
@@ -1137,10 +1205,7 @@ class HTMLTokenizer(object):
                     matched = False
                     break
             if matched:
-                self.currentToken = {"type": tokenTypes["Doctype"],
-                                     "name": "",
-                                     "publicId": None, "systemId": None,
-                                     "correct": True}
+                self.currentToken = self.tokenFactory.Doctype()
                 self.state = self.doctypeState
                 return True
         elif (charStack[-1] == "[" and
@@ -1157,8 +1222,7 @@ class HTMLTokenizer(object):
                 self.state = self.cdataSectionState
                 return True
 
-        self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                "expected-dashes-or-doctype"})
+        self.tokenQueue.append(self.tokenFactory.ParseError("expected-dashes-or-doctype"))
 
         while charStack:
             self.stream.unget(charStack.pop())
@@ -1170,17 +1234,14 @@ class HTMLTokenizer(object):
         if data == "-":
             self.state = self.commentStartDashState
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
             self.currentToken["data"] += "\uFFFD"
         elif data == ">":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "incorrect-comment"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("incorrect-comment"))
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
         elif data is EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "eof-in-comment"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("eof-in-comment"))
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
         else:
@@ -1193,17 +1254,14 @@ class HTMLTokenizer(object):
         if data == "-":
             self.state = self.commentEndState
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
             self.currentToken["data"] += "-\uFFFD"
         elif data == ">":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "incorrect-comment"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("incorrect-comment"))
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
         elif data is EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "eof-in-comment"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("eof-in-comment"))
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
         else:
@@ -1216,12 +1274,10 @@ class HTMLTokenizer(object):
         if data == "-":
             self.state = self.commentEndDashState
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
             self.currentToken["data"] += "\uFFFD"
         elif data is EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "eof-in-comment"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("eof-in-comment"))
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
         else:
@@ -1234,13 +1290,11 @@ class HTMLTokenizer(object):
         if data == "-":
             self.state = self.commentEndState
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
             self.currentToken["data"] += "-\uFFFD"
             self.state = self.commentState
         elif data is EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "eof-in-comment-end-dash"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("eof-in-comment-end-dash"))
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
         else:
@@ -1254,27 +1308,24 @@ class HTMLTokenizer(object):
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
             self.currentToken["data"] += "--\uFFFD"
             self.state = self.commentState
         elif data == "!":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "unexpected-bang-after-double-dash-in-comment"})
+            self.tokenQueue.append(self.tokenFactory.ParseError(
+                "unexpected-bang-after-double-dash-in-comment"))
             self.state = self.commentEndBangState
         elif data == "-":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "unexpected-dash-after-double-dash-in-comment"})
+            self.tokenQueue.append(self.tokenFactory.ParseError(
+                "unexpected-dash-after-double-dash-in-comment"))
             self.currentToken["data"] += data
         elif data is EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "eof-in-comment-double-dash"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("eof-in-comment-double-dash"))
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
         else:
             # XXX
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "unexpected-char-in-comment"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("unexpected-char-in-comment"))
             self.currentToken["data"] += "--" + data
             self.state = self.commentState
         return True
@@ -1288,13 +1339,11 @@ class HTMLTokenizer(object):
             self.currentToken["data"] += "--!"
             self.state = self.commentEndDashState
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
             self.currentToken["data"] += "--!\uFFFD"
             self.state = self.commentState
         elif data is EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "eof-in-comment-end-bang-state"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("eof-in-comment-end-bang-state"))
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
         else:
@@ -1307,14 +1356,13 @@ class HTMLTokenizer(object):
         if data in spaceCharacters:
             self.state = self.beforeDoctypeNameState
         elif data is EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "expected-doctype-name-but-got-eof"})
+            self.tokenQueue.append(self.tokenFactory.ParseError(
+                "expected-doctype-name-but-got-eof"))
             self.currentToken["correct"] = False
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
         else:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "need-space-after-doctype"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("need-space-after-doctype"))
             self.stream.unget(data)
             self.state = self.beforeDoctypeNameState
         return True
@@ -1324,19 +1372,18 @@ class HTMLTokenizer(object):
         if data in spaceCharacters:
             pass
         elif data == ">":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "expected-doctype-name-but-got-right-bracket"})
+            self.tokenQueue.append(self.tokenFactory.ParseError(
+                "expected-doctype-name-but-got-right-bracket"))
             self.currentToken["correct"] = False
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
             self.currentToken["name"] = "\uFFFD"
             self.state = self.doctypeNameState
         elif data is EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "expected-doctype-name-but-got-eof"})
+            self.tokenQueue.append(self.tokenFactory.ParseError(
+                "expected-doctype-name-but-got-eof"))
             self.currentToken["correct"] = False
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
@@ -1355,13 +1402,11 @@ class HTMLTokenizer(object):
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
             self.currentToken["name"] += "\uFFFD"
             self.state = self.doctypeNameState
         elif data is EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "eof-in-doctype-name"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("eof-in-doctype-name"))
             self.currentToken["correct"] = False
             self.currentToken["name"] = self.currentToken["name"].translate(asciiUpper2Lower)
             self.tokenQueue.append(self.currentToken)
@@ -1380,8 +1425,7 @@ class HTMLTokenizer(object):
         elif data is EOF:
             self.currentToken["correct"] = False
             self.stream.unget(data)
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "eof-in-doctype"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("eof-in-doctype"))
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
         else:
@@ -1413,9 +1457,8 @@ class HTMLTokenizer(object):
             # discarded; only the latest character might be '>' or EOF
             # and needs to be ungetted
             self.stream.unget(data)
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "expected-space-or-right-bracket-in-doctype", "datavars":
-                                    {"data": data}})
+            self.tokenQueue.append(self.tokenFactory.ParseError(
+                "expected-space-or-right-bracket-in-doctype", {"data": data}))
             self.currentToken["correct"] = False
             self.state = self.bogusDoctypeState
 
@@ -1426,13 +1469,11 @@ class HTMLTokenizer(object):
         if data in spaceCharacters:
             self.state = self.beforeDoctypePublicIdentifierState
         elif data in ("'", '"'):
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "unexpected-char-in-doctype"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("unexpected-char-in-doctype"))
             self.stream.unget(data)
             self.state = self.beforeDoctypePublicIdentifierState
         elif data is EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "eof-in-doctype"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("eof-in-doctype"))
             self.currentToken["correct"] = False
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
@@ -1452,20 +1493,17 @@ class HTMLTokenizer(object):
             self.currentToken["publicId"] = ""
             self.state = self.doctypePublicIdentifierSingleQuotedState
         elif data == ">":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "unexpected-end-of-doctype"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("unexpected-end-of-doctype"))
             self.currentToken["correct"] = False
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
         elif data is EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "eof-in-doctype"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("eof-in-doctype"))
             self.currentToken["correct"] = False
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
         else:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "unexpected-char-in-doctype"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("unexpected-char-in-doctype"))
             self.currentToken["correct"] = False
             self.state = self.bogusDoctypeState
         return True
@@ -1475,18 +1513,15 @@ class HTMLTokenizer(object):
         if data == "\"":
             self.state = self.afterDoctypePublicIdentifierState
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
             self.currentToken["publicId"] += "\uFFFD"
         elif data == ">":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "unexpected-end-of-doctype"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("unexpected-end-of-doctype"))
             self.currentToken["correct"] = False
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
         elif data is EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "eof-in-doctype"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("eof-in-doctype"))
             self.currentToken["correct"] = False
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
@@ -1499,18 +1534,15 @@ class HTMLTokenizer(object):
         if data == "'":
             self.state = self.afterDoctypePublicIdentifierState
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
             self.currentToken["publicId"] += "\uFFFD"
         elif data == ">":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "unexpected-end-of-doctype"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("unexpected-end-of-doctype"))
             self.currentToken["correct"] = False
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
         elif data is EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "eof-in-doctype"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("eof-in-doctype"))
             self.currentToken["correct"] = False
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
@@ -1526,24 +1558,20 @@ class HTMLTokenizer(object):
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
         elif data == '"':
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "unexpected-char-in-doctype"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("unexpected-char-in-doctype"))
             self.currentToken["systemId"] = ""
             self.state = self.doctypeSystemIdentifierDoubleQuotedState
         elif data == "'":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "unexpected-char-in-doctype"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("unexpected-char-in-doctype"))
             self.currentToken["systemId"] = ""
             self.state = self.doctypeSystemIdentifierSingleQuotedState
         elif data is EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "eof-in-doctype"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("eof-in-doctype"))
             self.currentToken["correct"] = False
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
         else:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "unexpected-char-in-doctype"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("unexpected-char-in-doctype"))
             self.currentToken["correct"] = False
             self.state = self.bogusDoctypeState
         return True
@@ -1562,14 +1590,12 @@ class HTMLTokenizer(object):
             self.currentToken["systemId"] = ""
             self.state = self.doctypeSystemIdentifierSingleQuotedState
         elif data == EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "eof-in-doctype"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("eof-in-doctype"))
             self.currentToken["correct"] = False
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
         else:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "unexpected-char-in-doctype"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("unexpected-char-in-doctype"))
             self.currentToken["correct"] = False
             self.state = self.bogusDoctypeState
         return True
@@ -1579,13 +1605,11 @@ class HTMLTokenizer(object):
         if data in spaceCharacters:
             self.state = self.beforeDoctypeSystemIdentifierState
         elif data in ("'", '"'):
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "unexpected-char-in-doctype"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("unexpected-char-in-doctype"))
             self.stream.unget(data)
             self.state = self.beforeDoctypeSystemIdentifierState
         elif data is EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "eof-in-doctype"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("eof-in-doctype"))
             self.currentToken["correct"] = False
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
@@ -1605,20 +1629,17 @@ class HTMLTokenizer(object):
             self.currentToken["systemId"] = ""
             self.state = self.doctypeSystemIdentifierSingleQuotedState
         elif data == ">":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "unexpected-char-in-doctype"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("unexpected-char-in-doctype"))
             self.currentToken["correct"] = False
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
         elif data is EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "eof-in-doctype"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("eof-in-doctype"))
             self.currentToken["correct"] = False
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
         else:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "unexpected-char-in-doctype"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("unexpected-char-in-doctype"))
             self.currentToken["correct"] = False
             self.state = self.bogusDoctypeState
         return True
@@ -1628,18 +1649,15 @@ class HTMLTokenizer(object):
         if data == "\"":
             self.state = self.afterDoctypeSystemIdentifierState
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
             self.currentToken["systemId"] += "\uFFFD"
         elif data == ">":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "unexpected-end-of-doctype"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("unexpected-end-of-doctype"))
             self.currentToken["correct"] = False
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
         elif data is EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "eof-in-doctype"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("eof-in-doctype"))
             self.currentToken["correct"] = False
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
@@ -1652,18 +1670,15 @@ class HTMLTokenizer(object):
         if data == "'":
             self.state = self.afterDoctypeSystemIdentifierState
         elif data == "\u0000":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                    "data": "invalid-codepoint"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
             self.currentToken["systemId"] += "\uFFFD"
         elif data == ">":
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "unexpected-end-of-doctype"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("unexpected-end-of-doctype"))
             self.currentToken["correct"] = False
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
         elif data is EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "eof-in-doctype"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("eof-in-doctype"))
             self.currentToken["correct"] = False
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
@@ -1679,14 +1694,12 @@ class HTMLTokenizer(object):
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
         elif data is EOF:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "eof-in-doctype"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("eof-in-doctype"))
             self.currentToken["correct"] = False
             self.tokenQueue.append(self.currentToken)
             self.state = self.dataState
         else:
-            self.tokenQueue.append({"type": tokenTypes["ParseError"], "data":
-                                    "unexpected-char-in-doctype"})
+            self.tokenQueue.append(self.tokenFactory.ParseError("unexpected-char-in-doctype"))
             self.state = self.bogusDoctypeState
         return True
 
@@ -1725,11 +1738,9 @@ class HTMLTokenizer(object):
         nullCount = data.count("\u0000")
         if nullCount > 0:
             for _ in range(nullCount):
-                self.tokenQueue.append({"type": tokenTypes["ParseError"],
-                                        "data": "invalid-codepoint"})
+                self.tokenQueue.append(self.tokenFactory.ParseError("invalid-codepoint"))
             data = data.replace("\u0000", "\uFFFD")
         if data:
-            self.tokenQueue.append({"type": tokenTypes["Characters"],
-                                    "data": data})
+            self.tokenQueue.append(self.tokenFactory.Characters(data))
         self.state = self.dataState
         return True
@@ -0,0 +1,222 @@
+"""Token representations used by the tokenizer
+
+By default :py:class:`html5lib._tokenizer.HTMLTokenizer` emits every token as
+a dict such as ``{"type": tokenTypes["Characters"], "data": "foo"}``. Passing
+``compactTokens=True`` makes it emit instances of the ``__slots__`` classes
+below instead, which are several times smaller than the equivalent dict.
+
+Compact tokens are a dict-compatible shim rather than a different interface:
+they implement the parts of the mapping protocol that consumers of the token
+stream rely on (``token["name"]``, ``token["name"] = value``,
+``del token["name"]``, ``"name" in token``, ``token.get()``, ``keys()`` and
+``items()``), and missing keys raise :py:exc:`KeyError` as with a dict, so the
+parser phases and filters written against dict tokens work with them
+unchanged. They are not :py:class:`~collections.abc.Mapping` instances, and
+only the keys of their token type can be set. ``dict(token)`` gives back a
+plain dict.
+
+"""
+from __future__ import absolute_import, division, unicode_literals
+
+from .constants import tokenTypes
+
+_Characters = tokenTypes["Characters"]
+_SpaceCharacters = tokenTypes["SpaceCharacters"]
+_StartTag = tokenTypes["StartTag"]
+_EndTag = tokenTypes["EndTag"]
+_Comment = tokenTypes["Comment"]
+_Doctype = tokenTypes["Doctype"]
+_ParseError = tokenTypes["ParseError"]
+
+
+class Token(object):
+    """Base class for compact tokens
+
+    Subclasses list their keys in ``__slots__``. A key that isn't one of
+    them, or that hasn't been set, raises :py:exc:`KeyError`.
+
+    """
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        try:
+            if key in self.__slots__:
+                return getattr(self, key)
+        except AttributeError:
+            pass
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        object.__setattr__(self, key, value)
+
+    def __delitem__(self, key):
+        if key in self.__slots__:
+            try:
+                object.__delattr__(self, key)
+                return
+            except AttributeError:
+                pass
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        if key not in self.__slots__:
+            return False
+        try:
+            object.__getattribute__(self, key)
+        except AttributeError:
+            return False
+        return True
+
+    def get(self, key, default=None):
+        if key in self.__slots__:
+            try:
+                return object.__getattribute__(self, key)
+            except AttributeError:
+                pass
+        return default
+
+    def keys(self):
+        return [key for key in self.__slots__ if key in self]
+
+    def items(self):
+        return [(key, object.__getattribute__(self, key)) for key in self.keys()]
+
+    def values(self):
+        return [value for _, value in self.items()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, (Token, dict)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "<%s %r>" % (self.__class__.__name__, dict(self.items()))
+
+
+class Characters(Token):
+    __slots__ = ("type", "data")
+
+    def __init__(self, data):
+        self.type = _Characters
+        self.data = data
+
+
+class SpaceCharacters(Token):
+    __slots__ = ("type", "data")
+
+    def __init__(self, data):
+        self.type = _SpaceCharacters
+        self.data = data
+
+
+class StartTag(Token):
+    # namespace is only set by the parser, for foreign elements
+    __slots__ = ("type", "name", "data", "selfClosing", "selfClosingAcknowledged", "namespace")
+
+    def __init__(self, name):
+        self.type = _StartTag
+        self.name = name
+        self.data = []
+        self.selfClosing = False
+        self.selfClosingAcknowledged = False
+
+
+class EndTag(Token):
+    __slots__ = ("type", "name", "data", "selfClosing")
+
+    def __init__(self, name):
+        self.type = _EndTag
+        self.name = name
+        self.data = []
+        self.selfClosing = False
+
+
+class Comment(Token):
+    __slots__ = ("type", "data")
+
+    def __init__(self, data):
+        self.type = _Comment
+        self.data = data
+
+
+class Doctype(Token):
+    __slots__ = ("type", "name", "publicId", "systemId", "correct")
+
+    def __init__(self):
+        self.type = _Doctype
+        self.name = ""
+        self.publicId = None
+        self.systemId = None
+        self.correct = True
+
+
+class ParseError(Token):
+    __slots__ = ("type", "data", "datavars")
+
+    def __init__(self, data, datavars=None):
+        self.type = _ParseError
+        self.data = data
+        if datavars is not None:
+            self.datavars = datavars
+
+
+class CompactTokenFactory(object):
+    """Token factory producing :py:class:`Token` instances"""
+    Characters = Characters
+    SpaceCharacters = SpaceCharacters
+    StartTag = StartTag
+    EndTag = EndTag
+    Comment = Comment
+    Doctype = Doctype
+    ParseError = ParseError
+
+
+class DictTokenFactory(object):
+    """Token factory producing plain dicts, the tokenizer's default"""
+    @staticmethod
+    def Characters(data):
+        return {"type": _Characters, "data": data}
+
+    @staticmethod
+    def SpaceCharacters(data):
+        return {"type": _SpaceCharacters, "data": data}
+
+    @staticmethod
+    def StartTag(name):
+        return {"type": _StartTag, "name": name, "data": [],
+                "selfClosing": False, "selfClosingAcknowledged": False}
+
+    @staticmethod
+    def EndTag(name):
+        return {"type": _EndTag, "name": name, "data": [], "selfClosing": False}
+
+    @staticmethod
+    def Comment(data):
+        return {"type": _Comment, "data": data}
+
+    @staticmethod
+    def Doctype():
+        return {"type": _Doctype, "name": "", "publicId": None,
+                "systemId": None, "correct": True}
+
+    @staticmethod
+    def ParseError(data, datavars=None):
+        if datavars is None:
+            return {"type": _ParseError, "data": data}
+        return {"type": _ParseError, "data": data, "datavars": datavars}
@@ -1,5 +1,6 @@
 from __future__ import absolute_import, division, unicode_literals
 
 from .py import Trie
+from .dfa import DFA
 
-__all__ = ["Trie"]
+__all__ = ["Trie", "DFA"]
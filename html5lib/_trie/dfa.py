@@ -0,0 +1,33 @@
+from __future__ import absolute_import, division, unicode_literals
+
+#: Distance between state numbers, so that ``state + ord(char)`` is unique
+#: for every state and character
+stride = 0x110000
+
+
+class DFA(object):
+    """Deterministic finite automaton matching a set of strings a character
+    at a time
+
+    The transition table is one flat dict: the state after ``char`` in
+    ``state`` is ``transitions.get(state + ord(char))``, or None if no key
+    continues that way. The start state is 0, and ``matches`` maps the state
+    reached at the end of each key back to the key.
+
+    """
+
+    def __init__(self, keys):
+        transitions = {}
+        matches = {}
+        nextState = stride
+        for key in keys:
+            state = 0
+            for char in key:
+                edge = state + ord(char)
+                state = transitions.get(edge)
+                if state is None:
+                    state = transitions[edge] = nextState
+                    nextState += stride
+            matches[state] = key
+        self.transitions = transitions
+        self.matches = matches
@@ -13,8 +13,10 @@ class Trie(ABCTrie):
 
         self._data = data
         self._keys = sorted(data.keys())
-        self._cachestr = ""
-        self._cachepoints = (0, len(data))
+        # The last prefix looked up and the range of keys starting with it,
+        # kept in one attribute so that threads sharing the trie never see
+        # the prefix of one lookup with the range of another
+        self._cache = ("", 0, len(data))
 
     def __contains__(self, key):
         return key in self._data
@@ -32,8 +34,8 @@ class Trie(ABCTrie):
         if prefix is None or prefix == "" or not self._keys:
             return set(self._keys)
 
-        if prefix.startswith(self._cachestr):
-            lo, hi = self._cachepoints
+        cachestr, lo, hi = self._cache
+        if prefix.startswith(cachestr):
             start = i = bisect_left(self._keys, prefix, lo, hi)
         else:
             start = i = bisect_left(self._keys, prefix)
@@ -46,8 +48,7 @@ class Trie(ABCTrie):
             keys.add(self._keys[i])
             i += 1
 
-        self._cachestr = prefix
-        self._cachepoints = (start, i)
+        self._cache = (prefix, start, i)
 
         return keys
 
@@ -55,8 +56,8 @@ class Trie(ABCTrie):
         if prefix in self._data:
             return True
 
-        if prefix.startswith(self._cachestr):
-            lo, hi = self._cachepoints
+        cachestr, lo, hi = self._cache
+        if prefix.startswith(cachestr):
             i = bisect_left(self._keys, prefix, lo, hi)
         else:
             i = bisect_left(self._keys, prefix)
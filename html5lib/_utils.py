@@ -1,5 +1,6 @@
 from __future__ import absolute_import, division, unicode_literals
 
+import threading
 from types import ModuleType
 
 try:
@@ -120,6 +121,9 @@ def surrogatePairToCodepoint(data):
 
 def moduleFactoryFactory(factory):
     moduleCache = {}
+    # Only one thread makes a module at a time, so that threads asking for
+    # the same one at once all end up with the module in the cache
+    lock = threading.Lock()
 
     def moduleFactory(baseModule, *args, **kwargs):
         if isinstance(ModuleType.__name__, type("")):
@@ -127,21 +131,20 @@ def moduleFactoryFactory(factory):
         else:
             name = b"_%s_factory" % baseModule.__name__
 
-        kwargs_tuple = tuple(kwargs.items())
+        key = (name, args, tuple(kwargs.items()))
 
         try:
-            return moduleCache[name][args][kwargs_tuple]
+            return moduleCache[key]
         except KeyError:
-            mod = ModuleType(name)
-            objs = factory(baseModule, *args, **kwargs)
-            mod.__dict__.update(objs)
-            if "name" not in moduleCache:
-                moduleCache[name] = {}
-            if "args" not in moduleCache[name]:
-                moduleCache[name][args] = {}
-            if "kwargs" not in moduleCache[name][args]:
-                moduleCache[name][args][kwargs_tuple] = {}
-            moduleCache[name][args][kwargs_tuple] = mod
+            pass
+
+        with lock:
+            mod = moduleCache.get(key)
+            if mod is None:
+                mod = ModuleType(name)
+                objs = factory(baseModule, *args, **kwargs)
+                mod.__dict__.update(objs)
+                moduleCache[key] = mod
             return mod
 
     return moduleFactory
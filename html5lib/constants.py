@@ -2958,3 +2958,8 @@ class DataLossWarning(UserWarning):
 
 class _ReparseException(Exception):
     pass
+
+
+class _NeedMoreData(Exception):
+    """Raised by a fed input stream that has run out of data before close()"""
+    pass
@@ -1,6 +1,8 @@
 from __future__ import absolute_import, division, unicode_literals
 from six import viewkeys
 
+from collections import deque
+
 from . import _inputstream
 from . import _tokenizer
 
@@ -20,11 +22,26 @@ from .constants import (
     _ReparseException
 )
 
+tokenTypeNames = {value: key for key, value in tokenTypes.items()}
+
+# token type -> the name of the Phase method that processes it
+processMethodNames = {tokenTypes[name]: "process" + name
+                      for name in ("Characters", "SpaceCharacters", "StartTag",
+                                   "EndTag", "Comment", "Doctype")}
+
+mathmlTextIntegrationPointTags = frozenset(["mglyph", "malignmark"])
+
+# For telling whether text is all space characters with str.strip(), which
+# doesn't loop over the characters in Python
+spaceCharactersString = "".join(sorted(spaceCharacters))
+
 
 def parse(doc, treebuilder="etree", namespaceHTMLElements=True, **kwargs):
     """Parse an HTML document as a string or file-like object into a tree
 
-    :arg doc: the document to parse as a string or file-like object
+    :arg doc: the document to parse as a string or file-like object, or a
+        path-like object naming a file, which is memory-mapped rather than
+        read into memory
 
     :arg treebuilder: the treebuilder to use when parsing
 
@@ -74,9 +91,15 @@ class HTMLParser(object):
 
     Generates a tree structure from a stream of (possibly malformed) HTML.
 
+    A parser can parse any number of documents one after another, which
+    saves setting up its phases and treebuilder for each of them; each call
+    returns a new tree. It must only be used by one thread at a time, see
+    :py:class:`ParserPool` for sharing parsers between threads.
+
     """
 
-    def __init__(self, tree=None, strict=False, namespaceHTMLElements=True, debug=False):
+    def __init__(self, tree=None, strict=False, namespaceHTMLElements=True, debug=False,
+                 maxErrors=None):
         """
         :arg tree: a treebuilder class controlling the type of tree that will be
             returned. Built in treebuilders can be accessed through
@@ -88,6 +111,11 @@ class HTMLParser(object):
 
         :arg debug: whether or not to enable debug mode which logs things
 
+        :arg maxErrors: the number of parse errors to keep in ``errors``; the
+            rest are only counted in ``errorCount``. None (the default) keeps
+            them all, and 0 keeps none, which also skips working out where
+            in the document each error is
+
         Example:
 
         >>> from html5lib.html5parser import HTMLParser
@@ -106,29 +134,52 @@ class HTMLParser(object):
             tree = treebuilders.getTreeBuilder(tree)
 
         self.tree = tree(namespaceHTMLElements)
+        self.maxErrors = maxErrors
         self.errors = []
+        self.errorCount = 0
+        self._feeding = False
+        self._limits = None
 
         self.phases = {name: cls(self, self.tree) for name, cls in
                        _phases.items()}
 
-    def _parse(self, stream, innerHTML=False, container="div", scripting=False, **kwargs):
+    def _parse(self, stream, innerHTML=False, container="div", scripting=False,
+               stopAfter=None, maxTokens=None, maxCharacters=None, stopWhen=None,
+               **kwargs):
+        if stopAfter not in (None, "head"):
+            raise ValueError("Can only stop after the head element, not %r" % (stopAfter,))
+        if stopAfter is not None and innerHTML:
+            raise ValueError("A fragment has no head element to stop after")
+        if (stopAfter is None and maxTokens is None and maxCharacters is None and
+                stopWhen is None):
+            self._limits = None
+        else:
+            self._limits = (stopAfter, maxTokens, maxCharacters, stopWhen)
 
         self.innerHTMLMode = innerHTML
         self.container = container
         self.scripting = scripting
         self.tokenizer = _tokenizer.HTMLTokenizer(stream, parser=self, **kwargs)
-        self.reset()
-
         try:
-            self.mainLoop()
-        except _ReparseException:
             self.reset()
-            self.mainLoop()
+
+            try:
+                self.mainLoop()
+            except _ReparseException:
+                self.reset()
+                self.mainLoop()
+        finally:
+            # Parsing may stop before the end of the input
+            self.tokenizer.stream.closeSource()
 
     def reset(self):
         self.tree.reset()
+        for phase in self.phases.values():
+            phase.reset()
         self.firstStartTag = False
         self.errors = []
+        self.errorCount = 0
+        self.stoppedEarly = False
         self.log = []  # only used with debug mode
         # "quirks" / "limited quirks" / "no quirks"
         self.compatMode = "no quirks"
@@ -159,6 +210,15 @@ class HTMLParser(object):
 
         self.framesetOK = True
 
+    def _releaseDocument(self):
+        """Let go of the last document and of its input, for a parser that
+        is kept around for the next one"""
+        if hasattr(self, "tokenizer"):
+            del self.tokenizer
+        self.tree.reset()
+        for phase in self.phases.values():
+            phase.reset()
+
     @property
     def documentEncoding(self):
         """Name of the character encoding that was used to decode the input stream, or
@@ -183,37 +243,68 @@ class HTMLParser(object):
         return (element.namespace, element.name) in mathmlTextIntegrationPointElements
 
     def mainLoop(self):
+        tokens = self.tokenizer
+        if self._limits is not None:
+            tokens = self._limitTokens(tokens, *self._limits)
+        self.processTokens(tokens)
+        self.processEOF()
+
+    def _limitTokens(self, tokens, stopAfter, maxTokens, maxCharacters, stopWhen):
+        ParseErrorToken = tokenTypes["ParseError"]
+        stream = self.tokenizer.stream
+        tree = self.tree
+        head = (namespaces["html"], "head")
+        count = 0
+        for token in tokens:
+            yield token
+            # The parser has processed the token by the time it asks for the
+            # next one
+            if token["type"] == ParseErrorToken:
+                continue
+            count += 1
+            if ((maxTokens is not None and count >= maxTokens) or
+                    (maxCharacters is not None and stream.charactersRead() >= maxCharacters) or
+                    (stopAfter is not None and tree.headPointer is not None and
+                     not tree.openElements.positions.get(head)) or
+                    (stopWhen is not None and stopWhen(self))):
+                self.stoppedEarly = True
+                return
+
+    def processTokens(self, tokens):
         CharactersToken = tokenTypes["Characters"]
         SpaceCharactersToken = tokenTypes["SpaceCharacters"]
         StartTagToken = tokenTypes["StartTag"]
         EndTagToken = tokenTypes["EndTag"]
-        CommentToken = tokenTypes["Comment"]
-        DoctypeToken = tokenTypes["Doctype"]
         ParseErrorToken = tokenTypes["ParseError"]
 
-        type_names = {value: key for key, value in tokenTypes.items()}
         debug = self.debug
+        openElements = self.tree.openElements
 
-        for token in self.tokenizer:
+        for token in tokens:
             prev_token = None
             new_token = token
             while new_token is not None:
                 prev_token = new_token
-                currentNode = self.tree.openElements[-1] if self.tree.openElements else None
-                currentNodeNamespace = currentNode.namespace if currentNode else None
-                currentNodeName = currentNode.name if currentNode else None
-
                 type = new_token["type"]
 
                 if type == ParseErrorToken:
                     self.parseError(new_token["data"], new_token.get("datavars", {}))
                     new_token = None
+                    continue
+
+                if not openElements.foreignPositions:
+                    # With no SVG or MathML element open, the current node
+                    # is an HTML element and the tree construction
+                    # dispatcher always picks the current insertion mode
+                    phase = self.phase
                 else:
-                    if (len(self.tree.openElements) == 0 or
-                        currentNodeNamespace == self.tree.defaultNamespace or
+                    currentNode = openElements[-1]
+                    currentNodeNamespace = currentNode.namespace
+                    currentNodeName = currentNode.name
+                    if (currentNodeNamespace == self.tree.defaultNamespace or
                         (self.isMathMLTextIntegrationPoint(currentNode) and
                          ((type == StartTagToken and
-                           token["name"] not in frozenset(["mglyph", "malignmark"])) or
+                           token["name"] not in mathmlTextIntegrationPointTags) or
                           type in (CharactersToken, SpaceCharactersToken))) or
                         (currentNodeNamespace == namespaces["mathml"] and
                          currentNodeName == "annotation-xml" and
@@ -225,36 +316,25 @@ class HTMLParser(object):
                     else:
                         phase = self.phases["inForeignContent"]
 
-                    if debug:
-                        info = {"type": type_names[type]}
-                        if type in (StartTagToken, EndTagToken):
-                            info["name"] = new_token['name']
-
-                        self.log.append((self.tokenizer.state.__name__,
-                                         self.phase.__class__.__name__,
-                                         phase.__class__.__name__,
-                                         "process" + info["type"],
-                                         info))
-
-                    if type == CharactersToken:
-                        new_token = phase.processCharacters(new_token)
-                    elif type == SpaceCharactersToken:
-                        new_token = phase.processSpaceCharacters(new_token)
-                    elif type == StartTagToken:
-                        new_token = phase.processStartTag(new_token)
-                    elif type == EndTagToken:
-                        new_token = phase.processEndTag(new_token)
-                    elif type == CommentToken:
-                        new_token = phase.processComment(new_token)
-                    elif type == DoctypeToken:
-                        new_token = phase.processDoctype(new_token)
+                if debug:
+                    info = {"type": tokenTypeNames[type]}
+                    if type in (StartTagToken, EndTagToken):
+                        info["name"] = new_token['name']
+
+                    self.log.append((self.tokenizer.state.__name__,
+                                     self.phase.__class__.__name__,
+                                     phase.__class__.__name__,
+                                     "process" + info["type"],
+                                     info))
+
+                new_token = getattr(phase, processMethodNames[type])(new_token)
 
             if (type == StartTagToken and prev_token["selfClosing"] and
                     not prev_token["selfClosingAcknowledged"]):
                 self.parseError("non-void-element-with-trailing-solidus",
                                 {"name": prev_token["name"]})
 
-        # When the loop finishes it's EOF
+    def processEOF(self):
         reprocess = True
         phases = []
         while reprocess:
@@ -266,7 +346,8 @@ class HTMLParser(object):
     def parse(self, stream, *args, **kwargs):
         """Parse a HTML document into a well-formed tree
 
-        :arg stream: a file-like object or string containing the HTML to be parsed
+        :arg stream: a file-like object or string containing the HTML to be parsed,
+            or a path-like object naming a file to memory-map and parse
 
             The optional encoding parameter must be a string that indicates
             the encoding.  If specified, that encoding will be used,
@@ -275,14 +356,32 @@ class HTMLParser(object):
 
         :arg scripting: treat noscript elements as if JavaScript was turned on
 
+        :arg stopAfter: ``"head"`` to stop parsing once the head element has
+            been closed
+
+        :arg maxTokens: the number of tokens after which to stop parsing
+
+        :arg maxCharacters: the number of characters of the document after
+            which to stop parsing, at the end of the token they fall in
+
+        :arg stopWhen: a function called with the parser after each token,
+            which returns true to stop parsing
+
         :returns: parsed tree
 
+        When parsing stops early, the rest of the document is not read and
+        the tree is finished as if the document ended there; ``stoppedEarly``
+        is then true.
+
         Example:
 
         >>> from html5lib.html5parser import HTMLParser
         >>> parser = HTMLParser()
         >>> parser.parse('<html><body><p>This is a doc</p></body></html>')
         <Element u'{http://www.w3.org/1999/xhtml}html' at 0x7feac4909db0>
+        >>> parser.parse(page, stopAfter="head").find(
+        ...     "{http://www.w3.org/1999/xhtml}head/{http://www.w3.org/1999/xhtml}title").text
+        'The page title'
 
         """
         self._parse(stream, False, None, *args, **kwargs)
@@ -303,6 +402,9 @@ class HTMLParser(object):
 
         :arg scripting: treat noscript elements as if JavaScript was turned on
 
+        The ``maxTokens``, ``maxCharacters`` and ``stopWhen`` arguments stop
+        parsing early as for :py:meth:`parse`.
+
         :returns: parsed tree
 
         Example:
@@ -316,11 +418,91 @@ class HTMLParser(object):
         self._parse(stream, True, *args, **kwargs)
         return self.tree.getFragment()
 
+    def feed(self, data, **kwargs):
+        """Feed part of a HTML document to the parser
+
+        The first call starts a new document, which is tokenized and built
+        as far as the data fed so far allows; call :py:meth:`close` once the
+        whole document has been fed to finish it.
+
+        :arg data: the next piece of the document, either as text or as bytes
+            (every call must use the same type). The encoding of bytes is
+            sniffed from the first 1024 bytes as for :py:meth:`parse`, and
+            can't be changed by a ``<meta>`` element found after that.
+
+        Keyword arguments such as ``transport_encoding`` and ``scripting``
+        are the same as for :py:meth:`parse` and can only be given to the
+        first call. The options for stopping early (``stopAfter``,
+        ``maxTokens``, ``maxCharacters`` and ``stopWhen``) are not supported;
+        stop feeding data and call :py:meth:`close` instead.
+
+        If parsing fails, for instance with a :py:exc:`ParseError` in strict
+        mode, the document is abandoned and the next call starts a new one.
+
+        Example:
+
+        >>> from html5lib.html5parser import HTMLParser
+        >>> parser = HTMLParser()
+        >>> parser.feed('<p>This is a d')
+        >>> parser.feed('oc</p>')
+        >>> parser.close()
+        <Element u'{http://www.w3.org/1999/xhtml}html' at 0x7feac4909db0>
+
+        """
+        if not self._feeding:
+            self._startFeeding(**kwargs)
+        elif kwargs:
+            raise TypeError("Parse options can only be passed to the first feed()")
+        tokens = self.tokenizer.feed(data)
+        # Only once the input stream has taken the first piece, which it
+        # rejects if the options don't suit its type
+        self._feeding = True
+        try:
+            self.processTokens(tokens)
+        except Exception:
+            self._abandonFeeding()
+            raise
+
+    def _abandonFeeding(self):
+        # Whatever went wrong left the tree and the tokenizer halfway through
+        # the document, so neither can carry on
+        self._feeding = False
+        del self.tokenizer
+
+    def _startFeeding(self, scripting=False, **kwargs):
+        for name in ("stopAfter", "maxTokens", "maxCharacters", "stopWhen"):
+            if name in kwargs:
+                raise TypeError("%s can't be used with feed()" % name)
+        self.innerHTMLMode = False
+        self.container = None
+        self.scripting = scripting
+        self.tokenizer = _tokenizer.HTMLTokenizer(None, parser=self, **kwargs)
+        self.reset()
+
+    def close(self):
+        """Finish parsing a document passed in through :py:meth:`feed`
+
+        :returns: parsed tree
+
+        """
+        if not self._feeding:
+            self.feed("")
+        try:
+            self.processTokens(self.tokenizer.close())
+            self.processEOF()
+        except Exception:
+            self._abandonFeeding()
+            raise
+        self._feeding = False
+        return self.tree.getDocument()
+
     def parseError(self, errorcode="XXX-undefined-error", datavars=None):
         # XXX The idea is to make errorcode mandatory.
         if datavars is None:
             datavars = {}
-        self.errors.append((self.tokenizer.stream.position(), errorcode, datavars))
+        self.errorCount += 1
+        if self.maxErrors is None or len(self.errors) < self.maxErrors:
+            self.errors.append((self.tokenizer.stream.position(), errorcode, datavars))
         if self.strict:
             raise ParseError(E[errorcode] % datavars)
 
@@ -397,6 +579,69 @@ class HTMLParser(object):
         self.phase = self.phases["text"]
 
 
+class ParserPool(object):
+    """A pool of :py:class:`HTMLParser` objects shared between threads
+
+    Each call takes a parser that no other thread is using, or creates one
+    if there is none, and puts it back afterwards, so a pool used from a
+    thread pool ends up with about one parser per thread.
+
+    Example:
+
+    >>> from concurrent.futures import ThreadPoolExecutor
+    >>> from html5lib.html5parser import ParserPool
+    >>> pool = ParserPool("etree", namespaceHTMLElements=False)
+    >>> with ThreadPoolExecutor() as executor:
+    ...     fragments = list(executor.map(pool.parseFragment, comments))
+
+    """
+
+    def __init__(self, tree=None, **kwargs):
+        """
+        :arg tree: the treebuilder class or name to use, as for
+            :py:class:`HTMLParser`
+
+        Other keyword arguments such as ``strict`` are passed on to
+        :py:class:`HTMLParser`.
+
+        """
+        if isinstance(tree, str):
+            tree = treebuilders.getTreeBuilder(tree)
+        self.tree = tree
+        self.options = kwargs
+        # deque's append() and pop() are atomic, so no lock is needed
+        self._parsers = deque()
+
+    def _acquire(self):
+        try:
+            return self._parsers.pop()
+        except IndexError:
+            return HTMLParser(self.tree, **self.options)
+
+    def _release(self, parser):
+        # An idle parser would otherwise hold on to its last document
+        parser._releaseDocument()
+        self._parsers.append(parser)
+
+    def parse(self, stream, *args, **kwargs):
+        """Parse a HTML document into a well-formed tree, as
+        :py:meth:`HTMLParser.parse`"""
+        parser = self._acquire()
+        try:
+            return parser.parse(stream, *args, **kwargs)
+        finally:
+            self._release(parser)
+
+    def parseFragment(self, stream, *args, **kwargs):
+        """Parse a HTML fragment into a well-formed tree fragment, as
+        :py:meth:`HTMLParser.parseFragment`"""
+        parser = self._acquire()
+        try:
+            return parser.parseFragment(stream, *args, **kwargs)
+        finally:
+            self._release(parser)
+
+
 class Phase(object):
     """Base class for helper object that implements each phase of processing
     """
@@ -408,6 +653,10 @@ class Phase(object):
         self.__startTagCache = {}
         self.__endTagCache = {}
 
+    def reset(self):
+        """Forget whatever the phase kept from an earlier document"""
+        pass
+
     def processEOF(self):
         raise NotImplementedError
 
@@ -926,30 +1175,18 @@ class InBodyPhase(Phase):
 
     def __init__(self, *args, **kwargs):
         super(InBodyPhase, self).__init__(*args, **kwargs)
+        self.reset()
+
+    def reset(self):
         # Set this to the default handler
         self.processSpaceCharacters = self.processSpaceCharactersNonPre
 
-    def isMatchingFormattingElement(self, node1, node2):
-        return (node1.name == node2.name and
-                node1.namespace == node2.namespace and
-                node1.attributes == node2.attributes)
-
     # helper
     def addFormattingElement(self, token):
+        # The list of active formatting elements applies the Noah's Ark
+        # clause itself
         self.tree.insertElement(token)
-        element = self.tree.openElements[-1]
-
-        matchingElements = []
-        for node in self.tree.activeFormattingElements[::-1]:
-            if node is Marker:
-                break
-            elif self.isMatchingFormattingElement(node, element):
-                matchingElements.append(node)
-
-        assert len(matchingElements) <= 3
-        if len(matchingElements) == 3:
-            self.tree.activeFormattingElements.remove(matchingElements[-1])
-        self.tree.activeFormattingElements.append(element)
+        self.tree.activeFormattingElements.append(self.tree.openElements[-1])
 
     # the real deal
     def processEOF(self):
@@ -981,10 +1218,8 @@ class InBodyPhase(Phase):
             return
         self.tree.reconstructActiveFormattingElements()
         self.tree.insertText(token["data"])
-        # This must be bad for performance
         if (self.parser.framesetOK and
-            any(char not in spaceCharacters
-                for char in token["data"])):
+                token["data"].strip(spaceCharactersString)):
             self.parser.framesetOK = False
 
     def processSpaceCharactersNonPre(self, token):
@@ -1825,21 +2060,33 @@ class InTablePhase(Phase):
 
 
 class InTableTextPhase(Phase):
-    __slots__ = ("originalPhase", "characterTokens")
+    __slots__ = ("originalPhase", "pendingText")
 
     def __init__(self, *args, **kwargs):
         super(InTableTextPhase, self).__init__(*args, **kwargs)
+        # The text of the pending character tokens, which is kept for as
+        # long as the parser and emptied after each flush
+        self.pendingText = []
+        self.reset()
+
+    def reset(self):
         self.originalPhase = None
-        self.characterTokens = []
+        del self.pendingText[:]
 
     def flushCharacters(self):
-        data = "".join([item["data"] for item in self.characterTokens])
-        if any(item not in spaceCharacters for item in data):
+        pendingText = self.pendingText
+        if not pendingText:
+            return
+        if len(pendingText) == 1:
+            data = pendingText[0]
+        else:
+            data = "".join(pendingText)
+        del pendingText[:]
+        if data.strip(spaceCharactersString):
             token = {"type": tokenTypes["Characters"], "data": data}
             self.parser.phases["inTable"].insertText(token)
         elif data:
             self.tree.insertText(data)
-        self.characterTokens = []
 
     def processComment(self, token):
         self.flushCharacters()
@@ -1854,11 +2101,11 @@ class InTableTextPhase(Phase):
     def processCharacters(self, token):
         if token["data"] == "\u0000":
             return
-        self.characterTokens.append(token)
+        self.pendingText.append(token["data"])
 
     def processSpaceCharacters(self, token):
         # pretty sure we should never reach here
-        self.characterTokens.append(token)
+        self.pendingText.append(token["data"])
 #        assert False
 
     def processStartTag(self, token):
@@ -2470,7 +2717,7 @@ class InForeignContentPhase(Phase):
         if token["data"] == "\u0000":
             token["data"] = "\uFFFD"
         elif (self.parser.framesetOK and
-              any(char not in spaceCharacters for char in token["data"])):
+              token["data"].strip(spaceCharactersString)):
             self.parser.framesetOK = False
         Phase.processCharacters(self, token)
 
@@ -16,6 +16,12 @@ _tree_construction = os.path.join(_testdata, "tree-construction")
 _tokenizer = os.path.join(_testdata, "tokenizer")
 _sanitizer_testdata = os.path.join(_dir, "sanitizer-testdata")
 
+# Modules using syntax that can't be compiled, or APIs that aren't there, on
+# Python 2
+collect_ignore = []
+if sys.version_info < (3, 5):
+    collect_ignore.extend(["test_async.py", "test_parallel.py"])
+
 
 def fail_if_missing_pytest_expect():
     """Throws an exception halting pytest if pytest-expect isn't working"""
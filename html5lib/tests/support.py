@@ -58,6 +58,11 @@ else:
         "walker": treewalkers.getTreeWalker("lxml")
     }
 
+treeTypes["compact"] = {
+    "builder": treebuilders.getTreeBuilder("compact"),
+    "walker": treewalkers.getTreeWalker("compact")
+}
+
 # Genshi impls
 try:
     import genshi  # noqa
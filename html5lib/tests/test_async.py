@@ -0,0 +1,84 @@
+from __future__ import absolute_import, division, unicode_literals
+
+import asyncio
+
+import pytest
+
+from html5lib import parse, parse_async, serialize
+
+
+class AsyncChunks(object):
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await asyncio.sleep(0)
+        try:
+            return next(self.chunks)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+doc = (b'<!DOCTYPE html><meta charset="iso-8859-2"><title>\xa9 &amp; co</title>'
+       b'<table><tr><td>a<td>b</table><p>x<b>y<i>z</b>w</p><script>if (a<b) {}</script>')
+
+
+@pytest.mark.parametrize("size", [1, 7, len(doc)])
+def test_parse_async_iterable(size):
+    chunks = [doc[i:i + size] for i in range(0, len(doc), size)]
+    tree = run(parse_async(AsyncChunks(chunks)))
+    assert serialize(tree) == serialize(parse(doc))
+
+
+def test_parse_async_text():
+    text = doc.decode("iso-8859-2")
+    tree = run(parse_async(AsyncChunks([text[:20], text[20:]])))
+    assert serialize(tree) == serialize(parse(text))
+
+
+def test_parse_async_stream_reader():
+    async def main():
+        reader = asyncio.StreamReader()
+        reader.feed_data(doc[:30])
+        reader.feed_data(doc[30:])
+        reader.feed_eof()
+        return await parse_async(reader, transport_encoding="utf-8")
+
+    tree = run(main())
+    assert serialize(tree) == serialize(parse(doc, transport_encoding="utf-8"))
+
+
+def test_parse_async_empty():
+    tree = run(parse_async(AsyncChunks([])))
+    assert serialize(tree) == serialize(parse(""))
+
+
+def test_parse_async_yields():
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(None)
+            await asyncio.sleep(0)
+
+    async def main():
+        task = asyncio.ensure_future(ticker())
+        await asyncio.sleep(0)
+        del ticks[:]
+        await parse_async(AsyncChunks([b"<p>x" * 100]), yieldEvery=10)
+        task.cancel()
+
+    run(main())
+    # Once for each chunk read, and once per 10 of the 200 tokens
+    assert len(ticks) >= 20
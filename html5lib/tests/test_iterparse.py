@@ -0,0 +1,102 @@
+from __future__ import absolute_import, division, unicode_literals
+
+from io import BytesIO
+
+import pytest
+
+from html5lib import iterparse, parse, serialize
+
+doc = (b'<!DOCTYPE html><meta charset="iso-8859-2"><title>\xa9 &amp; co</title>'
+       b'<table>x<tr><td>a<td>b</table><p>x<b>y<i>z</b>w</p><form><div></form>v</div>')
+
+
+def tagName(element):
+    return element.tag.rpartition("}")[2]
+
+
+def test_iterparse_events():
+    events = [(event, tagName(element) if event != "text" else element)
+              for event, element in iterparse("<p>a<br>b</p><!--c-->")]
+    assert events == [
+        ("start", "html"), ("start", "head"), ("end", "head"),
+        ("start", "body"), ("start", "p"), ("text", "a"),
+        ("start", "br"), ("end", "br"), ("text", "b"), ("end", "p"),
+        ("end", "body"), ("end", "html")]
+
+
+def test_iterparse_end_text():
+    # Text is complete by the time the element it belongs to ends
+    texts = {}
+    for event, element in iterparse("<p>a&amp;b<i>c&lt;d</i>e&gt;f</p>", events=["end"]):
+        if tagName(element) == "i":
+            texts["i"] = element.text
+        elif tagName(element) == "p":
+            texts["p"] = element.text, element[0].tail
+    assert texts == {"i": "c<d", "p": ("a&b", "e>f")}
+
+
+def test_iterparse_event_subset():
+    events = [(event, tagName(element)) for event, element in
+              iterparse("<ul><li>a<li>b</ul>", events=["end"])]
+    assert events == [("end", "head"), ("end", "li"), ("end", "li"),
+                      ("end", "ul"), ("end", "body"), ("end", "html")]
+
+
+def test_iterparse_unknown_event():
+    with pytest.raises(ValueError):
+        iterparse("<p>", events=["start", "comment"])
+
+
+@pytest.mark.parametrize("source", [doc, doc.decode("iso-8859-2")])
+def test_iterparse_tree(source):
+    # The elements reported make up the same tree as parse() builds
+    root = None
+    for event, element in iterparse(source, events=["start"]):
+        if root is None:
+            root = element
+    assert serialize(root) == serialize(parse(source))
+
+
+def test_iterparse_misnested():
+    # Every element opened, including the clones made for misnested
+    # formatting elements, is closed exactly once
+    opened = []
+    closed = []
+    for event, element in iterparse(doc, events=["start", "end"]):
+        (opened if event == "start" else closed).append(element)
+    assert len(opened) == len(closed)
+    assert set(map(id, opened)) == set(map(id, closed))
+
+
+def test_iterparse_file(monkeypatch):
+    monkeypatch.setattr("html5lib._iterparse.readSize", 5)
+    root = None
+    for event, element in iterparse(BytesIO(doc), transport_encoding="iso-8859-2"):
+        if root is None:
+            root = element
+    assert serialize(root) == serialize(parse(doc, transport_encoding="iso-8859-2"))
+
+
+def test_iterparse_clear():
+    source = "<ul>%s</ul>" % "".join("<li><a href=%d>x</a>" % i for i in range(100))
+    links = []
+    for event, element in iterparse(source, events=["end"]):
+        if tagName(element) == "a":
+            links.append(element.get("href"))
+        element.clear()
+    assert links == [str(i) for i in range(100)]
+
+    # Formatting elements are reopened from closed ones, which the caller
+    # has cleared by then
+    source = '<p><a href="x" class=c>one</p>two<b id=b><p>three</b>four<i id=i>five</p>six'
+    starts = []
+    for event, element in iterparse(source, events=["start", "end"]):
+        if event == "start":
+            starts.append((tagName(element), dict(element.attrib)))
+        else:
+            element.clear()
+    assert starts == [(tagName(element), dict(element.attrib))
+                      for event, element in iterparse(source, events=["start"])]
+    assert starts.count(("a", {"href": "x", "class": "c"})) == 2
+    assert starts.count(("b", {"id": "b"})) == 2
+    assert starts.count(("i", {"id": "i"})) == 2
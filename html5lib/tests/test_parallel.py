@@ -0,0 +1,112 @@
+from __future__ import absolute_import, division, unicode_literals
+
+import threading
+
+import pytest
+
+from html5lib import HTMLParser, getTreeBuilder, parse, parse_many, serialize
+from html5lib import _parallel
+
+docs = ["<title>%d</title><p>%s<b>x<i>y</b>z" % (i, "&amp;" * i) for i in range(12)]
+
+
+def tagCount(tree):
+    return len(list(tree.iter()))
+
+
+@pytest.mark.parametrize("chunksize", [1, 5])
+def test_parse_many_ordered(chunksize):
+    trees = list(parse_many(docs, workers=2, chunksize=chunksize, maxPending=2))
+    assert [serialize(tree) for tree in trees] == [serialize(parse(doc)) for doc in docs]
+
+
+def test_parse_many_unordered():
+    results = parse_many(docs, workers=2, ordered=False, serialize=True,
+                         namespaceHTMLElements=False)
+    assert sorted(results) == sorted(serialize(parse(doc)) for doc in docs)
+
+
+def test_parse_many_callback():
+    results = parse_many(iter(docs), workers=2, callback=tagCount)
+    assert list(results) == [tagCount(parse(doc)) for doc in docs]
+
+
+def test_parse_many_paths(tmp_path):
+    paths = []
+    for i, doc in enumerate(docs):
+        path = tmp_path / ("%d.html" % i)
+        path.write_bytes(doc.encode("utf-8"))
+        paths.append(path)
+    results = parse_many(paths, workers=2, serialize=True, useChardet=False)
+    assert list(results) == [serialize(parse(doc)) for doc in docs]
+
+
+def test_parse_many_error(tmp_path):
+    results = parse_many([docs[0], tmp_path / "missing.html"], workers=1)
+    next(results)
+    with pytest.raises(IOError):
+        next(results)
+
+
+def test_worker_parser_released():
+    # Run a chunk as a worker process would, in this process
+    options = ("etree", True, {}, False, tagCount, None)
+    assert _parallel._parseChunk(options, docs[:2]) == [tagCount(parse(doc)) for doc in docs[:2]]
+    parser = _parallel._workerParsers[("etree", True)]
+    assert parser.documentEncoding is None
+    assert not parser.tree.openElements
+
+
+@pytest.mark.parametrize("treebuilder", ["etree", "dom", "lxml"])
+def test_parse_many_threads(treebuilder):
+    if treebuilder == "lxml":
+        pytest.importorskip("lxml")
+    results = parse_many(docs, treebuilder=treebuilder, workers=4, threads=True,
+                         callback=lambda tree: serialize(tree, tree=treebuilder))
+    assert list(results) == [serialize(parse(doc, treebuilder=treebuilder), tree=treebuilder)
+                             for doc in docs]
+
+
+stressDocs = [
+    "<!DOCTYPE html><title>&notin; &notit; &amp &ampx &#x41;&#0;</title>",
+    "<table><tr><td>a<td>b</tr>c<tr><td>d</table>e",
+    "<p><b><i>x</b>y</i>z<a href=1><p>w</a>",
+    "<svg><foreignObject><p>a<math><mi>b</math></svg><math><annotation-xml encoding=text/html><div>c",
+    "<select><option>a<optgroup><option>b</select><textarea>\n\n&lt;x></textarea>",
+    "<ul><li>a<li>b<dl><dt>c<dd>d</ul><pre>\nq</pre><plaintext>&lt;r",
+    "<frameset><frame></frameset><noframes>z</noframes>",
+    "<b x=1><b x=1><b x=1><b x=1>noah</b><!-- c --><![CDATA[x]]>",
+]
+
+
+@pytest.mark.parametrize("treebuilder", ["etree", "dom", "lxml"])
+def test_threads_stress(treebuilder):
+    # Parsers made and used in many threads at once have to give the same
+    # trees as parsing one document after another does
+    if treebuilder == "lxml":
+        pytest.importorskip("lxml")
+    expected = [serialize(parse(doc, treebuilder=treebuilder), tree=treebuilder)
+                for doc in stressDocs]
+    threadCount = 16
+    barrier = threading.Barrier(threadCount)
+    results = [None] * threadCount
+
+    def run(index):
+        barrier.wait()
+        outputs = []
+        for i in range(20):
+            doc = stressDocs[(index + i) % len(stressDocs)]
+            tree = HTMLParser(getTreeBuilder(treebuilder)).parse(doc)
+            outputs.append(((index + i) % len(stressDocs), serialize(tree, tree=treebuilder)))
+        results[index] = outputs
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(threadCount)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for outputs in results:
+        assert len(outputs) == 20
+        for docIndex, output in outputs:
+            assert output == expected[docIndex]
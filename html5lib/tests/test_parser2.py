@@ -2,12 +2,21 @@ from __future__ import absolute_import, division, unicode_literals
 
 from six import PY2, text_type
 
+import gc
 import io
+import threading
+import warnings
+import weakref
+
+import pytest
 
 from . import support  # noqa
 
-from html5lib.constants import namespaces
-from html5lib import parse, parseFragment, HTMLParser
+from html5lib.constants import namespaces, DataLossWarning
+from html5lib import parse, parseFragment, serialize, getTreeBuilder, HTMLParser, ParserPool
+from html5lib.html5parser import ParseError
+from html5lib._ihatexml import InfosetFilter
+from html5lib.treebuilders.base import listElementsMap
 
 
 # tests that aren't autogenerated from text files
@@ -91,3 +100,361 @@ def test_self_closing_col():
     parser = HTMLParser()
     parser.parseFragment('<table><colgroup><col /></colgroup></table>')
     assert not parser.errors
+
+
+def test_compact_tokens():
+    source = "<table><tr><td>a<b>b<i>c</b>d</i><svg><path/></svg>&amp;</table>"
+    expected = serialize(parse(source))
+    assert serialize(parse(source, compactTokens=True)) == expected
+
+
+@pytest.mark.parametrize("source", [
+    "<!DOCTYPE html><title>a &amp b</title><p class='x &notin; y' id=z>c&notit;d&#x41;&#65</p>",
+    "<table><tr><td>a<b>b<i>c</b>d</i></table>\r\n<script>if (a<b) x--></script>",
+    "<!-- comment --><svg><![CDATA[<x>]]></svg><textarea>\r\n&lt;</textarea><plaintext>&amp;",
+])
+def test_feed(source):
+    expected = serialize(parse(source))
+
+    for i in range(len(source) + 1):
+        parser = HTMLParser()
+        parser.feed(source[:i])
+        parser.feed(source[i:])
+        assert serialize(parser.close()) == expected
+
+    parser = HTMLParser()
+    for c in source:
+        parser.feed(c)
+    assert serialize(parser.close()) == expected
+
+
+def test_feed_bytes():
+    source = "<meta charset=iso-8859-2><p>ř" + " " * 1100 + "ř"
+    encoded = source.encode("iso-8859-2")
+    parser = HTMLParser()
+    for i in range(len(encoded)):
+        parser.feed(encoded[i:i + 1])
+    assert parser.documentEncoding == "iso-8859-2"
+    assert serialize(parser.close()) == serialize(parse(encoded))
+
+    parser = HTMLParser()
+    parser.feed(b"\xef\xbb")
+    parser.feed(b"\xbf<p>\xe2\x80")
+    parser.feed(b"\x98")
+    assert serialize(parser.close()) == serialize(parse("<p>‘"))
+    assert parser.documentEncoding == "utf-8"
+
+
+def test_feed_options():
+    parser = HTMLParser()
+    parser.feed(b"<p>\xe2\x80\x98", transport_encoding="utf-8", scripting=True)
+    with pytest.raises(TypeError):
+        parser.feed(b"", transport_encoding="utf-8")
+    assert serialize(parser.close()) == serialize(parse("<p>‘"))
+    # A closed parser starts again with the next feed
+    parser.feed("<p>a")
+    assert serialize(parser.close()) == serialize(parse("<p>a"))
+
+
+@pytest.mark.parametrize("data", ["<p>a", b"<p>a"])
+@pytest.mark.parametrize("option", [{"bogus": 1}, {"transport_encodin": "utf-8"},
+                                    {"transport_encoding": "utf-8"}, {"useChardet": False}])
+def test_feed_bad_options(data, option):
+    # The first feed() takes the same options as parse(), and fails the same way
+    try:
+        parse(data, **option)
+    except TypeError:
+        parser = HTMLParser()
+        with pytest.raises(TypeError):
+            parser.feed(data, **option)
+        # Nothing was started, so the options can be left out instead
+        parser.feed(data)
+        assert serialize(parser.close()) == serialize(parse(data))
+    else:
+        parser = HTMLParser()
+        parser.feed(data, **option)
+        assert serialize(parser.close()) == serialize(parse(data, **option))
+
+
+def test_feed_error():
+    p = HTMLParser(strict=True)
+    source = "<!DOCTYPE html><table> <tr><td>z</table>"
+    # Fails while feeding
+    with pytest.raises(ParseError):
+        p.feed("<!DOCTYPE html><table><td>x</b>")
+    p.feed(source)
+    assert serialize(p.close()) == serialize(parse(source))
+    # Fails at the end of the document
+    p.feed("<!DOCTYPE html><table>")
+    with pytest.raises(ParseError):
+        p.close()
+    assert serialize(p.parse(source)) == serialize(parse(source))
+    p.feed(source)
+    assert serialize(p.close()) == serialize(parse(source))
+
+
+@pytest.mark.parametrize("maxErrors", [None, 0, 3])
+def test_max_errors(maxErrors):
+    source = "<p>\x01\x02\x03</x><td>a&b</p\x00>" * 5
+    allErrors = HTMLParser()
+    allErrors.parse(source)
+    p = HTMLParser(maxErrors=maxErrors)
+    p.parse(source)
+    assert p.errorCount == len(allErrors.errors)
+    assert p.errors == allErrors.errors[:maxErrors]
+
+
+def test_reuse_parser():
+    p = HTMLParser(strict=True)
+    # Leave the parser in the middle of table text
+    with pytest.raises(ParseError):
+        p.parse("<!DOCTYPE html><table>x&not")
+    source = "<!DOCTYPE html><table> <tr><td>z</table>"
+    assert serialize(p.parse(source)) == serialize(parse(source))
+
+
+def test_parser_pool():
+    pool = ParserPool("etree", namespaceHTMLElements=False)
+    sources = ["<b>%d</b>" % i for i in range(40)]
+    results = {}
+
+    def work(offset):
+        for source in sources[offset::4]:
+            results[source] = serialize(pool.parseFragment(source))
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {source: source for source in sources}
+    assert 1 <= len(pool._parsers) <= 4
+
+
+@pytest.mark.parametrize("treebuilder", ["etree", "dom"])
+def test_parser_pool_releases_document(treebuilder):
+    pool = ParserPool(treebuilder)
+    document = weakref.ref(pool.parse(b"<p>a"))
+    parser, = pool._parsers
+    # The idle parser keeps neither the document nor its input
+    gc.collect()
+    assert document() is None
+    assert parser.documentEncoding is None
+    assert serialize(pool.parse("<p>b"), tree=treebuilder) == \
+        serialize(parse("<p>b", treebuilder=treebuilder), tree=treebuilder)
+
+
+@pytest.mark.parametrize("treebuilder", ["etree", "dom"])
+def test_noahs_ark(treebuilder):
+    source = "<p><b x=1><b x=1><b x=2><b x=1><b x=1></p>y"
+    # The earliest of the three equal elements has been dropped from the list
+    # of active formatting elements, so only four are reopened
+    expected = "<p><b x=1><b x=1><b x=2><b x=1><b x=1></b></b></b></b></b></p>" \
+        "<b x=1><b x=2><b x=1><b x=1>y</b></b></b></b>"
+    assert serialize(parseFragment(source, treebuilder=treebuilder),
+                     tree=treebuilder) == expected
+
+
+class ScopeCheckingParser(HTMLParser):
+    """Checks the index of the stack of open elements against a walk down
+    the stack after every token"""
+
+    names = [(namespaces["html"], name) for name in
+             ("html", "body", "p", "a", "b", "li", "ul", "dd", "button", "table",
+              "tbody", "tr", "td", "select", "option", "div")]
+
+    def processTokens(self, tokens):
+        def checked():
+            for token in tokens:
+                yield token
+                self.checkScopes()
+        HTMLParser.processTokens(self, checked())
+
+    def checkScopes(self):
+        openElements = self.tree.openElements
+        for position, node in enumerate(openElements):
+            assert node in openElements
+            assert openElements.index(node) == position
+        assert openElements.foreignPositions == [
+            position for position, node in enumerate(openElements)
+            if node.nameTuple[0] != namespaces["html"]]
+        targets = list(openElements) + self.names + [node.nameTuple for node in openElements]
+        for variant in listElementsMap:
+            for target in targets:
+                assert self.tree.elementInScope(target, variant) == \
+                    self.scanScope(target, variant), (target, variant)
+
+    def scanScope(self, target, variant):
+        listElements, invert = listElementsMap[variant]
+        for node in reversed(self.tree.openElements):
+            if node is target or node.nameTuple == target:
+                return True
+            elif invert ^ (node.nameTuple in listElements):
+                return False
+        return False
+
+
+@pytest.mark.parametrize("treebuilder", ["etree", "dom"])
+@pytest.mark.parametrize("source", [
+    # Adoption agency, with clones replacing elements in the middle of the stack
+    "<div><a><p>1<b>2<div>3</a>4</b>5</p></div><b><i><u><p>6</b>7</i>8",
+    "<a><div><ul><li>1</a><li>2<button>3<p>4</button>5</ul>",
+    "<a><b><i><s><div>1</a>2</b>3",
+    # Foster parenting, with text and formatting elements around the table
+    "<table><tr><td><b>1<table>x<a>2<tr><td>3</table>4</td></tr>5<div>6</table>7",
+    "<p><table><b><tr><td>1</b><select><option>2<optgroup><option>3</table>4",
+    # Foreign content and integration points
+    "<svg><foreignObject><p>1<svg><desc><b>2</svg></p></foreignObject><g>3</svg>4",
+    "<math><mi><b><mtext><table><tr><td><math><annotation-xml encoding=text/html>"
+    "<div>5</math></table></b></mi></math><dd>6<dd>7",
+])
+def test_open_elements_index(treebuilder, source):
+    parser = ScopeCheckingParser(tree=getTreeBuilder(treebuilder))
+    parser.parse(source)
+    parser.parseFragment(source, container="td")
+
+
+def test_coalesce_characters():
+    source = "<table><tr><td>a&amp;b<b>c &lt; d</b>\u0000e</table>x&copy; y<pre>\n\nz&gt;</pre>"
+    expected = serialize(parse(source))
+    assert serialize(parse(source, coalesceCharacters=True)) == expected
+
+
+@pytest.mark.parametrize("feed", [False, True])
+def test_coalesce_characters_cdata(feed):
+    # Whether <![CDATA[ starts a CDATA section depends on the current node,
+    # which the pending "x" has to be inserted into first
+    source = "<math><mi><mi><b></mi>x<![CDATA[y]]>z"
+    expected = serialize(parse(source, treebuilder="dom"), tree="dom")
+    assert "<!--[CDATA[y]]-->" in expected
+    if feed:
+        parser = HTMLParser(tree=getTreeBuilder("dom"))
+        parser.feed(source, coalesceCharacters=True)
+        document = parser.close()
+    else:
+        document = parse(source, treebuilder="dom", coalesceCharacters=True)
+    assert serialize(document, tree="dom") == expected
+
+
+@pytest.mark.parametrize("treebuilder", ["etree", "dom"])
+@pytest.mark.parametrize("source, expected", [
+    ("<p><table><tr>x &amp; y</tr><tr><td>q</td>z</tr></table>w",
+     "<p></p>x &amp; yz<table><tr><tr><td>q</table>w"),
+    # The adoption agency algorithm runs while text is pending before the table
+    ("<a>1<table>2<a>3</a>4</table>5", "<a>12<a>3</a>4<table></table></a>5"),
+])
+def test_foster_parented_text(treebuilder, source, expected):
+    assert serialize(parseFragment(source, treebuilder=treebuilder),
+                     tree=treebuilder) == expected
+
+
+early_exit_doc = ("<!DOCTYPE html><title>T &amp; U</title><link rel=canonical href=\"/c\">"
+                  "<body><p>one</p><p>two</p>")
+
+
+@pytest.mark.parametrize("options, expected", [
+    ({}, "<title>T &amp; U</title><link rel=canonical href=\"/c\"><p>one<p>two"),
+    ({"stopAfter": "head"}, "<title>T &amp; U</title><link rel=canonical href=\"/c\">"),
+    ({"maxTokens": 4}, "<title>T &amp;</title>"),
+    ({"maxCharacters": 86}, "<title>T &amp; U</title><link rel=canonical href=\"/c\"><p>one<p>"),
+    ({"stopWhen": lambda parser: len(parser.tree.openElements) > 2 and
+      parser.tree.openElements[2].name == "p"},
+     "<title>T &amp; U</title><link rel=canonical href=\"/c\"><p>"),
+])
+def test_early_exit(options, expected):
+    parser = HTMLParser()
+    tree = parser.parse(early_exit_doc, **options)
+    assert serialize(tree) == expected
+    assert parser.stoppedEarly == bool(options)
+
+
+def test_early_exit_head_bytes():
+    parser = HTMLParser()
+    tree = parser.parse(early_exit_doc.encode("utf-8"), stopAfter="head")
+    assert serialize(tree) == "<title>T &amp; U</title><link rel=canonical href=\"/c\">"
+    assert parser.stoppedEarly
+
+
+def test_early_exit_bad_stop_after():
+    with pytest.raises(ValueError):
+        parse(early_exit_doc, stopAfter="body")
+    with pytest.raises(ValueError):
+        parseFragment(early_exit_doc, stopAfter="head")
+
+
+@pytest.mark.parametrize("data", [early_exit_doc, early_exit_doc.encode("utf-8")])
+@pytest.mark.parametrize("option", [{"stopAfter": "head"}, {"maxTokens": 1},
+                                    {"maxCharacters": 1}, {"stopWhen": bool}])
+def test_early_exit_feed(data, option):
+    parser = HTMLParser()
+    with pytest.raises(TypeError):
+        parser.feed(data, **option)
+    # Nothing was started, so the options can be left out instead
+    parser.feed(data)
+    assert serialize(parser.close()) == serialize(parse(early_exit_doc))
+
+
+def test_compact_document():
+    source = "<!DOCTYPE html><p class=a>x<!--c--><svg xlink:href=y><path/></svg><br>z"
+    document = parse(source, treebuilder="compact")
+    assert serialize(document, tree="compact") == \
+        serialize(parse(source, treebuilder="dom"), tree="dom")
+
+    body = document.nameTable.index((namespaces["html"], "body"))
+    body = list(document.names).index(body)
+    p, = document.children(body)
+    assert document.name(p) == (namespaces["html"], "p")
+    assert document.attributes(p) == {(None, "class"): "a"}
+    assert document.parent(p) == body
+    text, comment, svg, br, z = document.children(p)
+    assert document.data(text) == "x"
+    assert document.data(comment) == "c"
+    assert document.attributes(svg) == {(namespaces["xlink"], "href"): "y"}
+    assert document.data(z) == "z"
+    assert document.doctype(next(document.children(document.root))) == ("html", None, None)
+
+
+@pytest.mark.parametrize("treebuilder", ["etree", "lxml"])
+def test_etree_closed_wrappers_released(treebuilder):
+    if treebuilder == "lxml":
+        pytest.importorskip("lxml.etree")
+    source = "<div><p>a<b>b</p>c</b></div><table><tr><td>d</table><span>e"
+    parser = HTMLParser(tree=getTreeBuilder(treebuilder))
+    tree = parser.parse(source)
+    # Only the wrappers of the elements still open are kept
+    html, body, span = parser.tree.openElements
+    assert html.childNodes == [body]
+    assert body.childNodes == [span]
+    assert span.childNodes == []
+    assert serialize(tree, tree=treebuilder) == \
+        serialize(parse(source, treebuilder="dom"), tree="dom")
+
+
+def test_lxml_coerced_names():
+    pytest.importorskip("lxml.etree")
+    parser = HTMLParser(tree=getTreeBuilder("lxml"), namespaceHTMLElements=False)
+    # Names that aren't valid XML are coerced, with a warning, every time
+    for i in range(2):
+        with pytest.warns(DataLossWarning):
+            fragment = parser.parseFragment("<p a:b=1 c=2><x:y>z</x:y><svg viewbox=0>")
+        p = fragment[0]
+        assert p.attrib == {"aU0003Ab": "1", "c": "2"}
+        assert p[0].tag == "xU0003Ay"
+        assert p[1].attrib == {"viewBox": "0"}
+
+
+@pytest.mark.parametrize("name, xmlName", [
+    ("div", "div"),
+    ("a:b", "aU0003Ab"),
+    ("1x", "U00031x"),
+    ("\u00e9t\u00e9", "\u00e9t\u00e9"),
+    ("x\u00b7 ", "x\u00b7U00020"),
+])
+def test_infoset_filter_names(name, xmlName):
+    for infosetFilter in (InfosetFilter(), InfosetFilter(preventDoubleDashComments=True)):
+        # The second time round the names come from the cache, and still warn
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            assert infosetFilter.coerceElement(name) == xmlName
+        assert bool(caught) == (name != xmlName)
+        assert infosetFilter.fromXmlName(xmlName) == name
@@ -3,6 +3,7 @@ from __future__ import absolute_import, division, unicode_literals
 from . import support  # noqa
 
 import codecs
+import re
 import sys
 from io import BytesIO, StringIO
 
@@ -98,6 +99,18 @@ class HTMLBinaryInputStreamShortChunk(HTMLBinaryInputStream):
     _defaultChunkSize = 2
 
 
+def test_characters_read():
+    stream = HTMLUnicodeInputStreamShortChunk("a\r\nbcde")
+    assert stream.charactersRead() == 0
+    assert stream.char() == "a"
+    assert stream.charsUntil("d") == "\nbc"
+    assert stream.charactersRead() == 4
+    stream.unget(stream.char())
+    assert stream.charactersRead() == 4
+    assert stream.charsUntil("x") == "de"
+    assert stream.charactersRead() == 6
+
+
 def test_char_ascii():
     stream = HTMLInputStream(b"'", override_encoding='ascii')
     assert stream.charEncoding[0].name == 'windows-1252'
@@ -181,6 +194,50 @@ def test_position2():
     assert stream.position() == (2, 1)
 
 
+def test_position_only_asked_late():
+    stream = HTMLUnicodeInputStreamShortChunk("ab\ncd\nef\ngh")
+    assert stream.charsUntil("g") == "ab\ncd\nef\n"
+    assert stream.position() == (4, 0)
+    assert stream.char() == "g"
+    assert stream.position() == (4, 1)
+    assert stream.charsUntil("x") == "h"
+    assert stream.position() == (4, 2)
+
+
+def test_utf8_decoded_at_once():
+    stream = HTMLBinaryInputStreamShortChunk(b"ab\r\ncd\xe2\x80\x98" * 10,
+                                             transport_encoding="utf-8")
+    assert stream.charsUntil("x") == "ab\ncd\u2018" * 10
+    assert stream.position() == (11, 3)
+    assert stream.char() is None
+
+
+def test_utf8_invalid_codepoints_reported_in_place():
+    stream = HTMLInputStream(codecs.BOM_UTF8 + b"ab\x01c\nd\x0be")
+    assert stream.char() == "a"
+    assert stream.errors == []
+    assert stream.charsUntil("\x01") == "b"
+    assert stream.errors == ["invalid-codepoint"]
+    assert stream.position() == (1, 2)
+    assert stream.charsUntil("\x0b") == "\x01c\nd"
+    assert stream.errors == ["invalid-codepoint"] * 2
+    assert stream.position() == (2, 1)
+    assert stream.charsUntil("x") == "\x0be"
+
+
+def test_chars_matching():
+    regexp = re.compile("[a-z]+")
+    stream = HTMLUnicodeInputStreamShortChunk("abc1")
+    assert stream.charsMatching(regexp) == ""
+    assert stream.char() == "a"
+    # The run stops at the end of the current chunk
+    assert stream.charsMatching(regexp) == "b"
+    assert stream.charsMatching(regexp) == ""
+    assert stream.char() == "c"
+    assert stream.charsMatching(regexp) == ""
+    assert stream.char() == "1"
+
+
 def test_python_issue_20007():
     """
     Make sure we have a work-around for Python bug #20007
@@ -323,3 +380,56 @@ def test_invalid_codepoints_surrogates(inp, num):
     for _i in range(len(inp)):
         stream.char()
     assert len(stream.errors) == num
+
+
+@pytest.mark.skipif(sys.version_info < (3, 6), reason="needs os.PathLike")
+@pytest.mark.parametrize("content, encoding, expected", [
+    (codecs.BOM_UTF8 + "a\r\n‘".encode("utf-8"), "utf-8", "a\n‘"),
+    ("<meta charset=windows-1252>\xa9".encode("windows-1252"), "windows-1252",
+     "<meta charset=windows-1252>\xa9"),
+    (b"", None, ""),
+])
+def test_mapped_file(tmp_path, content, encoding, expected):
+    path = tmp_path / "doc.html"
+    path.write_bytes(content)
+
+    stream = HTMLInputStream(path)
+    if encoding is not None:
+        assert stream.charEncoding[0].name == encoding
+    assert stream.charsUntil("\0") == expected
+
+
+@pytest.mark.skipif(sys.version_info < (3, 6), reason="mmap doesn't support memoryview")
+def test_mmap_source(tmp_path):
+    import mmap
+    path = tmp_path / "doc.html"
+    path.write_bytes("<p>‘".encode("utf-8"))
+
+    with open(str(path), "rb") as fp:
+        mapping = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+    stream = HTMLInputStream(mapping, transport_encoding="utf-8")
+    assert stream.charsUntil("\0") == "<p>‘"
+    # The mapping isn't held on to once it has been decoded
+    mapping.close()
+
+
+@pytest.mark.skipif(sys.version_info < (3, 6), reason="needs os.PathLike")
+@pytest.mark.parametrize("options", [{"transport_encoding": "utf-8"},
+                                     {"transport_encoding": "windows-1252"},
+                                     {"maxTokens": 1}])
+def test_mapped_file_closed(tmp_path, monkeypatch, options):
+    from html5lib import _inputstream, parse
+    mappings = []
+    originalMapFile = _inputstream.mapFile
+
+    def mapFile(path):
+        mappings.append(originalMapFile(path))
+        return mappings[-1]
+    monkeypatch.setattr("html5lib._inputstream.mapFile", mapFile)
+
+    path = tmp_path / "doc.html"
+    path.write_bytes(b"<p>a<p>b")
+    parse(path, useChardet=False, **options)
+    # The parser lets go of the file it mapped itself, even when it stops early
+    mapping, = mappings
+    assert mapping.closed
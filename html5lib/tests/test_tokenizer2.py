@@ -4,6 +4,9 @@ import io
 
 from six import unichr, text_type
 
+import pytest
+
+from html5lib._inputstream import HTMLUnicodeInputStream
 from html5lib._tokenizer import HTMLTokenizer
 from html5lib.constants import tokenTypes
 
@@ -64,3 +67,99 @@ def test_maintain_duplicate_attribute_order():
     for (in_name, in_value), (out_name, out_value) in zip(attrs, attrs_tok.items()):
         assert in_name == out_name
         assert in_value == out_value
+
+
+def test_compact_tokens_match_dict_tokens():
+    source = ("<!DOCTYPE html><p class=a id='b' data-x=\"&amp;c\">x &lt; y\n"
+              "<!-- comment --></p><br/><svg><![CDATA[z]]></svg>&#0;</x a>")
+
+    dict_toks = list(HTMLTokenizer(io.StringIO(source)))
+    compact_toks = list(HTMLTokenizer(io.StringIO(source), compactTokens=True))
+
+    assert compact_toks == dict_toks
+    assert [dict(tok) for tok in compact_toks] == dict_toks
+
+
+def test_compact_token_mapping_interface():
+    toks = list(HTMLTokenizer(io.StringIO("<a href=x>"), compactTokens=True))
+    assert len(toks) == 1
+    tok = toks[0]
+
+    assert tok["name"] == "a"
+    assert "name" in tok
+    assert "namespace" not in tok
+    assert tok.get("namespace", "default") == "default"
+    assert sorted(tok.keys()) == ["data", "name", "selfClosing",
+                                  "selfClosingAcknowledged", "type"]
+
+    tok["namespace"] = "urn:x"
+    assert tok.get("namespace") == "urn:x"
+    del tok["name"]
+    assert "name" not in tok
+
+    # Missing keys, and names that are attributes but not keys, fail as
+    # they would with a dict
+    for key in ("name", "get", "keys", "__class__"):
+        with pytest.raises(KeyError):
+            tok[key]
+        with pytest.raises(KeyError):
+            del tok[key]
+    with pytest.raises(KeyError):
+        tok["get"] = 1
+
+
+def test_runs_split_across_chunks():
+    class ShortChunkStream(HTMLUnicodeInputStream):
+        _defaultChunkSize = 3
+
+    source = ("<DIV data-foo-bar=\"a&amp;b\" data-Baz='c\u0000d' x=e&lt;f&g>"
+              "<img src=a.png alt=\"\"></div\t>")
+    expected = list(HTMLTokenizer(io.StringIO(source)))
+
+    toks = HTMLTokenizer(io.StringIO(source))
+    toks.stream = ShortChunkStream(source)
+    assert list(toks) == expected
+
+
+def test_feed():
+    def merged(toks):
+        out = []
+        for tok in toks:
+            if (out and tok["type"] == tokenTypes["Characters"] and
+                    out[-1]["type"] == tokenTypes["Characters"]):
+                out[-1]["data"] += tok["data"]
+            else:
+                out.append(tok)
+        return out
+
+    source = "<a href='x&amp;y'>b&notin;c&#65<!-- d --></a>"
+    expected = merged(HTMLTokenizer(io.StringIO(source)))
+
+    toks = HTMLTokenizer(None)
+    out = []
+    for c in source:
+        out.extend(toks.feed(c))
+    out.extend(toks.close())
+    assert merged(out) == expected
+
+
+def test_named_entity_longest_match():
+    source = "&notit; &not\u0100 &amp\U0001F600 &ampx; &NotNestedGreaterGreater;&xyz;"
+    data = "".join(tok["data"] for tok in ignore_parse_errors(HTMLTokenizer(source)))
+    assert data == "\xacit; \xac\u0100 &\U0001F600 &x; \u2aa2\u0338&xyz;"
+
+
+def test_coalesce_characters():
+    source = "a&amp;b &lt; c\u0000d<p>  \n e</p>"
+    toks = list(ignore_parse_errors(HTMLTokenizer(source, coalesceCharacters=True)))
+    assert [(tok["type"], tok.get("data")) for tok in toks] == [
+        (tokenTypes["Characters"], "a&b <"),
+        (tokenTypes["SpaceCharacters"], " "),
+        (tokenTypes["Characters"], "c"),
+        (tokenTypes["Characters"], "\u0000"),
+        (tokenTypes["Characters"], "d"),
+        (tokenTypes["StartTag"], {}),
+        (tokenTypes["SpaceCharacters"], "  \n "),
+        (tokenTypes["Characters"], "e"),
+        (tokenTypes["EndTag"], []),
+    ]
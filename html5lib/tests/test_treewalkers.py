@@ -93,6 +93,8 @@ def test_treewalker_six_mix(intext, expected, attrs_to_add, tree):
     treeName, treeClass = tree
     if treeClass is None:
         pytest.skip("Treebuilder not loaded")
+    if treeName == "compact":
+        pytest.skip("Compact trees can't be changed")
     parser = html5parser.HTMLParser(tree=treeClass["builder"])
     document = parser.parseFragment(intext)
     for nom, val in attrs_to_add:
@@ -203,3 +205,19 @@ def test_maintain_attribute_order_adjusted(treeName):
                                        ((None, 'b'), '3'),
                                        (('http://www.w3.org/XML/1998/namespace', 'lang'), '4'),
                                        ((None, 'c'), '5')]
+
+
+def test_etree_repeated_child():
+    # The walker keeps track of where it is in each parent, rather than
+    # looking its way back up, so an element can appear more than once
+    import xml.etree.ElementTree as ElementTree
+
+    item = ElementTree.Element("li")
+    ElementTree.SubElement(item, "a").text = "x"
+    item.tail = "y"
+    root = ElementTree.Element("ul")
+    root.extend([item, item, item])
+
+    walker = treewalkers.getTreeWalker("etree", ElementTree)
+    output = treewalkers.pprint(walker(root))
+    assert output == "<ul>\n" + "\n".join(["  <li>\n    <a>\n      \"x\"\n  \"y\""] * 3)
@@ -49,6 +49,8 @@ def getTreeBuilder(treeType, implementation=None, **kwargs):
           available and xml.etree.ElementTree if not.
         * "lxml" - A etree-based builder for lxml.etree, handling limitations
           of lxml's implementation.
+        * "compact" - A builder for read-only documents stored as arrays,
+          much smaller than the other trees.
 
     :arg implementation: (Currently applies to the "etree" and "dom" tree
         types). A module implementing the tree type e.g. xml.etree.ElementTree
@@ -77,6 +79,9 @@ def getTreeBuilder(treeType, implementation=None, **kwargs):
         elif treeType == "lxml":
             from . import etree_lxml
             treeBuilderCache[treeType] = etree_lxml.TreeBuilder
+        elif treeType == "compact":
+            from . import compact
+            treeBuilderCache[treeType] = compact.TreeBuilder
         elif treeType == "etree":
             from . import etree
             if implementation is None:
@@ -1,4 +1,6 @@
 from __future__ import absolute_import, division, unicode_literals
+from bisect import bisect_left, insort
+
 from six import text_type
 
 from ..constants import scopingElements, tableInsertModeElements, namespaces
@@ -19,6 +21,20 @@ listElementsMap = {
                           (namespaces["html"], "option")]), True)
 }
 
+noAttributes = frozenset()
+
+# nameTuple -> the variants in listElementsMap whose scope the element bounds
+boundaryVariants = {}
+
+
+def getBoundaryVariants(nameTuple):
+    variants = boundaryVariants.get(nameTuple)
+    if variants is None:
+        variants = boundaryVariants[nameTuple] = tuple(
+            variant for variant, (listElements, invert) in listElementsMap.items()
+            if invert ^ (nameTuple in listElements))
+    return variants
+
 
 class Node(object):
     """Represents an item in the tree"""
@@ -119,21 +135,266 @@ class Node(object):
         raise NotImplementedError
 
 
+class OpenElements(list):
+    """The stack of open elements
+
+    Alongside the elements themselves it keeps the position of each element,
+    the positions of the open elements of each name, the positions of the
+    elements bounding each variant of scope and the positions of the SVG and
+    MathML elements, so that membership tests, index(), scope checks and
+    asking whether any foreign content is open don't need to walk the stack.
+    Pushing and popping the current node keep these up to date as they go;
+    changes anywhere else in the stack, which only the adoption agency
+    algorithm makes, rebuild them.
+
+    """
+
+    def __init__(self):
+        list.__init__(self)
+        # node -> its position
+        self.nodePositions = {}
+        # nameTuple -> positions of the open elements with that name
+        self.positions = {}
+        # variant -> positions of the open elements that bound its scope
+        self.boundaries = {variant: [] for variant in listElementsMap}
+        # positions of the open elements that aren't HTML elements
+        self.foreignPositions = []
+
+    def _index(self, node, position):
+        self.nodePositions[node] = position
+        nameTuple = node.nameTuple
+        positions = self.positions.get(nameTuple)
+        if positions is None:
+            self.positions[nameTuple] = [position]
+        else:
+            positions.append(position)
+        boundaries = self.boundaries
+        for variant in getBoundaryVariants(nameTuple):
+            boundaries[variant].append(position)
+        if nameTuple[0] != namespaces["html"]:
+            self.foreignPositions.append(position)
+
+    def _reindex(self):
+        self.nodePositions = {}
+        self.positions = {}
+        self.boundaries = {variant: [] for variant in listElementsMap}
+        self.foreignPositions = []
+        for position, node in enumerate(self):
+            self._index(node, position)
+
+    def append(self, node):
+        self._index(node, len(self))
+        list.append(self, node)
+
+    def pop(self, index=-1):
+        node = list.pop(self, index)
+        if index == -1 or index == len(self):
+            del self.nodePositions[node]
+            nameTuple = node.nameTuple
+            self.positions[nameTuple].pop()
+            boundaries = self.boundaries
+            for variant in getBoundaryVariants(nameTuple):
+                boundaries[variant].pop()
+            if nameTuple[0] != namespaces["html"]:
+                self.foreignPositions.pop()
+        else:
+            self._reindex()
+        return node
+
+    def insert(self, index, node):
+        if index >= len(self):
+            OpenElements.append(self, node)
+        else:
+            list.insert(self, index, node)
+            self._reindex()
+
+    def remove(self, node):
+        if self and self[-1] is node:
+            OpenElements.pop(self)
+        else:
+            list.remove(self, node)
+            self._reindex()
+
+    def __setitem__(self, index, node):
+        list.__setitem__(self, index, node)
+        self._reindex()
+
+    def __contains__(self, node):
+        return node in self.nodePositions
+
+    def index(self, node):
+        try:
+            return self.nodePositions[node]
+        except KeyError:
+            raise ValueError("%r is not an open element" % (node,))
+
+    def lastPosition(self, nameTuple):
+        """Return the position of the topmost open element with the given
+        name, or -1 if there is none"""
+        positions = self.positions.get(nameTuple)
+        return positions[-1] if positions else -1
+
+
 class ActiveFormattingElements(list):
+    """The list of active formatting elements
+
+    Every entry, markers included, has a key, and the keys increase along
+    the list. Removing an entry leaves the keys of the others as they are,
+    and an entry inserted in the middle gets a key between those of its
+    neighbours, so the list keeps the keys of the elements of each name, the
+    keys of the elements of each signature (the name, namespace and
+    attributes of an element) and the keys of the markers without walking
+    the list. Finding the last element of a name since the last marker, the
+    Noah's Ark clause, membership tests and index() are then lookups rather
+    than scans.
+
+    """
+
+    def __init__(self):
+        list.__init__(self)
+        self._reindex()
+
+    def signature(self, node):
+        """Return a hashable summary of the name, namespace and attributes of
+        node; two elements are equal for the Noah's Ark clause if their
+        signatures are"""
+        attributes = node.attributes
+        if not attributes:
+            return node.nameTuple, noAttributes
+        return (node.nameTuple,
+                frozenset([(name, attributes[name]) for name in attributes]))
+
+    def _reindex(self):
+        # The key of each entry, in the order of the list
+        self.allKeys = []
+        # node -> (its key, its signature)
+        self.entries = {}
+        # name -> keys of the elements with that name
+        self.nameKeys = {}
+        # signature -> keys of the elements with that signature
+        self.signatureKeys = {}
+        # keys of the markers
+        self.markerKeys = []
+        for key, node in enumerate(self):
+            self.allKeys.append(key)
+            self._index(node, key)
+
+    def _index(self, node, key):
+        if node is Marker:
+            insort(self.markerKeys, key)
+            return
+        signature = self.signature(node)
+        self.entries[node] = (key, signature)
+        for keysMap, mapKey in ((self.nameKeys, node.name),
+                                (self.signatureKeys, signature)):
+            keys = keysMap.get(mapKey)
+            if keys is None:
+                keysMap[mapKey] = [key]
+            elif keys and keys[-1] > key:
+                insort(keys, key)
+            else:
+                keys.append(key)
+
+    def _unindex(self, node, key):
+        if node is Marker:
+            self.markerKeys.remove(key)
+            return
+        signature = self.entries.pop(node)[1]
+        self.nameKeys[node.name].remove(key)
+        self.signatureKeys[signature].remove(key)
+
     def append(self, node):
         """Append node to the end of the list."""
-        equalCount = 0
-        if node != Marker:
-            for element in self[::-1]:
-                if element == Marker:
-                    break
-                if self.nodesEqual(element, node):
-                    equalCount += 1
-                if equalCount == 3:
-                    self.remove(element)
-                    break
+        allKeys = self.allKeys
+        key = allKeys[-1] + 1 if allKeys else 0
+        if node is Marker:
+            self.markerKeys.append(key)
+        else:
+            # Noah's Ark clause: there are at most three equal elements after
+            # the last marker, so if there are three already the earliest of
+            # them goes
+            signature = self.signature(node)
+            keys = self.signatureKeys.get(signature)
+            if keys is None:
+                self.signatureKeys[signature] = [key]
+            else:
+                if len(keys) >= 3:
+                    earliest = keys[-3]
+                    if not self.markerKeys or earliest > self.markerKeys[-1]:
+                        ActiveFormattingElements.pop(
+                            self, bisect_left(allKeys, earliest))
+                keys.append(key)
+            self.entries[node] = (key, signature)
+            keys = self.nameKeys.get(node.name)
+            if keys is None:
+                self.nameKeys[node.name] = [key]
+            else:
+                keys.append(key)
+        allKeys.append(key)
         list.append(self, node)
 
+    def pop(self, index=-1):
+        node = list.pop(self, index)
+        self._unindex(node, self.allKeys.pop(index))
+        return node
+
+    def insert(self, index, node):
+        allKeys = self.allKeys
+        if index >= len(self):
+            key = allKeys[-1] + 1 if allKeys else 0
+        else:
+            high = allKeys[index]
+            low = allKeys[index - 1] if index > 0 else high - 1
+            key = (low + high) / 2
+            if not low < key < high:
+                # Out of room between the neighbours
+                list.insert(self, index, node)
+                self._reindex()
+                return
+        allKeys.insert(index, key)
+        list.insert(self, index, node)
+        self._index(node, key)
+
+    def remove(self, node):
+        ActiveFormattingElements.pop(self, self.index(node))
+
+    def __setitem__(self, index, node):
+        key = self.allKeys[index]
+        old = self[index]
+        list.__setitem__(self, index, node)
+        if (old is not Marker and node is not Marker and
+                node.nameTuple == old.nameTuple and node.attributes == old.attributes):
+            # The usual case is an element being replaced by its clone, which
+            # takes its place in every index
+            self.entries[node] = self.entries.pop(old)
+        else:
+            self._unindex(old, key)
+            self._index(node, key)
+
+    def __contains__(self, node):
+        if node is Marker:
+            return bool(self.markerKeys)
+        return node in self.entries
+
+    def index(self, node):
+        if node is Marker:
+            return list.index(self, node)
+        try:
+            key = self.entries[node][0]
+        except KeyError:
+            raise ValueError("%r is not an active formatting element" % (node,))
+        return bisect_left(self.allKeys, key)
+
+    def lastAfterMarker(self, name):
+        """Return the last element with the given name after the last
+        marker, or None if there is none"""
+        keys = self.nameKeys.get(name)
+        if keys:
+            key = keys[-1]
+            if not self.markerKeys or key > self.markerKeys[-1]:
+                return self[bisect_left(self.allKeys, key)]
+        return None
+
     def nodesEqual(self, node1, node2):
         if not node1.nameTuple == node2.nameTuple:
             return False
@@ -183,7 +444,7 @@ class TreeBuilder(object):
         self.reset()
 
     def reset(self):
-        self.openElements = []
+        self.openElements = OpenElements()
         self.activeFormattingElements = ActiveFormattingElements()
 
         # XXX - rename these to headElement, formElement
@@ -199,22 +460,32 @@ class TreeBuilder(object):
         # If we pass a node in we match that. if we pass a string
         # match any node with that name
         exactNode = hasattr(target, "nameTuple")
-        if not exactNode:
-            if isinstance(target, text_type):
-                target = (namespaces["html"], target)
+        if exactNode:
+            nameTuple = target.nameTuple
+        elif isinstance(target, text_type):
+            nameTuple = (namespaces["html"], target)
+        else:
             assert isinstance(target, tuple)
+            nameTuple = target
 
-        listElements, invert = listElementsMap[variant]
+        openElements = self.openElements
+        positions = openElements.positions.get(nameTuple)
+        if not positions:
+            return False
 
-        for node in reversed(self.openElements):
-            if exactNode and node == target:
-                return True
-            elif not exactNode and node.nameTuple == target:
-                return True
-            elif (invert ^ (node.nameTuple in listElements)):
-                return False
+        # The target is in scope if it is at or above the topmost element
+        # bounding the scope
+        boundaries = openElements.boundaries[variant]
+        boundary = boundaries[-1] if boundaries else 0
+        if not exactNode:
+            return positions[-1] >= boundary
 
-        assert False  # We should never reach this point
+        for position in reversed(positions):
+            if position < boundary:
+                return False
+            if openElements[position] is target:
+                return True
+        return False
 
     def reconstructActiveFormattingElements(self):
         # Within this algorithm the order of steps described in the
@@ -272,14 +543,8 @@ class TreeBuilder(object):
         formatting elements and the last marker. If it does, return it, else
         return false"""
 
-        for item in self.activeFormattingElements[::-1]:
-            # Check for Marker first because if it's a Marker it doesn't have a
-            # name attribute.
-            if item == Marker:
-                break
-            elif item.name == name:
-                return item
-        return False
+        item = self.activeFormattingElements.lastAfterMarker(name)
+        return item if item is not None else False
 
     def insertRoot(self, token):
         element = self.createElement(token)
@@ -333,10 +598,10 @@ class TreeBuilder(object):
 
     def insertElementTable(self, token):
         """Create an element and insert it into the tree"""
-        element = self.createElement(token)
         if self.openElements[-1].name not in tableInsertModeElements:
             return self.insertElementNormal(token)
         else:
+            element = self.createElement(token)
             # We should be in the InTable mode. This means we want to do
             # special magic element rearranging
             parent, insertBefore = self.getTableMisnestedNodePosition()
@@ -368,22 +633,18 @@ class TreeBuilder(object):
         # The foster parent element is the one which comes before the most
         # recently opened table element
         # XXX - this is really inelegant
-        lastTable = None
         fosterParent = None
         insertBefore = None
-        for elm in self.openElements[::-1]:
-            if elm.name == "table":
-                lastTable = elm
-                break
-        if lastTable:
+        lastTablePosition = self.openElements.lastPosition((namespaces["html"], "table"))
+        if lastTablePosition != -1:
+            lastTable = self.openElements[lastTablePosition]
             # XXX - we should really check that this parent is actually a
             # node here
             if lastTable.parent:
                 fosterParent = lastTable.parent
                 insertBefore = lastTable
             else:
-                fosterParent = self.openElements[
-                    self.openElements.index(lastTable) - 1]
+                fosterParent = self.openElements[lastTablePosition - 1]
         else:
             fosterParent = self.openElements[0]
         return fosterParent, insertBefore
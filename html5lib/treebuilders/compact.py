@@ -0,0 +1,398 @@
+"""Module for building documents stored as parallel arrays
+
+Every node of the document is a number, and what there is to know about it
+is kept in arrays indexed by that number rather than in an object per node,
+which makes the tree an order of magnitude smaller than an ElementTree or a
+minidom one, and walking it a matter of following indexes. The tree can't be
+changed once it is built.
+"""
+
+from __future__ import absolute_import, division, unicode_literals
+
+from array import array
+
+from six import text_type
+
+from . import base
+from .. import constants
+from ..constants import namespaces
+
+#: Node kinds, as found in :py:attr:`Document.kinds`
+DOCUMENT = 0
+FRAGMENT = 1
+DOCTYPE = 2
+ELEMENT = 3
+TEXT = 4
+COMMENT = 5
+
+
+class Document(object):
+    """A parsed document or fragment
+
+    Node ``i`` is described by the ``i``-th item of each of these arrays:
+
+    * ``kinds`` - the kind of node, one of :py:data:`DOCUMENT`,
+      :py:data:`FRAGMENT`, :py:data:`DOCTYPE`, :py:data:`ELEMENT`,
+      :py:data:`TEXT` and :py:data:`COMMENT`
+    * ``parents``, ``firstChildren`` and ``nextSiblings`` - the index of the
+      node's parent, first child and next sibling, or -1 if there is none
+    * ``names`` - for elements, the index in ``nameTable`` of their
+      ``(namespace, name)``
+    * ``starts`` and ``ends`` - for text and comments, where their data is
+      in ``text``; for elements, where their attributes are in
+      ``attributeNames``, ``attributeValueStarts`` and ``attributeValueEnds``
+
+    Attribute names are in ``nameTable`` too and attribute values in
+    ``text``. Nodes that were removed from the tree while it was built are
+    still there, but can't be reached from ``root``.
+
+    """
+
+    def __init__(self, root, kinds, parents, firstChildren, nextSiblings, names,
+                 starts, ends, nameTable, attributeNames, attributeValueStarts,
+                 attributeValueEnds, text, doctypes):
+        #: The index of the document or fragment node
+        self.root = root
+        self.kinds = kinds
+        self.parents = parents
+        self.firstChildren = firstChildren
+        self.nextSiblings = nextSiblings
+        self.names = names
+        self.starts = starts
+        self.ends = ends
+        self.nameTable = nameTable
+        self.attributeNames = attributeNames
+        self.attributeValueStarts = attributeValueStarts
+        self.attributeValueEnds = attributeValueEnds
+        self.text = text
+        self._doctypes = doctypes
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def kind(self, node):
+        """Return the kind of a node"""
+        return self.kinds[node]
+
+    def parent(self, node):
+        """Return the index of the parent of a node, or None"""
+        parent = self.parents[node]
+        return parent if parent >= 0 else None
+
+    def children(self, node):
+        """Iterate over the indexes of the children of a node"""
+        nextSiblings = self.nextSiblings
+        child = self.firstChildren[node]
+        while child >= 0:
+            yield child
+            child = nextSiblings[child]
+
+    def name(self, node):
+        """Return the ``(namespace, name)`` of an element"""
+        return self.nameTable[self.names[node]]
+
+    def attributes(self, node):
+        """Return the attributes of an element as a dict of ``(namespace,
+        name)`` to value"""
+        nameTable = self.nameTable
+        text = self.text
+        return {nameTable[self.attributeNames[i]]:
+                text[self.attributeValueStarts[i]:self.attributeValueEnds[i]]
+                for i in range(self.starts[node], self.ends[node])}
+
+    def data(self, node):
+        """Return the text of a text node or comment"""
+        return self.text[self.starts[node]:self.ends[node]]
+
+    def doctype(self, node):
+        """Return the ``(name, publicId, systemId)`` of a doctype"""
+        return self._doctypes[node]
+
+
+class Node(object):
+    """A node of a document that is being built, which is only a number and
+    a way to get at the arrays of the treebuilder"""
+    __slots__ = ("tree", "index", "name", "namespace", "nameTuple", "value")
+
+    def __init__(self, tree, index, name=None, namespace=None, value=None):
+        self.tree = tree
+        self.index = index
+        self.name = name
+        self.namespace = namespace
+        self.nameTuple = (namespace or namespaces["html"], name)
+        # The attributes of an element, the data of a comment or the name,
+        # public id and system id of a doctype
+        self.value = value
+
+    def __repr__(self):
+        return "<%s>" % (self.name,)
+
+    def _getAttributes(self):
+        return self.value
+
+    def _setAttributes(self, attributes):
+        self.value = attributes
+
+    attributes = property(_getAttributes, _setAttributes)
+
+    def _getParent(self):
+        parent = self.tree.parents[self.index]
+        return self.tree.nodes[parent] if parent >= 0 else None
+
+    parent = property(_getParent)
+
+    def appendChild(self, node):
+        self.tree.appendNode(self.index, node.index)
+
+    def insertBefore(self, node, refNode):
+        self.tree.insertNode(self.index, node.index, refNode.index)
+
+    def removeChild(self, node):
+        self.tree.removeNode(node.index)
+
+    def insertText(self, data, insertBefore=None):
+        self.tree.insertTextNode(self.index, data,
+                                 insertBefore.index if insertBefore is not None else -1)
+
+    def reparentChildren(self, newParent):
+        tree = self.tree
+        child = tree.firstChildren[self.index]
+        while child >= 0:
+            nextChild = tree.nextSiblings[child]
+            tree.appendNode(newParent.index, child)
+            child = nextChild
+
+    def cloneNode(self):
+        return self.tree.elementClass(self.name, self.namespace,
+                                      dict(self.value) if self.value else {})
+
+    def hasContent(self):
+        return self.tree.firstChildren[self.index] >= 0
+
+
+class TreeBuilder(base.TreeBuilder):
+    """A treebuilder that returns a :py:class:`Document`"""
+
+    def reset(self):
+        # Links between nodes, by index
+        self.kinds = array("b")
+        self.parents = array("i")
+        self.firstChildren = array("i")
+        self.lastChildren = array("i")
+        self.previousSiblings = array("i")
+        self.nextSiblings = array("i")
+        self.names = array("i")
+        # The Node of each node, or for text nodes the pieces of their text
+        self.nodes = []
+        self.nameTable = []
+        self.nameIds = {}
+        base.TreeBuilder.reset(self)
+
+    def _newNode(self, kind, nameId=-1):
+        index = len(self.kinds)
+        self.kinds.append(kind)
+        self.parents.append(-1)
+        self.firstChildren.append(-1)
+        self.lastChildren.append(-1)
+        self.previousSiblings.append(-1)
+        self.nextSiblings.append(-1)
+        self.names.append(nameId)
+        return index
+
+    def _nameId(self, nameTuple):
+        nameId = self.nameIds.get(nameTuple)
+        if nameId is None:
+            nameId = self.nameIds[nameTuple] = len(self.nameTable)
+            self.nameTable.append(nameTuple)
+        return nameId
+
+    def documentClass(self):
+        node = Node(self, self._newNode(DOCUMENT))
+        self.nodes.append(node)
+        return node
+
+    def fragmentClass(self):
+        node = Node(self, self._newNode(FRAGMENT))
+        self.nodes.append(node)
+        return node
+
+    def elementClass(self, name, namespace=None, attributes=None):
+        index = self._newNode(ELEMENT, self._nameId((namespace, name)))
+        node = Node(self, index, name, namespace, attributes)
+        self.nodes.append(node)
+        return node
+
+    def commentClass(self, data):
+        node = Node(self, self._newNode(COMMENT), value=data)
+        self.nodes.append(node)
+        return node
+
+    def doctypeClass(self, name, publicId, systemId):
+        node = Node(self, self._newNode(DOCTYPE), value=(name, publicId, systemId))
+        self.nodes.append(node)
+        return node
+
+    def appendNode(self, parent, node):
+        if self.parents[node] >= 0:
+            self.removeNode(node)
+        last = self.lastChildren[parent]
+        if last >= 0:
+            self.nextSiblings[last] = node
+            self.previousSiblings[node] = last
+        else:
+            self.firstChildren[parent] = node
+        self.lastChildren[parent] = node
+        self.parents[node] = parent
+
+    def insertNode(self, parent, node, refNode):
+        if self.parents[node] >= 0:
+            self.removeNode(node)
+        previous = self.previousSiblings[refNode]
+        if previous >= 0:
+            self.nextSiblings[previous] = node
+        else:
+            self.firstChildren[parent] = node
+        self.previousSiblings[node] = previous
+        self.nextSiblings[node] = refNode
+        self.previousSiblings[refNode] = node
+        self.parents[node] = parent
+
+    def removeNode(self, node):
+        parent = self.parents[node]
+        previous = self.previousSiblings[node]
+        nextSibling = self.nextSiblings[node]
+        if previous >= 0:
+            self.nextSiblings[previous] = nextSibling
+        else:
+            self.firstChildren[parent] = nextSibling
+        if nextSibling >= 0:
+            self.previousSiblings[nextSibling] = previous
+        else:
+            self.lastChildren[parent] = previous
+        self.parents[node] = self.previousSiblings[node] = self.nextSiblings[node] = -1
+
+    def insertTextNode(self, parent, data, refNode=-1):
+        # Text next to a text node is added to it, as for the DOM
+        if refNode < 0:
+            previous = self.lastChildren[parent]
+        else:
+            previous = self.previousSiblings[refNode]
+        if previous >= 0 and self.kinds[previous] == TEXT:
+            self.nodes[previous].append(data)
+            return
+        node = self._newNode(TEXT)
+        self.nodes.append([data])
+        if refNode < 0:
+            self.appendNode(parent, node)
+        else:
+            self.insertNode(parent, node, refNode)
+
+    def getDocument(self):
+        return self._pack(self.document.index)
+
+    def getFragment(self):
+        return self._pack(base.TreeBuilder.getFragment(self).index)
+
+    def _pack(self, root):
+        """Move the tree into a Document, dropping the Nodes"""
+        kinds = self.kinds
+        nodes = self.nodes
+        nameId = self._nameId
+        count = len(kinds)
+        starts = array("i", [0]) * count
+        ends = array("i", [0]) * count
+        attributeNames = array("i")
+        attributeValueStarts = array("i")
+        attributeValueEnds = array("i")
+        doctypes = {}
+        pieces = []
+        offset = 0
+        for index in range(count):
+            kind = kinds[index]
+            if kind == TEXT or kind == COMMENT:
+                if kind == TEXT:
+                    data = "".join(nodes[index])
+                else:
+                    data = nodes[index].value
+                pieces.append(data)
+                starts[index] = offset
+                offset += len(data)
+                ends[index] = offset
+            elif kind == ELEMENT:
+                attributes = nodes[index].value
+                if attributes:
+                    starts[index] = len(attributeNames)
+                    for name, value in attributes.items():
+                        if isinstance(name, tuple):
+                            name = (name[2], name[1])
+                        else:
+                            name = (None, name)
+                        attributeNames.append(nameId(name))
+                        pieces.append(value)
+                        attributeValueStarts.append(offset)
+                        offset += len(value)
+                        attributeValueEnds.append(offset)
+                    ends[index] = len(attributeNames)
+            elif kind == DOCTYPE:
+                doctypes[index] = nodes[index].value
+
+        document = Document(root, kinds, self.parents, self.firstChildren,
+                            self.nextSiblings, self.names, starts, ends,
+                            self.nameTable, attributeNames, attributeValueStarts,
+                            attributeValueEnds, "".join(pieces), doctypes)
+        # The Document has the arrays now; start again for the next document
+        self.reset()
+        return document
+
+    def testSerializer(self, document):
+        return testSerializer(document)
+
+
+def testSerializer(document):
+    rv = []
+    kinds = document.kinds
+
+    def serializeNode(node, indent):
+        kind = kinds[node]
+        if kind == DOCUMENT:
+            rv.append("#document")
+        elif kind == FRAGMENT:
+            rv.append("#document-fragment")
+        elif kind == DOCTYPE:
+            name, publicId, systemId = document.doctype(node)
+            if publicId or systemId:
+                rv.append("""|%s<!DOCTYPE %s "%s" "%s">""" %
+                          (' ' * indent, name or "", publicId or "", systemId or ""))
+            else:
+                rv.append("|%s<!DOCTYPE %s>" % (' ' * indent, name or ""))
+        elif kind == COMMENT:
+            rv.append("|%s<!-- %s -->" % (' ' * indent, document.data(node)))
+        elif kind == ELEMENT:
+            namespace, name = document.name(node)
+            if namespace is not None:
+                name = "%s %s" % (constants.prefixes[namespace], name)
+            rv.append("|%s<%s>" % (' ' * indent, name))
+            attributes = []
+            for (namespace, name), value in document.attributes(node).items():
+                if namespace is not None:
+                    name = "%s %s" % (constants.prefixes[namespace], name)
+                attributes.append((name, value))
+            for name, value in sorted(attributes):
+                rv.append('|%s%s="%s"' % (' ' * (indent + 2), name, value))
+
+        indent += 2
+        text = []
+        for child in document.children(node):
+            if kinds[child] == TEXT:
+                text.append(document.data(child))
+                continue
+            if text:
+                rv.append("|%s\"%s\"" % (' ' * indent, "".join(text)))
+                text = []
+            serializeNode(child, indent)
+        if text:
+            rv.append("|%s\"%s\"" % (' ' * indent, "".join(text)))
+
+    serializeNode(document.root, 0)
+    assert all(isinstance(line, text_type) for line in rv)
+    return "\n".join(rv)
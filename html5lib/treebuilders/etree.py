@@ -16,11 +16,77 @@ from .._utils import moduleFactoryFactory
 tag_regexp = re.compile("{([^}]*)}(.*)")
 
 
+class OpenElements(base.OpenElements):
+    """A stack of open elements that adds the text buffered in an element
+    to it once the element is closed
+
+    Text foster parented before a table is buffered in the table's parent,
+    which may not be open itself, so that is flushed along with the table.
+
+    The parent of a closed element lets go of its wrapper too, so that the
+    wrappers of the elements that are done with can be freed as the parse
+    goes on.
+
+    """
+
+    def pop(self, index=-1):
+        node = base.OpenElements.pop(self, index)
+        self.elementClosed(node)
+        return node
+
+    def remove(self, node):
+        base.OpenElements.remove(self, node)
+        self.elementClosed(node)
+
+    def __setitem__(self, index, node):
+        self.elementClosed(self[index])
+        base.OpenElements.__setitem__(self, index, node)
+
+    def elementClosed(self, node):
+        """Finish off a node that has been taken off the stack"""
+        if node._textBuffer is not None:
+            node.flushText()
+        parent = node.parent
+        if parent is not None:
+            if parent._fosterText is not None:
+                parent.flushText()
+            if not node._closed:
+                parent._childNodes.remove(node)
+        node._closed = True
+
+    def flushText(self):
+        """Add the text buffered in every open element to it"""
+        for node in self:
+            if node._textBuffer is not None:
+                node.flushText()
+            parent = node.parent
+            if parent is not None and parent._fosterText is not None:
+                parent.flushText()
+
+
 def getETreeBuilder(ElementTreeImplementation, fullTree=False):
     ElementTree = ElementTreeImplementation
     ElementTreeCommentType = ElementTree.Comment("asd").tag
 
     class Element(base.Node):
+        # Text added to the end of the element, as a list of pieces, until
+        # the element is closed or its content changes in some other way;
+        # adding to text or tail one piece at a time is quadratic
+        _textBuffer = None
+        # Text foster parented before the last child, which is an open table,
+        # in the same way. _textBuffer is at least an empty list meanwhile,
+        # so that the element is flushed before its content changes.
+        _fosterText = None
+        # Set once the element has been taken off the stack of open elements.
+        # Only the wrappers of children that are still open are kept in
+        # _childNodes; the rest of the children are only in the ElementTree.
+        _closed = False
+        # The attributes the element was given when it was made, from its
+        # token. Once the element is closed, its ElementTree element is the
+        # caller's to change (iterparse users clear it), but it may still be
+        # in the list of active formatting elements and cloned from.
+        _tokenAttributes = None
+
         def __init__(self, name, namespace=None):
             self._name = name
             self._namespace = namespace
@@ -32,7 +98,6 @@ def getETreeBuilder(ElementTreeImplementation, fullTree=False):
                 self.nameTuple = self._namespace, self._name
             self.parent = None
             self._childNodes = []
-            self._flags = []
 
         def _getETreeTag(self, name, namespace):
             if namespace is None:
@@ -63,6 +128,7 @@ def getETreeBuilder(ElementTreeImplementation, fullTree=False):
             return self._element.attrib
 
         def _setAttributes(self, attributes):
+            self._tokenAttributes = attributes
             el_attrib = self._element.attrib
             el_attrib.clear()
             if attributes:
@@ -81,6 +147,8 @@ def getETreeBuilder(ElementTreeImplementation, fullTree=False):
             return self._childNodes
 
         def _setChildNodes(self, value):
+            if self._textBuffer is not None:
+                self.flushText()
             del self._element[:]
             self._childNodes = []
             for element in value:
@@ -90,71 +158,132 @@ def getETreeBuilder(ElementTreeImplementation, fullTree=False):
 
         def hasContent(self):
             """Return true if the node has children or text"""
+            if self._textBuffer is not None:
+                self.flushText()
             return bool(self._element.text or len(self._element))
 
         def appendChild(self, node):
-            self._childNodes.append(node)
+            if self._textBuffer is not None:
+                self.flushText()
             self._element.append(node._element)
             node.parent = self
+            if not node._closed:
+                self._childNodes.append(node)
 
         def insertBefore(self, node, refNode):
-            index = list(self._element).index(refNode._element)
-            self._element.insert(index, node._element)
+            if self._textBuffer is not None:
+                self.flushText()
+            element = self._element
+            # Foster parenting inserts before the open table, which is
+            # almost always the last child
+            index = len(element) - 1
+            if index < 0 or element[index] is not refNode._element:
+                index = list(element).index(refNode._element)
+            element.insert(index, node._element)
             node.parent = self
+            if not node._closed:
+                self._childNodes.append(node)
 
         def removeChild(self, node):
-            self._childNodes.remove(node)
+            if self._textBuffer is not None:
+                self.flushText()
             self._element.remove(node._element)
             node.parent = None
+            if not node._closed:
+                self._childNodes.remove(node)
 
         def insertText(self, data, insertBefore=None):
-            if not len(self._element):
+            if insertBefore is None:
+                if self._textBuffer is None:
+                    self._textBuffer = [data]
+                else:
+                    self._textBuffer.append(data)
+                return
+            element = self._element
+            if len(element) and element[-1] is insertBefore._element:
+                if self._fosterText is None:
+                    self._fosterText = [data]
+                    if self._textBuffer is None:
+                        self._textBuffer = []
+                else:
+                    self._fosterText.append(data)
+                return
+            if self._textBuffer is not None:
+                self.flushText()
+            # Insert the text before the specified node
+            children = list(self._element)
+            index = children.index(insertBefore._element)
+            if index > 0:
+                if not self._element[index - 1].tail:
+                    self._element[index - 1].tail = ""
+                self._element[index - 1].tail += data
+            else:
                 if not self._element.text:
                     self._element.text = ""
                 self._element.text += data
-            elif insertBefore is None:
-                # Insert the text as the tail of the last child element
-                if not self._element[-1].tail:
-                    self._element[-1].tail = ""
-                self._element[-1].tail += data
-            else:
-                # Insert the text before the specified node
-                children = list(self._element)
-                index = children.index(insertBefore._element)
-                if index > 0:
-                    if not self._element[index - 1].tail:
-                        self._element[index - 1].tail = ""
-                    self._element[index - 1].tail += data
+
+        def flushText(self):
+            """Add the buffered text to the element"""
+            if self._fosterText is not None:
+                data = "".join(self._fosterText)
+                self._fosterText = None
+                element = self._element
+                if len(element) > 1:
+                    element[-2].tail = (element[-2].tail or "") + data
                 else:
-                    if not self._element.text:
-                        self._element.text = ""
-                    self._element.text += data
+                    element.text = (element.text or "") + data
+            textBuffer = self._textBuffer
+            self._textBuffer = None
+            if not textBuffer:
+                return
+            data = "".join(textBuffer)
+            if not len(self._element):
+                self._element.text = (self._element.text or "") + data
+            else:
+                # Insert the text as the tail of the last child element
+                self._element[-1].tail = (self._element[-1].tail or "") + data
 
         def cloneNode(self):
             element = type(self)(self.name, self.namespace)
-            if self._element.attrib:
+            if self._closed:
+                element.attributes = self._tokenAttributes
+            elif self._element.attrib:
                 element._element.attrib = copy(self._element.attrib)
+                element._tokenAttributes = self._tokenAttributes
             return element
 
         def reparentChildren(self, newParent):
-            if newParent.childNodes:
-                newParent.childNodes[-1]._element.tail += self._element.text
-            else:
-                if not newParent._element.text:
-                    newParent._element.text = ""
-                if self._element.text is not None:
-                    newParent._element.text += self._element.text
-            self._element.text = ""
-            base.Node.reparentChildren(self, newParent)
+            # Most children have no wrapper any more, so move the
+            # ElementTree children themselves
+            if self._textBuffer is not None:
+                self.flushText()
+            if newParent._textBuffer is not None:
+                newParent.flushText()
+            element = self._element
+            newElement = newParent._element
+            if element.text:
+                if len(newElement):
+                    newElement[-1].tail = (newElement[-1].tail or "") + element.text
+                else:
+                    newElement.text = (newElement.text or "") + element.text
+            element.text = ""
+            newElement.extend(element[:])
+            del element[:]
+            for child in self._childNodes:
+                child.parent = newParent
+            newParent._childNodes.extend(self._childNodes)
+            self._childNodes = []
 
     class Comment(Element):
+        # Comments never go on the stack of open elements
+        _closed = True
+
         def __init__(self, data):
             # Use the superclass constructor to set all properties on the
             # wrapper element
             self._element = ElementTree.Comment(data)
             self.parent = None
             self._childNodes = []
-            self._flags = []
 
         def _getData(self):
             return self._element.text
@@ -165,6 +294,8 @@ def getETreeBuilder(ElementTreeImplementation, fullTree=False):
         data = property(_getData, _setData)
 
     class DocumentType(Element):
+        _closed = True
+
         def __init__(self, name, publicId, systemId):
             Element.__init__(self, "<!DOCTYPE>")
             self._element.text = name
@@ -321,10 +452,15 @@ def getETreeBuilder(ElementTreeImplementation, fullTree=False):
         fragmentClass = DocumentFragment
         implementation = ElementTreeImplementation
 
+        def reset(self):
+            base.TreeBuilder.reset(self)
+            self.openElements = OpenElements()
+
         def testSerializer(self, element):
             return testSerializer(element)
 
         def getDocument(self):
+            self.openElements.flushText()
             if fullTree:
                 return self.document._element
             else:
@@ -335,6 +471,7 @@ def getETreeBuilder(ElementTreeImplementation, fullTree=False):
                     return self.document._element.find("html")
 
         def getFragment(self):
+            self.openElements.flushText()
             return base.TreeBuilder.getFragment(self)._element
 
     return locals()
@@ -16,19 +16,13 @@ import warnings
 import re
 import sys
 
-try:
-    from collections.abc import MutableMapping
-except ImportError:
-    from collections import MutableMapping
-
 from . import base
-from ..constants import DataLossWarning
+from ..constants import DataLossWarning, namespaces
 from .. import constants
 from . import etree as etree_builders
 from .. import _ihatexml
 
 import lxml.etree as etree
-from six import PY3, binary_type
 
 
 fullTree = True
@@ -192,75 +186,103 @@ class TreeBuilder(base.TreeBuilder):
 
     def __init__(self, namespaceHTMLElements, fullTree=False):
         builder = etree_builders.getETreeModule(etree, fullTree=fullTree)
+        treeBuilder = self
         infosetFilter = self.infosetFilter = _ihatexml.InfosetFilter(preventDoubleDashComments=True)
         self.namespaceHTMLElements = namespaceHTMLElements
 
-        class Attributes(MutableMapping):
-            def __init__(self, element):
-                self._element = element
+        def tagName(name, namespace):
+            if namespace is None:
+                return infosetFilter.coerceElement(name)
+            return "{%s}%s" % (namespace, infosetFilter.coerceElement(name))
 
-            def _coerceKey(self, key):
-                if isinstance(key, tuple):
-                    name = "{%s}%s" % (key[2], infosetFilter.coerceAttribute(key[1]))
-                else:
-                    name = infosetFilter.coerceAttribute(key)
-                return name
+        def attributeName(key):
+            if isinstance(key, tuple):
+                return "{%s}%s" % (key[2], infosetFilter.coerceAttribute(key[1]))
+            return infosetFilter.coerceAttribute(key)
 
-            def __getitem__(self, key):
-                value = self._element._element.attrib[self._coerceKey(key)]
-                if not PY3 and isinstance(value, binary_type):
-                    value = value.decode("ascii")
-                return value
+        class Attributes(dict):
+            """The attributes of an element as the parser sees them, which
+            are set on the lxml element as they change"""
+
+            def __init__(self, element, attributes=None):
+                dict.__init__(self)
+                self._element = element
+                if attributes:
+                    self.update(attributes)
 
             def __setitem__(self, key, value):
-                self._element._element.attrib[self._coerceKey(key)] = value
+                dict.__setitem__(self, key, value)
+                self._element.set(attributeName(key), value)
 
             def __delitem__(self, key):
-                del self._element._element.attrib[self._coerceKey(key)]
-
-            def __iter__(self):
-                return iter(self._element._element.attrib)
-
-            def __len__(self):
-                return len(self._element._element.attrib)
+                dict.__delitem__(self, key)
+                del self._element.attrib[attributeName(key)]
 
             def clear(self):
-                return self._element._element.attrib.clear()
+                dict.clear(self)
+                self._element.attrib.clear()
+
+            def update(self, *args, **kwargs):
+                for key, value in dict(*args, **kwargs).items():
+                    self[key] = value
+
+            def setdefault(self, key, value=None):
+                if key not in self:
+                    self[key] = value
+                return self[key]
+
+            def pop(self, key, *default):
+                if key in self:
+                    value = self[key]
+                    del self[key]
+                    return value
+                return dict.pop(self, key, *default)
+
+            def popitem(self):
+                key, value = dict.popitem(self)
+                del self._element.attrib[attributeName(key)]
+                return key, value
 
         class Element(builder.Element):
-            def __init__(self, name, namespace):
-                name = infosetFilter.coerceElement(name)
-                builder.Element.__init__(self, name, namespace=namespace)
-                self._attributes = Attributes(self)
-
-            def _setName(self, name):
-                self._name = infosetFilter.coerceElement(name)
-                self._element.tag = self._getETreeTag(
-                    self._name, self._namespace)
-
-            def _getName(self):
-                return infosetFilter.fromXmlName(self._name)
+            # Made straight in the document being built, with the name as
+            # given; only the lxml tag is coerced to a valid XML name
+            _attributes = None
+
+            def __init__(self, name, namespace=None):
+                self._name = name
+                self._namespace = namespace
+                self._element = treeBuilder.makeelement(tagName(name, namespace))
+                if namespace is None:
+                    self.nameTuple = namespaces["html"], name
+                else:
+                    self.nameTuple = namespace, name
+                self.parent = None
+                self._childNodes = []
 
-            name = property(_getName, _setName)
+            def _getETreeTag(self, name, namespace):
+                return tagName(name, namespace)
 
             def _getAttributes(self):
+                if self._attributes is None:
+                    self._attributes = Attributes(self._element)
                 return self._attributes
 
             def _setAttributes(self, value):
-                attributes = self.attributes
-                attributes.clear()
-                attributes.update(value)
+                if self._attributes:
+                    self._element.attrib.clear()
+                self._attributes = Attributes(self._element, value)
 
             attributes = property(_getAttributes, _setAttributes)
 
             def insertText(self, data, insertBefore=None):
-                data = infosetFilter.coerceCharacters(data)
+                if "\x0C" in data:
+                    data = infosetFilter.coerceCharacters(data)
                 builder.Element.insertText(self, data, insertBefore)
 
             def cloneNode(self):
-                element = type(self)(self.name, self.namespace)
-                if self._element.attrib:
-                    element._element.attrib.update(self._element.attrib)
+                element = type(self)(self._name, self._namespace)
+                if self._attributes:
+                    element.attributes = self._attributes
                 return element
 
         class Comment(builder.Comment):
@@ -283,7 +305,10 @@ class TreeBuilder(base.TreeBuilder):
         base.TreeBuilder.__init__(self, namespaceHTMLElements)
 
     def reset(self):
+        # Elements are made in the document once it exists
+        self.makeelement = etree.Element
         base.TreeBuilder.reset(self)
+        self.openElements = etree_builders.OpenElements()
         self.insertComment = self.insertCommentInitial
         self.initial_comments = []
         self.doctype = None
@@ -292,12 +317,14 @@ class TreeBuilder(base.TreeBuilder):
         return testSerializer(element)
 
     def getDocument(self):
+        self.openElements.flushText()
         if fullTree:
             return self.document._elementTree
         else:
             return self.document._elementTree.getroot()
 
     def getFragment(self):
+        self.openElements.flushText()
         fragment = []
         element = self.openElements[0]._element
         if element.text:
@@ -383,6 +410,7 @@ class TreeBuilder(base.TreeBuilder):
         root.tag = etree_tag
 
         # Add the root element to the internal child/open data structures
+        self.makeelement = root.makeelement
         root_element = self.elementClass(name, namespace)
         root_element._element = root
         self.document._childNodes.append(root_element)
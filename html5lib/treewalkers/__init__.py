@@ -30,6 +30,7 @@ def getTreeWalker(treeType, implementation=None, **kwargs):
           cElementTree and lxml.etree).
         * "lxml": Optimized walker for lxml.etree
         * "genshi": a Genshi stream
+        * "compact": the documents built by the "compact" treebuilder
 
     :arg implementation: A module implementing the tree type e.g.
         xml.etree.ElementTree or cElementTree (Currently applies to the "etree"
@@ -53,6 +54,9 @@ def getTreeWalker(treeType, implementation=None, **kwargs):
         elif treeType == "lxml":
             from . import etree_lxml
             treeWalkerCache[treeType] = etree_lxml.TreeWalker
+        elif treeType == "compact":
+            from . import compact
+            treeWalkerCache[treeType] = compact.TreeWalker
         elif treeType == "etree":
             from . import etree
             if implementation is None:
@@ -0,0 +1,65 @@
+from __future__ import absolute_import, division, unicode_literals
+
+from . import base
+from ..constants import namespaces, voidElements
+from ..treebuilders.compact import DOCTYPE, ELEMENT, TEXT, COMMENT
+
+
+class TreeWalker(base.TreeWalker):
+    """Walks a :py:class:`~html5lib.treebuilders.compact.Document`
+
+    The walk follows the indexes in the document's arrays, without any
+    objects for the nodes along the way.
+
+    """
+    def __iter__(self):
+        document = self.tree
+        kinds = document.kinds
+        parents = document.parents
+        firstChildren = document.firstChildren
+        nextSiblings = document.nextSiblings
+        names = document.names
+        nameTable = document.nameTable
+        root = node = document.root
+
+        while True:
+            kind = kinds[node]
+            firstChild = firstChildren[node]
+
+            if kind == ELEMENT:
+                namespace, name = nameTable[names[node]]
+                if (not namespace or namespace == namespaces["html"]) and name in voidElements:
+                    for token in self.emptyTag(namespace, name, document.attributes(node),
+                                               firstChild >= 0):
+                        yield token
+                    firstChild = -1
+                else:
+                    yield self.startTag(namespace, name, document.attributes(node))
+
+            elif kind == TEXT:
+                for token in self.text(document.data(node)):
+                    yield token
+
+            elif kind == COMMENT:
+                yield self.comment(document.data(node))
+
+            elif kind == DOCTYPE:
+                yield self.doctype(*document.doctype(node))
+
+            if firstChild >= 0:
+                node = firstChild
+                continue
+
+            # Close the node, and its ancestors until one has a next sibling
+            while True:
+                if kinds[node] == ELEMENT:
+                    namespace, name = nameTable[names[node]]
+                    if (namespace and namespace != namespaces["html"]) or name not in voidElements:
+                        yield self.endTag(namespace, name)
+                if node == root:
+                    return
+                nextSibling = nextSiblings[node]
+                if nextSibling >= 0:
+                    node = nextSibling
+                    break
+                node = parents[node]
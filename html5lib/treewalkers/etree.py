@@ -24,7 +24,9 @@ def getETreeBuilder(ElementTreeImplementation):
 
         2. The index of the element relative to its parent
 
-        3. A stack of ancestor elements
+        3. A stack of (ancestor element, index of that element relative to
+           its own parent) pairs, so that climbing back up the tree doesn't
+           have to search for the ancestor among its siblings
 
         4. A flag "text", "tail" or None to indicate if the current node is a
            text node; either the text or tail of the current element (1)
@@ -81,7 +83,7 @@ def getETreeBuilder(ElementTreeImplementation):
                 if element.text:
                     return element, key, parents, "text"
                 elif len(element):
-                    parents.append(element)
+                    parents.append((element, key))
                     return element[0], 0, parents, None
                 else:
                     return None
@@ -94,15 +96,15 @@ def getETreeBuilder(ElementTreeImplementation):
 
             if flag == "text":
                 if len(element):
-                    parents.append(element)
+                    parents.append((element, key))
                     return element[0], 0, parents, None
                 else:
                     return None
             else:
                 if element.tail and flag != "tail":
                     return element, key, parents, "tail"
-                elif key < len(parents[-1]) - 1:
-                    return parents[-1][key + 1], key + 1, parents, None
+                elif key < len(parents[-1][0]) - 1:
+                    return parents[-1][0][key + 1], key + 1, parents, None
                 else:
                     return None
 
@@ -118,12 +120,11 @@ def getETreeBuilder(ElementTreeImplementation):
                 else:
                     return element, key, parents, None
             else:
-                parent = parents.pop()
+                parent, key = parents.pop()
                 if not parents:
                     return parent
                 else:
-                    assert list(parents[-1]).count(parent) == 1
-                    return parent, list(parents[-1]).index(parent), parents, None
+                    return parent, key, parents, None
 
     return locals()
 